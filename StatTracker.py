@@ -1,266 +1,718 @@
-import os
-import pandas as pd
-import matplotlib.pyplot as plt
-import re
-from datetime import datetime
 import tkinter as tk
-from tkinter import filedialog, messagebox, Menu, simpledialog, Toplevel, Listbox, Button, END, Entry
-import json
-from collections import Counter
-
-def load_voltaic_challenges(filename):
-    with open(filename, 'r') as file:
-        return json.load(file)
-
-def load_custom_sets(filename):
-    if os.path.exists(filename):
-        with open(filename, 'r') as file:
-            return json.load(file)
-    return {}
-
-def save_custom_sets(filename, custom_sets):
-    with open(filename, 'w') as file:
-        json.dump(custom_sets, file)
-
-def load_points_of_interest(filename):
-    if os.path.exists(filename):
-        with open(filename, 'r') as file:
-            return json.load(file)
-    return []
-
-def save_points_of_interest(filename, points_of_interest):
-    with open(filename, 'w') as file:
-        json.dump(points_of_interest, file)
+from tkinter import filedialog, messagebox, Menu, simpledialog, Toplevel, Listbox, Button, END, Entry, ttk
+import os
+import queue
+import threading
+import traceback
+from collections import Counter, namedtuple
+
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+from matplotlib.figure import Figure
+
+from stattrack_core import (
+    IngestCancelled, AGGREGATE_PERIODS, load_voltaic_challenges, load_custom_sets, save_custom_sets, load_points_of_interest,
+    save_points_of_interest, open_stats_index, update_stats_indexes, list_sheet_names, find_new_sheets,
+    index_new_sheets, load_score_dataset, load_dataset_unreadable_sheets, discover_challenges, sort_challenges, ChallengeIndex, DerivedSeriesCache,
+    prepare_plot_data_from_store, prepare_player_plot_data, load_derived_cache_bytes, DEFAULT_PLAYER,
+    voltaic_levels, voltaic_benchmark_groups, save_directory_path, load_stats_folders, save_stats_folders,
+    load_ingest_settings, save_ingest_workers, DEEP_INGEST_MODES, load_deep_ingest, save_deep_ingest,
+    X_AXIS_MODES, load_session_gap, save_session_gap, SMOOTHING_MODES, SMOOTHING_UNITS, DEFAULT_SMOOTHING_WINDOW, Smoothing,
+)
+from stattrack_archive import ARCHIVE_SUFFIXES, is_stats_archive
+from stattrack_details import DETAIL_METRICS, update_attempt_details, load_attempt_details, prepare_metric_plot_data, load_setup_changes
+from stattrack_list import ChallengeTable
+from stattrack_plot import ScoresPlot
+from stattrack_ranks import ranks_file_path, load_voltaic_ranks, rank_tables, prepare_rank_plot_data
+from stattrack_profile import profiler
+
+# How often watch mode checks the stats folder for new sheets, in milliseconds
+WATCH_INTERVAL_MS = 5000
+
+# How long typing has to pause before a search box filters its list, in milliseconds
+SEARCH_DEBOUNCE_MS = 150
+
+# What the Metric menu offers, by label
+PLOT_METRICS = {'Score': 'score', **{label: metric for metric, (label, _, _) in DETAIL_METRICS.items()}}
+
+# What the X Axis menu offers, by label
+X_AXIS_CHOICES = dict(zip(("Date", "Session", "Warm-up"), X_AXIS_MODES))
+
+# What the Smoothing menu offers, by label
+SMOOTHING_CHOICES = {"No Smoothing": None, **dict(zip(("Rolling Median", "Rolling 75th Percentile", "Rolling 90th Percentile", "EWMA"), SMOOTHING_MODES))}
+
+# Deep ingest settings, by menu label
+DEEP_INGEST_LABELS = dict(zip(DEEP_INGEST_MODES, ("Off", "Summaries and Weapon Tables", "Summaries, Weapon Tables and Kills")))
 
 # Load the challenges from the JSON file
 voltaic_challenges = load_voltaic_challenges('voltaic_challenges.json')
 
-# Load points of interest
-points_of_interest = load_points_of_interest('points_of_interest.json')
-
-def parse_stat_sheet(file_path):
-    with open(file_path, 'r') as file:
-        data = file.read()
-
-    # Extract challenge start time, scenario, and score
-    challenge_start_match = re.search(r'Challenge Start:,(.*?)\n', data)
-    scenario_match = re.search(r'Scenario:,(.*?)\n', data)
-    score_match = re.search(r'Score:,(.*?)\n', data)
-
-    if not (challenge_start_match and scenario_match and score_match):
-        return None, None, None
+# Rank thresholds for the seasons that have them filled in
 
-    challenge_start = challenge_start_match.group(1).strip()
-    scenario = scenario_match.group(1).strip()
-    score = float(score_match.group(1).strip())
-
-    # Extract time from challenge start
-    challenge_time = False
+# Load points of interest
+points_of_interest = load_points_of_interest()
+
+def plot_challenge_scores(selected_challenges):
+    # Draw the selected challenges from the session's ScoreStore with the current checkbox options.
+    # Per-challenge series come from derived_cache, so toggling an option or picking up new
+    # sheets only recomputes the challenges that changed.
+    global last_plot
+    last_plot = (score_store_folders, selected_challenges)
+
+    # Draw vertical lines based on benchmark selection
+    benchmark_groups = voltaic_benchmark_groups(voltaic_challenges, selected_pairs) if selected_pairs else None
+    normalize = normalize_var.get()
+    metric = PLOT_METRICS[metric_var.get()]
+    shown_points = points_of_interest
+
+    if metric != 'score' or mark_setup_changes_var.get():
+        # Other metrics and setup changes come from the deep-ingest tables
+        conn = open_stats_index()
+        try:
+            if metric != 'score':
+                normalize = False
+                with profiler.stage('prepare_plot_data'):
+                    details = load_attempt_details(conn, score_store_folders, selected_challenges, DETAIL_METRICS[metric][2])
+                    plot_data = prepare_metric_plot_data(
+                        details, selected_challenges, metric, aggregate_var.get(),
+                        compare_players=compare_players_var.get() and len(score_dataset.players) > 1)
+                if not plot_data['lines']:
+                    progress_label.config(text="No details; see Settings > Deep Ingest")
+            if mark_setup_changes_var.get():
+                shown_points = points_of_interest + load_setup_changes(conn, score_store_folders)
+        finally:
+            conn.close()
+
+    if metric == 'score':
+        # With several players, Compare Players draws each player's lines (or aggregate) separately
+        prepare = prepare_plot_data_from_store
+        source = score_store
+        if compare_players_var.get() and len(score_dataset.players) > 1:
+            prepare = prepare_player_plot_data
+            source = score_dataset
+        with profiler.stage('prepare_plot_data'):
+            plot_data = prepare(
+                source, derived_cache, selected_challenges, show_pb_var.get(), normalize, aggregate_var.get(), benchmark_groups,
+                aggregate_period_var.get(), x_axis=X_AXIS_CHOICES[x_axis_var.get()], smoothing=current_smoothing())
+    with profiler.stage('update_plot'):
+        scores_plot.show(plot_data, normalize, shown_points)
+    if profiler.enabled:
+        # Draw now rather than when Tk is idle, so the render can be timed
+        with profiler.stage('render'):
+            plot_canvas.draw()
+
+def current_smoothing():
+    # The Smoothing controls as a Smoothing, or None. Trend lines are only drawn on the date axis.
+    mode = SMOOTHING_CHOICES[smoothing_var.get()]
+    if mode is None or X_AXIS_CHOICES[x_axis_var.get()] != 'date':
+        return None
     try:
-        challenge_time = datetime.strptime(challenge_start, '%H:%M:%S.%f').time()
-    except:
-        # print("Unable to parse challenge start: " + str(challenge_start))
-        return None, False, None
-
-    # Use the file's modification date as the date
-    modification_time = os.path.getmtime(file_path)
-    challenge_date = datetime.fromtimestamp(modification_time).date()
-
-    # Combine date and time into a single datetime object
-    challenge_datetime = datetime.combine(challenge_date, challenge_time)
-
-    return challenge_datetime, scenario, score
-
-def collect_challenges(directory_path):
-    challenge_counter = Counter()
-
-    for filename in os.listdir(directory_path):
-        file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path):
-            _, challenge, _ = parse_stat_sheet(file_path)
-            if challenge:
-                challenge_counter[challenge] += 1
-
-    # Sort challenges by the number of entries, from most to fewest
-    sorted_challenges = sorted(challenge_counter.items(), key=lambda item: item[1], reverse=True)
-    return [challenge for challenge, count in sorted_challenges]
-
-def plot_scores_for_challenges(directory_path, selected_challenges, show_pb=False, normalize=False, aggregate=False):
-    # Create a DataFrame to store the parsed data
-    data = {
-        'Datetime': [],
-        'Challenge': [],
-        'Score': []
-    }
-
-    # Iterate over each file in the directory
-    # for filename in os.listdir(directory_path):
-    #     file_path = os.path.join(directory_path, filename)
-    #     if os.path.isfile(file_path):
-    #         datetime_value, challenge, score = parse_stat_sheet(file_path)
-    #         if datetime_value is not None and challenge in selected_challenges:
-    #             data['Datetime'].append(datetime_value)
-    #             data['Challenge'].append(challenge)
-    #             data['Score'].append(score)
-
-
-
-    # Iterate through selected challenges
-    for filename in list(filter(lambda challenge_file: challenge_file[:challenge_file.rfind("Challenge")-3].strip() in selected_challenges, os.listdir(directory_path))):
-        file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path):
-            datetime_value, challenge, score = parse_stat_sheet(file_path)
-            if datetime_value is not None and challenge in selected_challenges:
-                data['Datetime'].append(datetime_value)
-                data['Challenge'].append(challenge)
-                data['Score'].append(score)
-
-
-    df = pd.DataFrame(data)
-    df.sort_values(by='Datetime', inplace=True)
-
-    plt.figure(figsize=(10, 6))
-
-    if aggregate:
-        # Group by date and calculate the mean score for each date
-        df['Date'] = df['Datetime'].dt.date
-
-        if show_pb:
-            # Calculate cumulative max scores within each challenge
-            df['Score'] = df.groupby('Challenge')['Score'].cummax()
-
-        if normalize:
-            df['Score'] = df.groupby('Challenge')['Score'].transform(lambda x: x / x.max() if x.max() != 0 else x)
-
-        # Calculate the mean of the scores for each date
-        aggregated_scores = df.groupby('Date')['Score'].mean()
-
-        # Apply cumulative max to the mean scores
-        if show_pb:
-            aggregated_scores = aggregated_scores.cummax()
-
-        plt.plot(aggregated_scores.index, aggregated_scores.values, marker='o', label='Aggregate')
-
-        # Draw vertical lines based on benchmark selection
-        colors = plt.cm.tab10.colors  # Use a colormap with distinct colors
-        color_index = 0
-
-        if selected_pairs:
-            for season, level in selected_pairs:
-                benchmark_challenges = voltaic_challenges.get(season, {}).get(level, [])
-                first_occurrence = df[df['Challenge'].isin(benchmark_challenges)]['Datetime'].min()
-                if pd.notnull(first_occurrence):
-                    plt.axvline(x=first_occurrence, color=colors[color_index % len(colors)], linestyle='--', label=f'Start {season}-{level}')
-                    color_index += 1
-        else:
-            for challenge in selected_challenges:
-                first_occurrence = df[df['Challenge'] == challenge]['Datetime'].min()
-                if pd.notnull(first_occurrence):
-                    plt.axvline(x=first_occurrence, color=colors[color_index % len(colors)], linestyle='--', label=f'Start {challenge}')
-                    color_index += 1
-    else:
-        for challenge in selected_challenges:
-            df_challenge = df[df['Challenge'] == challenge]
-
-            if normalize:
-                max_score = df_challenge['Score'].max()
-                df_challenge.loc[:, 'Score'] = df_challenge['Score'] / max_score if max_score != 0 else df_challenge['Score']
+        window = max(int(smoothing_window_var.get()), 1)
+    except ValueError:
+        window = DEFAULT_SMOOTHING_WINDOW
+    return Smoothing(mode, window, smoothing_unit_var.get())
 
-            if show_pb:
-                pb_scores = df_challenge['Score'].cummax()
-                plt.plot(df_challenge['Datetime'], pb_scores, marker='o', label=f'{challenge} (PB)')
-            else:
-                plt.plot(df_challenge['Datetime'], df_challenge['Score'], marker='o', label=challenge)
-
-    # Draw vertical lines for points of interest
-    for poi in points_of_interest:
-        poi_date = datetime.strptime(poi['date'], '%Y-%m-%d')
-        plt.axvline(x=poi_date, color='red', linestyle='--', label=poi['name'])
-
-    plt.title('Scores Over Time')
-    plt.xlabel('Date and Time')
-    plt.ylabel('Score' + (' (Normalized)' if normalize else ''))
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.legend()
-    plt.show()
+def on_plot_option_changed():
+    if last_plot is not None and score_store is not None:
+        plot_challenge_scores(last_plot[1])
 
 def select_directory():
     directory_path = filedialog.askdirectory(title="Select Stats Folder")
     if directory_path:
         save_directory_path(directory_path)
-        filepath_label.config(text=f"Selected Path: {directory_path}")
-        update_challenge_list(directory_path)
-
-def save_directory_path(directory_path):
-    config = {}
-    if os.path.exists('config.json'):
-        with open('config.json', 'r') as file:
-            config = json.load(file)
-    config['directory_path'] = directory_path
-    with open('config.json', 'w') as file:
-        json.dump(config, file)
-
-def load_directory_path():
-    if os.path.exists('config.json'):
-        with open('config.json', 'r') as file:
-            config = json.load(file)
-            return config.get('directory_path', '')
-    return ''
-
-def update_challenge_list(directory_path):
-    challenges = collect_challenges(directory_path)
-    global all_challenges
-    all_challenges = challenges
-    challenge_listbox.delete(0, tk.END)
-    for challenge in challenges:
-        challenge_listbox.insert(tk.END, challenge)
+        show_stats_folders()
+        toggle_watch_folder()
+
+def show_stats_folders():
+    # Show the registered folders and read their challenges
+    stats_folders = load_stats_folders()
+    if not stats_folders:
+        filepath_label.config(text="Selected Path: None")
+        return
+    extra = f" (+{len(stats_folders) - 1} more folder(s))" if len(stats_folders) > 1 else ''
+    filepath_label.config(text=f"Selected Path: {stats_folders[0][0]}{extra}")
+    update_challenge_list(stats_folders)
+
+def manage_stats_folders():
+    # Window to register extra stats folders, e.g. from other machines or other players
+    folders_window = Toplevel(root)
+    folders_window.title("Stats Folders")
+    stats_folders = load_stats_folders()
+
+    folders_listbox = Listbox(folders_window, width=80, height=8)
+    folders_listbox.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+
+    def refresh():
+        folders_listbox.delete(0, tk.END)
+        for directory_path, player in stats_folders:
+            folders_listbox.insert(tk.END, f"{player}: {directory_path}")
+
+    def add_folder(directory_path):
+        if not directory_path:
+            return
+        player = simpledialog.askstring("Input", "Player these stats belong to:", initialvalue=stats_folders[0][1] if stats_folders else DEFAULT_PLAYER, parent=folders_window)
+        if player:
+            stats_folders.append((directory_path, player))
+            refresh()
+
+    def remove_folders():
+        for index in reversed(folders_listbox.curselection()):
+            del stats_folders[index]
+        refresh()
+
+    def save():
+        save_stats_folders(stats_folders)
+        folders_window.destroy()
+        show_stats_folders()
+        toggle_watch_folder()
+
+    button_frame = tk.Frame(folders_window)
+    button_frame.pack(pady=5)
+    tk.Button(button_frame, text="Add Folder...", command=lambda: add_folder(
+        filedialog.askdirectory(title="Add Stats Folder", parent=folders_window))).pack(side=tk.LEFT, padx=5)
+    # Zipped or tarred old stats folders are read without extracting them
+    tk.Button(button_frame, text="Add Archive...", command=lambda: add_folder(filedialog.askopenfilename(
+        title="Add Stats Archive", parent=folders_window,
+        filetypes=[("Archives", " ".join(f"*{suffix}" for suffix in ARCHIVE_SUFFIXES))]))).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Remove", command=remove_folders).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Save", command=save).pack(side=tk.LEFT, padx=5)
+    refresh()
+
+def set_ingest_workers():
+    workers, _ = load_ingest_settings()
+    workers = simpledialog.askinteger("Input", "Number of workers used to read stat sheets:", initialvalue=workers, minvalue=1)
+    if workers:
+        save_ingest_workers(workers)
+
+def set_session_gap():
+    minutes = simpledialog.askfloat("Input", "Minutes without a run that end a play session:", initialvalue=load_session_gap(), minvalue=1)
+    if minutes:
+        save_session_gap(minutes)
+        if score_dataset is not None:
+            score_dataset.set_session_gap(minutes)
+            on_plot_option_changed()
+
+def toggle_profiling():
+    profiler.enabled = profiling_var.get()
+
+def show_profile_report():
+    # Window with the timings gathered so far; Refresh re-reads them
+    report_window = Toplevel(root)
+    report_window.title("Profile Report")
+
+    report_text = tk.Text(report_window, width=60, height=30, font='TkFixedFont')
+    report_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+
+    def refresh():
+        report_text.config(state=tk.NORMAL)
+        report_text.delete('1.0', tk.END)
+        if profiler.enabled or profiler.stages:
+            report_text.insert(tk.END, profiler.format_report())
+        else:
+            report_text.insert(tk.END, "Profiling is off. Turn on Debug > Enable Profiling, then load or plot scores.")
+        report_text.config(state=tk.DISABLED)
+
+    def reset():
+        profiler.reset()
+        refresh()
+
+    button_frame = tk.Frame(report_window)
+    button_frame.pack(pady=5)
+    tk.Button(button_frame, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Reset", command=reset).pack(side=tk.LEFT, padx=5)
+    tk.Button(button_frame, text="Save JSON...", command=save_profile_report).pack(side=tk.LEFT, padx=5)
+    refresh()
+
+def show_unreadable_sheets():
+    # Sheets in the folder that couldn't be read as an attempt, with the reason for each
+    sheets_window = Toplevel(root)
+    sheets_window.title("Unreadable Sheets")
+
+    sheets_text = tk.Text(sheets_window, width=100, height=20)
+    sheets_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+    if unreadable_sheets:
+        sheets_text.insert(tk.END, '\n'.join(f"{filename}: {reason}" for filename, reason in unreadable_sheets))
+    else:
+        sheets_text.insert(tk.END, "Every sheet in the folder was read. Load or plot scores to check again.")
+    sheets_text.config(state=tk.DISABLED)
+
+def save_profile_report():
+    filename = filedialog.asksaveasfilename(title="Save Profile Report", defaultextension='.json', filetypes=[("JSON", "*.json")])
+    if filename:
+        profiler.save_report(filename)
+
+def run_in_background(description, work, on_done):
+    # Run work(progress, cancel_event, messages) on a worker thread and hand its
+    # result to on_done on the Tk thread. The worker talks to the UI only through
+    # the messages queue, which poll_background_task drains via root.after.
+    global background_task
+    if background_task is not None:
+        messagebox.showwarning("Warning", "Still busy with the previous task. Cancel it or wait for it to finish.")
+        return
+
+    cancel_event = threading.Event()
+    messages = queue.Queue()
+
+    def progress(done, total):
+        messages.put(('progress', done, total))
+
+    def target():
+        try:
+            messages.put(('done', work(progress, cancel_event, messages)))
+        except IngestCancelled:
+            messages.put(('cancelled',))
+        except Exception as error:
+            messages.put(('error', error))
+
+    background_task = (cancel_event, messages, on_done)
+    progress_label.config(text=description)
+    progress_bar.config(mode='indeterminate', value=0)
+    progress_bar.start()
+    cancel_button.config(state=tk.NORMAL)
+    threading.Thread(target=target, daemon=True).start()
+    root.after(50, poll_background_task)
+
+def poll_background_task():
+    global background_task
+    cancel_event, messages, on_done = background_task
+
+    finished = None
+    while finished is None:
+        try:
+            message = messages.get_nowait()
+        except queue.Empty:
+            break
+        if message[0] == 'progress':
+            _, done, total = message
+            progress_bar.stop()
+            progress_bar.config(mode='determinate', maximum=max(total, 1), value=done)
+        elif message[0] == 'challenge':
+            # Show scenarios as soon as they're discovered; the final list is sorted when the scan ends
+            add_challenge(message[1])
+        else:
+            finished = message
+
+    if finished is None:
+        root.after(50, poll_background_task)
+        return
+
+    background_task = None
+    progress_bar.stop()
+    progress_bar.config(mode='determinate', value=0)
+    cancel_button.config(state=tk.DISABLED)
+
+    if finished[0] == 'done':
+        progress_label.config(text="Ready")
+        on_done(finished[1])
+    elif finished[0] == 'cancelled':
+        progress_label.config(text="Cancelled")
+    else:
+        progress_label.config(text="Failed")
+        messagebox.showerror("Error", str(finished[1]))
+
+def cancel_background_task():
+    if background_task is not None:
+        background_task[0].set()
+        progress_label.config(text="Cancelling...")
+
+def update_challenge_list(stats_folders):
+    global challenge_index
+    challenge_index = ChallengeIndex()
+    challenge_table.set_stats(None)
+    challenge_table.set_challenges([])
+
+    def work(progress, cancel_event, messages):
+        challenge_counter = Counter()
+        conn = open_stats_index()
+        try:
+            for directory_path, _ in stats_folders:
+                challenge_counter += discover_challenges(
+                    directory_path, on_new_challenge=lambda challenge: messages.put(('challenge', challenge)), cancel_event=cancel_event,
+                    conn=conn)
+        finally:
+            conn.close()
+        return challenge_counter
+
+    def on_done(challenge_counter):
+        global challenge_index, challenge_counts
+        challenge_counts = challenge_counter
+        challenge_index = ChallengeIndex(sort_challenges(challenge_counter))
+        challenge_table.set_counts(challenge_counter)
+        filter_challenges()
+        load_challenge_stats(stats_folders)
+
+    run_in_background("Scanning stats folder...", work, on_done)
+
+def load_challenge_stats(stats_folders):
+    # Read every score in the background so the list can show PBs, last played dates and trends
+    def work(progress, cancel_event, messages):
+        return load_session_scores(stats_folders, progress, cancel_event)
+
+    def on_done(result):
+        keep_session_scores(stats_folders, *result)
+
+    run_in_background("Reading scores...", work, on_done)
+
+def toggle_watch_folder():
+    global watch_scan, watch_after_id
+    if watch_after_id is not None:
+        root.after_cancel(watch_after_id)
+        watch_after_id = None
+    if watch_scan is not None:
+        # The scan in flight may index sheets that will never be added to the session's scores
+        watch_scan = None
+        score_dataset_stale.set()
+    if watch_folder_var.get():
+        start_watching()
+
+def start_watching():
+    global watched_directory, watched_player, watched_names, watched_mtime_ns, watch_pending, watch_after_id
+    stats_folders = load_stats_folders()
+    if not stats_folders:
+        watch_folder_var.set(False)
+        messagebox.showerror("Error", "No directory selected. Please select a directory first.")
+        return
+
+    # Watch the first folder, where new sheets are being written. Remember what's already
+    # there so each poll only has to deal with new sheets.
+    directory_path, watched_player = stats_folders[0]
+    if is_stats_archive(directory_path):
+        watch_folder_var.set(False)
+        messagebox.showerror("Error", "Watch mode needs a stats folder, not an archive, as the first folder.")
+        return
+    # The first poll lists what's already there, off the Tk thread like every other poll
+    watched_directory = directory_path
+    watched_names = None
+    watched_mtime_ns = None
+    watch_pending = set()
+    watch_after_id = root.after_idle(poll_watched_folder)
+
+# What a watch poll found: the folder's sheet names when it was listed from scratch (else None),
+# the sheets it indexed and their index rows, the folder's mtime, and the session's dataset with
+# the new attempts added along with its challenge stats (None if they couldn't be added)
+WatchScan = namedtuple('WatchScan', 'names candidates indexed mtime_ns dataset stats')
+
+def poll_watched_folder():
+    # Look for new sheets on a worker thread, so listing, parsing, index writes and adding the
+    # attempts to the session's scores stay off the Tk thread, then pick up the result in
+    # finish_watch_poll
+    global watch_scan, watch_after_id
+    known_names = set(watched_names) if watched_names is not None else None
+    directory_path, player, last_mtime_ns, pending = watched_directory, watched_player, watched_mtime_ns, set(watch_pending)
+    # New attempts go into a copy of the dataset, handed over only if nothing replaced it meanwhile
+    dataset = score_dataset
+    if dataset is None or background_task is not None or (directory_path, player) not in (score_store_folders or ()):
+        dataset = None
+    watch_scan = queue.Queue()
+    results = watch_scan
+
+    def scan():
+        try:
+            results.put(('done', scan_watched_folder(directory_path, player, known_names, last_mtime_ns, pending, dataset), dataset))
+        except Exception as error:
+            results.put(('error', error, dataset))
+
+    threading.Thread(target=scan, daemon=True).start()
+    watch_after_id = root.after(50, finish_watch_poll)
+
+def scan_watched_folder(directory_path, player, known_names, last_mtime_ns, pending, dataset):
+    # Runs on the watch thread. Indexes the sheets that appeared since the last poll, and those
+    # that were still being written then, and adds their attempts to a copy of dataset (if any).
+    # With known_names None, only remembers what the folder holds now.
+    if known_names is None:
+        mtime_ns = os.stat(directory_path).st_mtime_ns
+        return WatchScan(list_sheet_names(directory_path), [], [], mtime_ns, None, None)
+    new_names, mtime_ns = find_new_sheets(directory_path, known_names, last_mtime_ns)
+    candidates = sorted(set(new_names) | pending)
+    indexed = []
+    if candidates:
+        conn = open_stats_index()
+        try:
+            indexed = index_new_sheets(conn, directory_path, candidates)
+        finally:
+            conn.close()
+
+    rows = [row for row in indexed if row[5]]
+    stats = None
+    if dataset is not None and rows:
+        dataset = dataset.copy()
+        dataset.append(player, [row[4] for row in rows], [row[5] for row in rows], [row[6] for row in rows])
+        stats = dataset.combined.challenge_stats()
+    else:
+        dataset = None
+    return WatchScan(None, candidates, indexed, mtime_ns, dataset, stats)
+
+def finish_watch_poll():
+    global watch_scan, watch_after_id
+    try:
+        message = watch_scan.get_nowait()
+    except queue.Empty:
+        watch_after_id = root.after(50, finish_watch_poll)
+        return
+    watch_scan = None
+
+    # An unmounted folder or an index locked by another connection shouldn't end watch mode:
+    # report it and try again on the next poll, which looks at the same sheets again
+    try:
+        if message[0] == 'error':
+            raise message[1]
+        add_watched_sheets(message[1], message[2])
+    except Exception as error:
+        traceback.print_exception(type(error), error, error.__traceback__)
+        progress_label.config(text=f"Watch failed: {error}")
+    watch_after_id = root.after(WATCH_INTERVAL_MS, poll_watched_folder)
+
+def add_watched_sheets(scan, scanned_dataset):
+    # Take a watch poll's result: swap in the dataset with the new attempts, and add the new
+    # sheets to the challenge list and the open plot. scanned_dataset is the session's dataset
+    # when the poll started.
+    global watched_names, watched_mtime_ns, watch_pending, score_dataset, score_store
+    watched_mtime_ns = scan.mtime_ns
+    if scan.names is not None:
+        watched_names = scan.names
+    if not scan.candidates:
+        return
+
+    # Sheets that didn't parse may still be mid-write, so try them again on the next poll
+    parsed = {row[1]: row[5] for row in scan.indexed if row[5]}
+    if parsed and score_dataset is not None and (watched_directory, watched_player) in score_store_folders:
+        if scan.dataset is not None and score_dataset is scanned_dataset and background_task is None:
+            score_dataset, score_store = scan.dataset, scan.dataset.combined
+            challenge_table.set_stats(scan.stats)
+        else:
+            # The dataset was replaced, or a worker may be about to hand over one it read before
+            # these sheets were indexed; have the next load read everything again
+            score_dataset_stale.set()
+    watch_pending = set(scan.candidates) - parsed.keys()
+    watched_names.update(parsed)
+
+    for challenge in parsed.values():
+        if challenge not in challenge_counts:
+            add_challenge(challenge)
+        challenge_counts[challenge] += 1
+
+    if parsed:
+        challenge_table.refresh()
+        progress_label.config(text=f"Added {len(parsed)} new sheet(s)")
+        refresh_open_plot(set(parsed.values()))
+
+def refresh_open_plot(changed_challenges):
+    # Redraw the current plot if it shows any of the changed challenges
+    if last_plot is None or not refresh_plot_var.get() or background_task is not None:
+        return
+    stats_folders, selected_challenges = last_plot
+    if not changed_challenges & set(selected_challenges):
+        return
+
+    # Watch mode normally appends straight to the session's store; reload it only if it's missing sheets
+    if score_store is not None and score_store_folders == stats_folders and not score_dataset_stale.is_set():
+        plot_challenge_scores(selected_challenges)
+        return
+
+    def work(progress, cancel_event, messages):
+        return load_session_scores(stats_folders, progress, cancel_event)
+
+    def on_done(result):
+        keep_session_scores(stats_folders, *result)
+        plot_challenge_scores(selected_challenges)
+
+    run_in_background("Refreshing plot...", work, on_done)
+
+def show_challenges(listbox, challenges):
+    # Replace the listbox rows in a single Tk call
+    listbox.delete(0, tk.END)
+    if challenges:
+        listbox.insert(tk.END, *challenges)
+
+def bind_search_as_you_type(entry, on_search):
+    # Run on_search once typing pauses rather than on every keystroke
+    pending = None
+
+    def run():
+        nonlocal pending
+        pending = None
+        on_search()
+
+    def on_key(event):
+        nonlocal pending
+        if pending is not None:
+            entry.after_cancel(pending)
+        pending = entry.after(SEARCH_DEBOUNCE_MS, run)
+
+    entry.bind('<KeyRelease>', on_key)
 
 def filter_challenges():
-    search_text = search_entry.get().lower()
-    challenge_listbox.delete(0, tk.END)
-    for challenge in all_challenges:
-        if search_text in challenge.lower():
-            challenge_listbox.insert(tk.END, challenge)
+    # Whatever was selected stays selected if it still matches the search
+    challenge_table.set_challenges(challenge_index.search(search_entry.get()))
+
+def add_challenge(challenge):
+    # Index a newly found challenge and show it if it matches the current search
+    challenge_index.add(challenge)
+    if challenge_index.matches(challenge, search_entry.get()):
+        challenge_table.append(challenge)
+
+def load_session_scores(stats_folders, progress=None, cancel_event=None):
+    # Runs on the worker thread. Reuses the session's ScoreDataset unless the index picked up changes,
+    # or watch mode indexed sheets it couldn't add to it. Returns the dataset and the folders'
+    # unreadable sheets. The stale flag is cleared before the index is read, so sheets indexed
+    # during the load leave it set for the next one.
+    stale = score_dataset_stale.is_set()
+    score_dataset_stale.clear()
+    dataset = score_dataset if score_store_folders == stats_folders and not stale else None
+    conn = open_stats_index()
+    try:
+        changed, removed = update_stats_indexes(conn, [directory_path for directory_path, _ in stats_folders], progress, cancel_event)
+        if dataset is None or changed or removed:
+            dataset = load_score_dataset(conn, stats_folders, session_gap_minutes=load_session_gap())
+        deep_ingest = load_deep_ingest()
+        if deep_ingest != 'off':
+            update_attempt_details(conn, [directory_path for directory_path, _ in stats_folders], deep_ingest == 'kills', progress, cancel_event)
+        unreadable = load_dataset_unreadable_sheets(conn, stats_folders)
+    finally:
+        conn.close()
+    return dataset, unreadable
+
+def keep_session_scores(stats_folders, dataset, unreadable=None):
+    global score_dataset, score_store, score_store_folders, unreadable_sheets
+    # derived_cache is kept: its keys hold each challenge's fingerprint, so series of the
+    # challenges whose sheets didn't change are still found in a reloaded dataset
+    if dataset is not None:
+        with profiler.stage('challenge_stats'):
+            challenge_table.set_stats(dataset.combined.challenge_stats())
+    score_dataset = dataset
+    score_store = dataset.combined if dataset is not None else None
+    score_store_folders = stats_folders
+    if unreadable is not None:
+        unreadable_sheets = unreadable
+        if unreadable:
+            progress_label.config(text=f"{len(unreadable)} unreadable sheet(s)")
+    if dataset is not None and score_dataset_stale.is_set():
+        # Watch mode indexed sheets this load didn't see; read them in once the caller is done
+        root.after_idle(reload_stale_scores)
+
+def reload_stale_scores():
+    # Load the sheets watch mode indexed while another load was running, then redraw the plot.
+    # A load started in the meantime reads them anyway.
+    if background_task is not None or not score_dataset_stale.is_set() or score_store_folders is None:
+        return
+    stats_folders = score_store_folders
+
+    def work(progress, cancel_event, messages):
+        return load_session_scores(stats_folders, progress, cancel_event)
+
+    def on_done(result):
+        keep_session_scores(stats_folders, *result)
+        if last_plot is not None and last_plot[0] == stats_folders and refresh_plot_var.get():
+            plot_challenge_scores(last_plot[1])
+
+    run_in_background("Reading new sheets...", work, on_done)
 
 def on_plot_scores():
-    directory_path = load_directory_path()
-    if directory_path:
-        selected_indices = challenge_listbox.curselection()
-        selected_challenges = [challenge_listbox.get(i) for i in selected_indices]
+    stats_folders = load_stats_folders()
+    if stats_folders:
+        selected_challenges = challenge_table.selection()
 
         if not selected_challenges:
             messagebox.showwarning("Warning", "No challenges selected. Please select at least one challenge.")
             return
 
-        # Get the state of the checkboxes
-        show_pb = show_pb_var.get()
-        normalize = normalize_var.get()
-        aggregate = aggregate_var.get()
+        # Read the scores off the Tk thread, then plot them once they're ready
+        def work(progress, cancel_event, messages):
+            return load_session_scores(stats_folders, progress, cancel_event)
 
-        # Plot scores for the selected challenges
-        plot_scores_for_challenges(directory_path, selected_challenges, show_pb, normalize, aggregate)
+        def on_done(result):
+            keep_session_scores(stats_folders, *result)
+            plot_challenge_scores(selected_challenges)
+
+        run_in_background("Loading scores...", work, on_done)
     else:
         messagebox.showerror("Error", "No directory selected. Please select a directory first.")
 
+def ranked_seasons():
+    # SeasonRanks of the selected benchmarks' seasons that have rank thresholds, or of all of them
+    # if none are selected. The ranks file is read each time so edits to it show up without a restart.
+    path = ranks_file_path()
+    try:
+        voltaic_ranks = load_voltaic_ranks(path)
+    except ValueError as error:
+        messagebox.showerror("Voltaic Ranks", f"{path}: {error}")
+        return []
+    if not voltaic_ranks:
+        messagebox.showinfo("Voltaic Ranks", f"No rank thresholds configured. Fill them in in {path}.")
+        return []
+    seasons = [ranks for season, ranks in voltaic_ranks.items() if any(pair[0] == season for pair in selected_pairs)]
+    if not seasons and not selected_pairs:
+        seasons = list(voltaic_ranks.values())
+    if not seasons:
+        messagebox.showinfo("Voltaic Ranks", f"No rank thresholds for these seasons. Fill them in in {path}.")
+    return seasons
+
+def with_session_scores(on_ready):
+    # Call on_ready once the session's scores are loaded, reading them in the background if needed
+    stats_folders = load_stats_folders()
+    if not stats_folders:
+        messagebox.showerror("Error", "No directory selected. Please select a directory first.")
+        return
+    if score_store is not None and score_store_folders == stats_folders:
+        on_ready()
+        return
+
+    def work(progress, cancel_event, messages):
+        return load_session_scores(stats_folders, progress, cancel_event)
+
+    def on_done(result):
+        keep_session_scores(stats_folders, *result)
+        on_ready()
+
+    run_in_background("Loading scores...", work, on_done)
+
+def plot_rank_timeline():
+    seasons = ranked_seasons()
+    if not seasons:
+        return
+
+    def on_ready():
+        global last_plot
+        # Option changes and watch mode redraw score plots, so they leave this one alone
+        last_plot = None
+        with profiler.stage('prepare_plot_data'):
+            plot_data = prepare_rank_plot_data(score_store, derived_cache, seasons)
+        with profiler.stage('update_plot'):
+            scores_plot.show(plot_data, False, points_of_interest)
+
+    with_session_scores(on_ready)
+
+def show_rank_table():
+    # Each season's current rank, with the rank and energy of every level and scenario
+    seasons = ranked_seasons()
+    if not seasons:
+        return
+
+    def on_ready():
+        sections = []
+        for season_ranks in seasons:
+            scenarios, levels, season_rank = rank_tables(score_store, season_ranks)
+            sections.append(f"{season_ranks.season}: {season_rank}\n\n{levels.to_string(index=False)}\n\n{scenarios.to_string(index=False)}")
+
+        ranks_window = Toplevel(root)
+        ranks_window.title("Voltaic Ranks")
+        ranks_text = tk.Text(ranks_window, width=110, height=30)
+        ranks_text.pack(padx=5, pady=5, fill=tk.BOTH, expand=True)
+        ranks_text.insert(tk.END, '\n\n\n'.join(sections))
+        ranks_text.config(state=tk.DISABLED)
+
+    with_session_scores(on_ready)
+
 def select_voltaic_challenge(season, level):
     # Track selected season-level pairs
     if level == "All":
-        if season == "Season 3":
-            for difficulty in ["Intermediate", "Advanced"]:
-                select_voltaic_challenge(season, difficulty)
-        else:
-            for difficulty in ["Novice", "Intermediate", "Advanced"]:
-                select_voltaic_challenge(season, difficulty)
+        for difficulty in voltaic_levels(voltaic_challenges, season, level):
+            select_voltaic_challenge(season, difficulty)
     else:
         selected_pairs.add((season, level))
         # Get challenges for the selected season and level
         selected_challenges = voltaic_challenges.get(season, {}).get(level, [])
         # Select the challenges in the listbox
-        for challenge in selected_challenges:
-            for i, item in enumerate(all_challenges):
-                if item == challenge:
-                    challenge_listbox.selection_set(i)
+        challenge_table.select(selected_challenges)
 
         # Update the selected benchmarks label
         update_selected_benchmarks_label()
@@ -279,13 +731,14 @@ def clear_benchmarks():
     # Clear the selected pairs and update the UI
     selected_pairs.clear()
     selected_custom_sets.clear()
-    challenge_listbox.selection_clear(0, tk.END)
+    challenge_table.clear_selection()
     update_selected_benchmarks_label()
 
 def on_aggregate_toggled():
     # If Aggregate is checked, also check Normalize
     if aggregate_var.get():
         normalize_var.set(True)
+    on_plot_option_changed()
 
 def add_custom_set():
     set_name = simpledialog.askstring("Input", "Enter the name of the new set:")
@@ -303,7 +756,7 @@ def add_custom_set():
         search_entry.pack(side=tk.LEFT, padx=5)
 
         # Create a search button
-        search_button = tk.Button(search_frame, text="Filter Challenges", command=lambda: filter_custom_set_challenges(search_entry.get().lower(), challenges_listbox))
+        search_button = tk.Button(search_frame, text="Filter Challenges", command=lambda: filter_custom_set_challenges(search_entry.get(), challenges_listbox))
         search_button.pack(side=tk.LEFT)
 
         # Frame for listboxes
@@ -319,14 +772,12 @@ def add_custom_set():
         selected_challenges_listbox.pack(side=tk.LEFT, padx=5, pady=10, fill=tk.BOTH, expand=True)
 
         # Populate the listbox with challenges
-        for challenge in all_challenges:
-            challenges_listbox.insert(tk.END, challenge)
+        show_challenges(challenges_listbox, challenge_index.names)
 
         def filter_custom_set_challenges(search_text, listbox):
-            listbox.delete(0, tk.END)
-            for challenge in all_challenges:
-                if search_text in challenge.lower():
-                    listbox.insert(tk.END, challenge)
+            show_challenges(listbox, challenge_index.search(search_text))
+
+        bind_search_as_you_type(search_entry, lambda: filter_custom_set_challenges(search_entry.get(), challenges_listbox))
 
         def add_to_selected():
             selected_indices = challenges_listbox.curselection()
@@ -344,7 +795,7 @@ def add_custom_set():
             selected_challenges = selected_challenges_listbox.get(0, tk.END)
             custom_sets[set_name] = selected_challenges
             custom_sets_menu.add_command(label=set_name, command=lambda s=set_name: select_custom_set(s))
-            save_custom_sets('custom_sets.json', custom_sets)
+            save_custom_sets(custom_sets)
             select_challenges_window.destroy()
 
         # Button to add selected challenges to the selected listbox
@@ -367,10 +818,7 @@ def select_custom_set(set_name):
     selected_challenges = custom_sets.get(set_name, [])
 
     # Select the challenges in the listbox
-    for challenge in selected_challenges:
-        for i, item in enumerate(all_challenges):
-            if item == challenge:
-                challenge_listbox.selection_set(i)
+    challenge_table.select(selected_challenges)
 
     # Update the selected benchmarks label
     update_selected_benchmarks_label()
@@ -412,7 +860,7 @@ def modify_or_delete_custom_set():
             search_entry.pack(side=tk.LEFT, padx=5)
 
             # Create a search button
-            search_button = tk.Button(search_frame, text="Filter Challenges", command=lambda: filter_custom_set_challenges(search_entry.get().lower(), challenges_listbox))
+            search_button = tk.Button(search_frame, text="Filter Challenges", command=lambda: filter_custom_set_challenges(search_entry.get(), challenges_listbox))
             search_button.pack(side=tk.LEFT)
 
             # Frame for listboxes
@@ -428,18 +876,16 @@ def modify_or_delete_custom_set():
             selected_challenges_listbox.pack(side=tk.LEFT, padx=5, pady=10, fill=tk.BOTH, expand=True)
 
             # Populate the listbox with challenges
-            for challenge in all_challenges:
-                challenges_listbox.insert(tk.END, challenge)
+            show_challenges(challenges_listbox, challenge_index.names)
 
             # Populate the selected challenges listbox with the existing challenges in the set
             for challenge in custom_sets[selected_set]:
                 selected_challenges_listbox.insert(tk.END, challenge)
 
             def filter_custom_set_challenges(search_text, listbox):
-                listbox.delete(0, tk.END)
-                for challenge in all_challenges:
-                    if search_text in challenge.lower():
-                        listbox.insert(tk.END, challenge)
+                show_challenges(listbox, challenge_index.search(search_text))
+
+            bind_search_as_you_type(search_entry, lambda: filter_custom_set_challenges(search_entry.get(), challenges_listbox))
 
             def add_to_selected():
                 selected_indices = challenges_listbox.curselection()
@@ -456,7 +902,7 @@ def modify_or_delete_custom_set():
             def save_modified_set():
                 selected_challenges = selected_challenges_listbox.get(0, tk.END)
                 custom_sets[selected_set] = selected_challenges
-                save_custom_sets('custom_sets.json', custom_sets)
+                save_custom_sets(custom_sets)
                 modify_set_window.destroy()
                 modify_delete_window.destroy()
 
@@ -481,7 +927,7 @@ def modify_or_delete_custom_set():
         if selected_set:
             if messagebox.askyesno("Confirm", f"Are you sure you want to delete the set '{selected_set}'?"):
                 del custom_sets[selected_set]
-                save_custom_sets('custom_sets.json', custom_sets)
+                save_custom_sets(custom_sets)
                 sets_listbox.delete(selected_indices[0])
 
     # Button to modify the selected set
@@ -497,7 +943,7 @@ def add_point_of_interest():
     date = simpledialog.askstring("Input", "Enter the date (YYYY-MM-DD):")
     if name and date:
         points_of_interest.append({'name': name, 'date': date})
-        save_points_of_interest('points_of_interest.json', points_of_interest)
+        save_points_of_interest(points_of_interest)
         update_points_of_interest_listbox()
 
 def delete_point_of_interest():
@@ -524,7 +970,7 @@ def delete_point_of_interest():
             return
         for i in reversed(selected_indices):  # Iterate in reverse to avoid index shifting issues
             points_of_interest.pop(i)
-        save_points_of_interest('points_of_interest.json', points_of_interest)
+        save_points_of_interest(points_of_interest)
         update_points_of_interest_listbox()
         delete_poi_window.destroy()
 
@@ -538,131 +984,268 @@ def update_points_of_interest_listbox():
         points_of_interest_listbox.insert(tk.END, f"{poi['name']} - {poi['date']}")
     points_of_interest_listbox.config(state='disabled')  # Disable the listbox
 
-# Create the main application window
-root = tk.Tk()
-root.title("Stats Plotter")
-
-# Variable to store the state of the checkboxes
-show_pb_var = tk.BooleanVar()
-normalize_var = tk.BooleanVar()
-aggregate_var = tk.BooleanVar()
-
-# Create a button to select the directory
-select_button = tk.Button(root, text="Select Stats Folder", command=select_directory)
-select_button.pack(pady=10)
-
-# Label to display the selected directory path
-filepath_label = tk.Label(root, text="Selected Path: None")
-filepath_label.pack(pady=5)
-
-# Frame for search bar, filter button, and Voltaic Benchmarks menu
-search_frame = tk.Frame(root)
-search_frame.pack(pady=10)
-
-# Create a search bar
-search_entry = tk.Entry(search_frame)
-search_entry.pack(side=tk.LEFT, padx=5)
-
-# Create a search button
-search_button = tk.Button(search_frame, text="Filter Challenges", command=filter_challenges)
-search_button.pack(side=tk.LEFT)
-
-# Create a menu button for Voltaic selections
-menu_button = tk.Menubutton(search_frame, text="Voltaic Benchmarks", relief=tk.RAISED)
-menu = Menu(menu_button, tearoff=0)
-menu_button.config(menu=menu)
+if __name__ == '__main__':
+    # Create the main application window
+    root = tk.Tk()
+    root.title("Stats Plotter")
+
+    # Plot embedded on the right of the window; packed first so the controls fill the space left of it
+    plot_frame = tk.Frame(root)
+    plot_frame.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True)
+
+    plot_figure = Figure(figsize=(10, 6), layout='tight')
+    plot_canvas = FigureCanvasTkAgg(plot_figure, master=plot_frame)
+    plot_toolbar = NavigationToolbar2Tk(plot_canvas, plot_frame, pack_toolbar=False)
+    plot_toolbar.pack(side=tk.BOTTOM, fill=tk.X)
+    plot_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    scores_plot = ScoresPlot(plot_figure)
+
+    # Variable to store the state of the checkboxes
+    show_pb_var = tk.BooleanVar()
+    normalize_var = tk.BooleanVar()
+    aggregate_var = tk.BooleanVar()
+    aggregate_period_var = tk.StringVar(value='day')
+
+    # Create a button to select the directory
+    select_button = tk.Button(root, text="Select Stats Folder", command=select_directory)
+    select_button.pack(pady=10)
+
+    # Label to display the selected directory path
+    filepath_label = tk.Label(root, text="Selected Path: None")
+    filepath_label.pack(pady=5)
+
+    # Frame for search bar, filter button, and Voltaic Benchmarks menu
+    search_frame = tk.Frame(root)
+    search_frame.pack(pady=10)
+
+    # Create a search bar
+    search_entry = tk.Entry(search_frame)
+    search_entry.pack(side=tk.LEFT, padx=5)
+
+    # Create a search button
+    search_button = tk.Button(search_frame, text="Filter Challenges", command=filter_challenges)
+    search_button.pack(side=tk.LEFT)
+
+    # Filter as the user types, once they pause
+    bind_search_as_you_type(search_entry, filter_challenges)
+
+    # Create a menu button for Voltaic selections
+    menu_button = tk.Menubutton(search_frame, text="Voltaic Benchmarks", relief=tk.RAISED)
+    menu = Menu(menu_button, tearoff=0)
+    menu_button.config(menu=menu)
+
+    #Add Season 3 and Levels to the menu
+    submenu_s3 = Menu(menu, tearoff=0)
+    for level in ["Intermediate", "Advanced", "All"]:
+            submenu_s3.add_command(label=level, command=lambda s="Season 3", l=level: select_voltaic_challenge(s, l))
+    menu.add_cascade(label="Season 3", menu=submenu_s3)
+
+    # Add Seasons and Levels to the menu
+    for season in ["Season 4", "Season 5"]:
+        submenu = Menu(menu, tearoff=0)
+        for level in ["Novice", "Intermediate", "Advanced", "All"]:
+            submenu.add_command(label=level, command=lambda s=season, l=level: select_voltaic_challenge(s, l))
+        menu.add_cascade(label=season, menu=submenu)
+
+    # Ranks of the selected seasons, or of every season with thresholds if none are selected
+    menu.add_separator()
+    menu.add_command(label="Plot Rank Timeline", command=plot_rank_timeline)
+    menu.add_command(label="Rank Table...", command=show_rank_table)
+
+    menu_button.pack(side=tk.LEFT, padx=5)
+
+    # Create a menu button for Custom Sets
+    custom_sets_menu_button = tk.Menubutton(search_frame, text="Custom Sets", relief=tk.RAISED)
+    custom_sets_menu = Menu(custom_sets_menu_button, tearoff=0)
+    custom_sets_menu_button.config(menu=custom_sets_menu)
+
+    # Add an option to add a new set
+    custom_sets_menu.add_command(label="Add Set", command=add_custom_set)
+    custom_sets_menu.add_command(label="Modify or Delete Set", command=modify_or_delete_custom_set)
+    custom_sets_menu_button.pack(side=tk.LEFT, padx=5)
+
+    # Button to clear selected benchmarks
+    clear_button = tk.Button(search_frame, text="Clear Benchmarks", command=clear_benchmarks)
+    clear_button.pack(side=tk.LEFT, padx=5)
+
+    # Create a menu button for application settings
+    settings_menu_button = tk.Menubutton(search_frame, text="Settings", relief=tk.RAISED)
+    settings_menu = Menu(settings_menu_button, tearoff=0)
+    settings_menu_button.config(menu=settings_menu)
+    settings_menu.add_command(label="Stats Folders...", command=manage_stats_folders)
+    settings_menu.add_command(label="Ingestion Workers...", command=set_ingest_workers)
+    settings_menu.add_command(label="Session Gap...", command=set_session_gap)
+
+    # Deep ingest parses whole sheets once, for the metrics other than score
+    deep_ingest_var = tk.StringVar(value=load_deep_ingest())
+    deep_ingest_menu = Menu(settings_menu, tearoff=0)
+    for mode, label in DEEP_INGEST_LABELS.items():
+        deep_ingest_menu.add_radiobutton(label=label, value=mode, variable=deep_ingest_var, command=lambda: save_deep_ingest(deep_ingest_var.get()))
+    settings_menu.add_cascade(label="Deep Ingest", menu=deep_ingest_menu)
+    settings_menu_button.pack(side=tk.LEFT, padx=5)
+
+    # Create a menu button for profiling ingestion and plotting
+    profiling_var = tk.BooleanVar()
+    debug_menu_button = tk.Menubutton(search_frame, text="Debug", relief=tk.RAISED)
+    debug_menu = Menu(debug_menu_button, tearoff=0)
+    debug_menu_button.config(menu=debug_menu)
+    debug_menu.add_checkbutton(label="Enable Profiling", variable=profiling_var, command=toggle_profiling)
+    debug_menu.add_command(label="Show Profile Report...", command=show_profile_report)
+    debug_menu.add_command(label="Save Profile Report...", command=save_profile_report)
+    debug_menu.add_separator()
+    debug_menu.add_command(label="Show Unreadable Sheets...", command=show_unreadable_sheets)
+    debug_menu_button.pack(side=tk.LEFT, padx=5)
+
+    # Label to display selected benchmarks below the benchmarks button
+    selected_benchmarks_label = tk.Label(root, text="Selected Benchmarks: None")
+    selected_benchmarks_label.pack(pady=5)
+
+    # Table of challenges with their attempt counts, PBs, last played dates and trends; click a heading to sort
+    challenge_table = ChallengeTable(root)
+    challenge_table.pack(pady=10, fill=tk.BOTH, expand=True)
+
+    # Progress bar and cancel button for folder scans and score loading
+    progress_frame = tk.Frame(root)
+    progress_frame.pack(pady=5, fill=tk.X)
+
+    progress_label = tk.Label(progress_frame, text="Ready", width=24, anchor='w')
+    progress_label.pack(side=tk.LEFT, padx=5)
+
+    progress_bar = ttk.Progressbar(progress_frame, mode='determinate')
+    progress_bar.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+
+    cancel_button = tk.Button(progress_frame, text="Cancel", command=cancel_background_task, state=tk.DISABLED)
+    cancel_button.pack(side=tk.LEFT, padx=5)
+
+    # Task currently running on the worker thread, if any
+    background_task = None
+
+    # Challenges found in the stats folder and their attempt counts, filled in once the folder has been scanned
+    challenge_index = ChallengeIndex()
+    challenge_counts = Counter()
+
+    # Watch mode state: the folder being watched and its player, the sheet names already seen
+    # (None until the first poll has listed them), the folder's mtime at the last poll, sheets to retry, the pending root.after callback, and
+    # the queue the running scan's result arrives on
+    watched_directory = None
+    watched_player = None
+    watched_names = set()
+    watched_mtime_ns = None
+    watch_pending = set()
+    watch_after_id = None
+    watch_scan = None
+
+    # Folders and challenges of the current plot, so option changes and watch mode can redraw it
+    last_plot = None
+
+    # Every attempt in the registered stats folders, loaded after the folder scan and kept for the
+    # session, everyone's attempts together, and the per-challenge series derived from them
+    score_dataset = None
+    score_store = None
+    score_store_folders = None
+    unreadable_sheets = []
+    # Set when watch mode indexed sheets while a worker was loading, so the kept dataset may lack them
+    score_dataset_stale = threading.Event()
+    derived_cache = DerivedSeriesCache(load_derived_cache_bytes())
+
+    # Set to store selected season-level pairs
+    selected_pairs = set()
+
+    # Dictionary to store custom sets and their challenges
+    custom_sets = load_custom_sets()
+
+    # Populate the custom sets menu with existing sets
+    for set_name in custom_sets:
+        custom_sets_menu.add_command(label=set_name, command=lambda s=set_name: select_custom_set(s))
 
-#Add Season 3 and Levels to the menu
-submenu_s3 = Menu(menu, tearoff=0)
-for level in ["Intermediate", "Advanced", "All"]:
-        submenu_s3.add_command(label=level, command=lambda s="Season 3", l=level: select_voltaic_challenge(s, l))
-menu.add_cascade(label="Season 3", menu=submenu_s3)
+    # Set to store selected custom sets
+    selected_custom_sets = set()
 
-# Add Seasons and Levels to the menu
-for season in ["Season 4", "Season 5"]:
-    submenu = Menu(menu, tearoff=0)
-    for level in ["Novice", "Intermediate", "Advanced", "All"]:
-        submenu.add_command(label=level, command=lambda s=season, l=level: select_voltaic_challenge(s, l))
-    menu.add_cascade(label=season, menu=submenu)
+    # Load and display the previously selected stats folders if available
+    show_stats_folders()
 
-menu_button.pack(side=tk.LEFT, padx=5)
+    # Create checkboxes to toggle Personal Best graph, Normalize graph, and Aggregate graph
+    checkbox_frame = tk.Frame(root)
+    checkbox_frame.pack(pady=10)
 
-# Create a menu button for Custom Sets
-custom_sets_menu_button = tk.Menubutton(search_frame, text="Custom Sets", relief=tk.RAISED)
-custom_sets_menu = Menu(custom_sets_menu_button, tearoff=0)
-custom_sets_menu_button.config(menu=custom_sets_menu)
+    show_pb_checkbox = tk.Checkbutton(checkbox_frame, text="Graph Personal Bests", variable=show_pb_var, command=on_plot_option_changed)
+    show_pb_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Add an option to add a new set
-custom_sets_menu.add_command(label="Add Set", command=add_custom_set)
-custom_sets_menu.add_command(label="Modify or Delete Set", command=modify_or_delete_custom_set)
-custom_sets_menu_button.pack(side=tk.LEFT, padx=5)
+    normalize_checkbox = tk.Checkbutton(checkbox_frame, text="Normalize", variable=normalize_var, command=on_plot_option_changed)
+    normalize_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Button to clear selected benchmarks
-clear_button = tk.Button(search_frame, text="Clear Benchmarks", command=clear_benchmarks)
-clear_button.pack(side=tk.LEFT, padx=5)
+    aggregate_checkbox = tk.Checkbutton(checkbox_frame, text="Aggregate", variable=aggregate_var, command=on_aggregate_toggled)
+    aggregate_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Label to display selected benchmarks below the benchmarks button
-selected_benchmarks_label = tk.Label(root, text="Selected Benchmarks: None")
-selected_benchmarks_label.pack(pady=5)
+    # Granularity of the aggregate line
+    aggregate_period_menu = tk.OptionMenu(checkbox_frame, aggregate_period_var, *AGGREGATE_PERIODS, command=lambda period: on_plot_option_changed())
+    aggregate_period_menu.pack(side=tk.LEFT)
 
-# Create a listbox to display challenges
-challenge_listbox = tk.Listbox(root, selectmode=tk.MULTIPLE, height=10)
-challenge_listbox.pack(pady=10, fill=tk.BOTH, expand=True)
+    # With folders from several players, draw each player's lines separately
+    compare_players_var = tk.BooleanVar()
+    compare_players_checkbox = tk.Checkbutton(checkbox_frame, text="Compare Players", variable=compare_players_var, command=on_plot_option_changed)
+    compare_players_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Set to store selected season-level pairs
-selected_pairs = set()
+    # What to plot, and whether to mark sensitivity and FOV changes found by deep ingest
+    metric_var = tk.StringVar(value='Score')
+    metric_menu = tk.OptionMenu(checkbox_frame, metric_var, *PLOT_METRICS, command=lambda metric: on_plot_option_changed())
+    metric_menu.pack(side=tk.LEFT, padx=5)
 
-# Dictionary to store custom sets and their challenges
-custom_sets = load_custom_sets('custom_sets.json')
+    mark_setup_changes_var = tk.BooleanVar()
+    mark_setup_changes_checkbox = tk.Checkbutton(checkbox_frame, text="Mark Setup Changes", variable=mark_setup_changes_var, command=on_plot_option_changed)
+    mark_setup_changes_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Populate the custom sets menu with existing sets
-for set_name in custom_sets:
-    custom_sets_menu.add_command(label=set_name, command=lambda s=set_name: select_custom_set(s))
+    # Plot scores by date, by play session, or by attempt within a session
+    x_axis_var = tk.StringVar(value="Date")
+    x_axis_menu = tk.OptionMenu(checkbox_frame, x_axis_var, *X_AXIS_CHOICES, command=lambda x_axis: on_plot_option_changed())
+    x_axis_menu.pack(side=tk.LEFT, padx=5)
 
-# Set to store selected custom sets
-selected_custom_sets = set()
+    # Trend line drawn in place of the raw scores, and its window
+    smoothing_var = tk.StringVar(value="No Smoothing")
+    smoothing_menu = tk.OptionMenu(checkbox_frame, smoothing_var, *SMOOTHING_CHOICES, command=lambda smoothing: on_plot_option_changed())
+    smoothing_menu.pack(side=tk.LEFT, padx=5)
 
-# Load and display the previously selected directory path if available
-initial_directory_path = load_directory_path()
-if initial_directory_path:
-    filepath_label.config(text=f"Selected Path: {initial_directory_path}")
-    update_challenge_list(initial_directory_path)
+    smoothing_window_var = tk.StringVar(value=str(DEFAULT_SMOOTHING_WINDOW))
+    smoothing_window_spinbox = tk.Spinbox(checkbox_frame, from_=1, to=1000, width=4, textvariable=smoothing_window_var, command=on_plot_option_changed)
+    smoothing_window_spinbox.bind('<Return>', lambda event: on_plot_option_changed())
+    smoothing_window_spinbox.pack(side=tk.LEFT)
 
-# Create checkboxes to toggle Personal Best graph, Normalize graph, and Aggregate graph
-checkbox_frame = tk.Frame(root)
-checkbox_frame.pack(pady=10)
+    smoothing_unit_var = tk.StringVar(value='attempts')
+    smoothing_unit_menu = tk.OptionMenu(checkbox_frame, smoothing_unit_var, *SMOOTHING_UNITS, command=lambda unit: on_plot_option_changed())
+    smoothing_unit_menu.pack(side=tk.LEFT)
 
-show_pb_checkbox = tk.Checkbutton(checkbox_frame, text="Graph Personal Bests", variable=show_pb_var)
-show_pb_checkbox.pack(side=tk.LEFT, padx=5)
+    # Checkboxes for watch mode: pick up new sheets while playing and redraw the plot
+    watch_folder_var = tk.BooleanVar()
+    refresh_plot_var = tk.BooleanVar(value=True)
 
-normalize_checkbox = tk.Checkbutton(checkbox_frame, text="Normalize", variable=normalize_var)
-normalize_checkbox.pack(side=tk.LEFT, padx=5)
+    watch_folder_checkbox = tk.Checkbutton(checkbox_frame, text="Watch for New Sheets", variable=watch_folder_var, command=toggle_watch_folder)
+    watch_folder_checkbox.pack(side=tk.LEFT, padx=5)
 
-aggregate_checkbox = tk.Checkbutton(checkbox_frame, text="Aggregate", variable=aggregate_var, command=on_aggregate_toggled)
-aggregate_checkbox.pack(side=tk.LEFT, padx=5)
+    refresh_plot_checkbox = tk.Checkbutton(checkbox_frame, text="Refresh Plot", variable=refresh_plot_var)
+    refresh_plot_checkbox.pack(side=tk.LEFT, padx=5)
 
-# Create a button to plot the scores
-plot_button = tk.Button(root, text="Plot Scores", command=on_plot_scores)
-plot_button.pack(pady=10)
+    # Create a button to plot the scores
+    plot_button = tk.Button(root, text="Plot Scores", command=on_plot_scores)
+    plot_button.pack(pady=10)
 
-# Frame for Points of Interest
-poi_frame = tk.Frame(root)
-poi_frame.pack(pady=10)
+    # Frame for Points of Interest
+    poi_frame = tk.Frame(root)
+    poi_frame.pack(pady=10)
 
-# Create a listbox to display points of interest
-points_of_interest_listbox = Listbox(poi_frame, selectmode=tk.MULTIPLE, height=5)
-points_of_interest_listbox.pack(side=tk.LEFT, padx=5, pady=10, fill=tk.BOTH, expand=True)
+    # Create a listbox to display points of interest
+    points_of_interest_listbox = Listbox(poi_frame, selectmode=tk.MULTIPLE, height=5)
+    points_of_interest_listbox.pack(side=tk.LEFT, padx=5, pady=10, fill=tk.BOTH, expand=True)
 
-# Button to add a new point of interest
-add_poi_button = tk.Button(poi_frame, text="Add Point of Interest", command=add_point_of_interest)
-add_poi_button.pack(side=tk.LEFT, padx=5, pady=10)
+    # Button to add a new point of interest
+    add_poi_button = tk.Button(poi_frame, text="Add Point of Interest", command=add_point_of_interest)
+    add_poi_button.pack(side=tk.LEFT, padx=5, pady=10)
 
-# Button to delete selected points of interest
-delete_poi_button = tk.Button(poi_frame, text="Delete Point of Interest", command=delete_point_of_interest)
-delete_poi_button.pack(side=tk.LEFT, padx=5, pady=10)
+    # Button to delete selected points of interest
+    delete_poi_button = tk.Button(poi_frame, text="Delete Point of Interest", command=delete_point_of_interest)
+    delete_poi_button.pack(side=tk.LEFT, padx=5, pady=10)
 
-# Update the points of interest listbox
-update_points_of_interest_listbox()
+    # Update the points of interest listbox
+    update_points_of_interest_listbox()
 
-# Run the main event loop
-root.mainloop()
\ No newline at end of file
+    # Run the main event loop
+    root.mainloop()
@@ -0,0 +1,48 @@
+# Benchmark: bulk stat sheet ingestion scaling from 1 to N workers.
+#
+#   python benchmarks/bench_ingest.py --sheets 20000 --kills 200 --pool process
+#
+# Writes a synthetic stats folder and times load_stat_sheets with each worker count.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import load_stat_sheets
+from bench_parse import write_sheet
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bulk ingestion scaling")
+    parser.add_argument('--sheets', type=int, default=20000)
+    parser.add_argument('--kills', type=int, default=200)
+    parser.add_argument('--pool', choices=['process', 'thread'], default='process')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= args.max_workers:
+        worker_counts.append(worker_counts[-1] * 2)
+    if worker_counts[-1] != args.max_workers:
+        worker_counts.append(args.max_workers)
+
+    with tempfile.TemporaryDirectory() as directory_path:
+        for index in range(args.sheets):
+            write_sheet(directory_path, index, args.kills)
+
+        print(f"{args.sheets} sheets, {args.kills} kills per sheet, {args.pool} pool")
+        print(f"{'workers':>8}{'seconds':>10}{'sheets/s':>12}{'speedup':>10}")
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            df = load_stat_sheets(directory_path, workers=workers, pool=args.pool)
+            elapsed = time.perf_counter() - start
+            assert len(df) == args.sheets
+            baseline = baseline or elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{args.sheets / elapsed:>12.0f}{baseline / elapsed:>10.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# Micro-benchmark: streaming summary parser vs. the old whole-file regex parser.
+#
+#   python benchmarks/bench_parse.py --sheets 200 --kills 500
+#
+# Writes synthetic Kovaak's stat sheets to a temporary folder and reports the
+# average bytes read and parse time per sheet for both parsers.
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import parse_stat_sheet, read_sheet_summary
+
+def legacy_parse_stat_sheet(file_path):
+    # parse_stat_sheet before the streaming parser, kept here for comparison
+    with open(file_path, 'r') as file:
+        data = file.read()
+
+    challenge_start_match = re.search(r'Challenge Start:,(.*?)\n', data)
+    scenario_match = re.search(r'Scenario:,(.*?)\n', data)
+    score_match = re.search(r'Score:,(.*?)\n', data)
+
+    if not (challenge_start_match and scenario_match and score_match):
+        return None, None, None
+
+    challenge_start = challenge_start_match.group(1).strip()
+    scenario = scenario_match.group(1).strip()
+    score = float(score_match.group(1).strip())
+
+    try:
+        challenge_time = datetime.strptime(challenge_start, '%H:%M:%S.%f').time()
+    except:
+        return None, False, None
+
+    modification_time = os.path.getmtime(file_path)
+    challenge_date = datetime.fromtimestamp(modification_time).date()
+    return datetime.combine(challenge_date, challenge_time), scenario, score
+
+def write_sheet(directory_path, index, kills):
+    scenario = f"Benchmark Scenario {index % 10}"
+    lines = ["Kill #,Timestamp,Bot,Weapon,TTK,Shots,Hits,Accuracy,Damage Done,Damage Possible,Efficiency,Cheated,OverShots"]
+    for kill in range(kills):
+        lines.append(f"{kill + 1},12:00:{kill % 60:02d}.000,Bot,pistol,0.5s,3,2,0.666667,200.0,300.0,0.666667,false,0")
+    lines += [
+        "",
+        "Weapon,Shots,Hits,Damage Done,Damage Possible,,Sens Scale,Horiz Sens,Vert Sens,FOV,Hide Gun,Crosshair,Crosshair Scale,Crosshair Color,ADS Sens,ADS Zoom Scale",
+        f"pistol,{kills * 3},{kills * 2},{kills * 200}.0,{kills * 300}.0,,Valorant,0.3,0.3,103.0,true,default.png,1.0,FFFFFF,1.0,1.0",
+        "",
+        f"Kills:,{kills}",
+        "Deaths:,0",
+        "Fight Time:,60.0",
+        "Avg TTK:,0.5",
+        f"Score:,{500 + index % 400}.0",
+        f"Scenario:,{scenario}",
+        "Game Version:,3.4.1",
+        "Challenge Start:,12:00:00.000",
+        "Sens Scale:,Valorant",
+        "Horiz Sens:,0.3",
+        "FOV:,103.0",
+        "",
+    ]
+    filename = f"{scenario} - Challenge - 2024.01.01-12.01.{index % 60:02d} Stats.csv"
+    with open(os.path.join(directory_path, f"{index:06d} {filename}"), 'w') as file:
+        file.write('\n'.join(lines))
+
+def time_parser(parser, paths):
+    start = time.perf_counter()
+    for path in paths:
+        parser(path)
+    return (time.perf_counter() - start) / len(paths)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare stat sheet parsers")
+    parser.add_argument('--sheets', type=int, default=200)
+    parser.add_argument('--kills', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory_path:
+        for index in range(args.sheets):
+            write_sheet(directory_path, index, args.kills)
+        paths = [entry.path for entry in os.scandir(directory_path)]
+
+        # Sanity check that both parsers agree before timing them. The legacy parser dates
+        # every run by the file's mtime, so only the time of day has to match.
+        for path in paths[:10]:
+            (legacy_start, *legacy_rest), (start, *rest) = legacy_parse_stat_sheet(path), parse_stat_sheet(path)
+            assert legacy_start.time() == start.time() and legacy_rest == rest, path
+
+        legacy_bytes = sum(os.path.getsize(path) for path in paths) / len(paths)
+        streaming_bytes = sum(read_sheet_summary(path)[1] for path in paths) / len(paths)
+        legacy_time = time_parser(legacy_parse_stat_sheet, paths)
+        streaming_time = time_parser(parse_stat_sheet, paths)
+
+    print(f"{args.sheets} sheets, {args.kills} kills per sheet")
+    print(f"{'parser':<12}{'bytes/sheet':>14}{'us/sheet':>12}")
+    print(f"{'legacy':<12}{legacy_bytes:>14.0f}{legacy_time * 1e6:>12.1f}")
+    print(f"{'streaming':<12}{streaming_bytes:>14.0f}{streaming_time * 1e6:>12.1f}")
+    print(f"speedup: {legacy_time / streaming_time:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Benchmark: plot data preparation, vectorized pipeline vs. the old per-challenge loop.
+#
+#   python benchmarks/bench_pipeline.py --rows 1000000 --challenges 500
+#
+# Builds a random attempt DataFrame, checks both implementations produce the same
+# series, and times every PB / Normalize / Aggregate combination.
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import prepare_plot_data
+
+def legacy_prepare_plot_data(df, selected_challenges, show_pb=False, normalize=False, aggregate=False):
+    # The data preparation from plot_scores_for_challenges before it was vectorized,
+    # with the plt calls replaced by collecting the same series
+    df = df.sort_values(by='Datetime')
+    lines = []
+    starts = []
+    if aggregate:
+        df['Date'] = df['Datetime'].dt.date
+        if show_pb:
+            df['Score'] = df.groupby('Challenge')['Score'].cummax()
+        if normalize:
+            df['Score'] = df.groupby('Challenge')['Score'].transform(lambda x: x / x.max() if x.max() != 0 else x)
+        aggregated_scores = df.groupby('Date')['Score'].mean()
+        if show_pb:
+            aggregated_scores = aggregated_scores.cummax()
+        lines.append(('Aggregate', aggregated_scores.index, aggregated_scores.values))
+        for challenge in selected_challenges:
+            first_occurrence = df[df['Challenge'] == challenge]['Datetime'].min()
+            if pd.notnull(first_occurrence):
+                starts.append((f'Start {challenge}', first_occurrence))
+    else:
+        for challenge in selected_challenges:
+            df_challenge = df[df['Challenge'] == challenge].copy()
+            if normalize:
+                max_score = df_challenge['Score'].max()
+                df_challenge.loc[:, 'Score'] = df_challenge['Score'] / max_score if max_score != 0 else df_challenge['Score']
+            if show_pb:
+                lines.append((f'{challenge} (PB)', df_challenge['Datetime'], df_challenge['Score'].cummax()))
+            else:
+                lines.append((challenge, df_challenge['Datetime'], df_challenge['Score']))
+    return {'lines': lines, 'starts': starts}
+
+def make_attempts(rows, challenges, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2022-01-01T00:00:00', 'us')
+    offsets = np.sort(rng.integers(0, 3 * 365 * 24 * 3600, rows)) * 1_000_000
+    return pd.DataFrame({
+        'Datetime': start + offsets.astype('timedelta64[us]'),
+        'Challenge': [f'Scenario {code}' for code in rng.integers(0, challenges, rows)],
+        'Score': rng.uniform(100, 1000, rows),
+    })
+
+def assert_same(expected, actual):
+    assert [label for label, _, _ in expected['lines']] == [label for label, _, _ in actual['lines']]
+    for (_, _, expected_y), (_, _, actual_y) in zip(expected['lines'], actual['lines']):
+        np.testing.assert_allclose(np.asarray(expected_y, dtype=float), actual_y)
+    assert [(label, pd.Timestamp(x)) for label, x in expected['starts']] == [(label, pd.Timestamp(x)) for label, x in actual['starts']]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare plot data preparation")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--challenges', type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_attempts(args.rows, args.challenges)
+    selected_challenges = [f'Scenario {code}' for code in range(args.challenges)]
+
+    print(f"{args.rows} attempts, {args.challenges} selected challenges")
+    print(f"{'pb':>6}{'norm':>6}{'agg':>6}{'legacy s':>10}{'vector s':>10}{'speedup':>9}")
+    for show_pb, normalize, aggregate in itertools.product([False, True], repeat=3):
+        start = time.perf_counter()
+        expected = legacy_prepare_plot_data(df, selected_challenges, show_pb, normalize, aggregate)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = prepare_plot_data(df, selected_challenges, show_pb, normalize, aggregate)
+        vector_time = time.perf_counter() - start
+
+        assert_same(expected, actual)
+        print(f"{show_pb!s:>6}{normalize!s:>6}{aggregate!s:>6}{legacy_time:>10.2f}{vector_time:>10.2f}{legacy_time / vector_time:>9.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Benchmark: a season's rank over time from one sweep over its attempts vs. re-ranking after each.
+#
+#   python benchmarks/bench_ranks.py --attempts 200000 --season "Season 5"
+#
+# voltaic_ranks.json ships without ranks or thresholds, so every level gets made-up rank names
+# and every scenario made-up rising thresholds.
+# Checks the sweep against a loop that keeps each scenario's PB and recomputes the season rank
+# after every attempt (on the first --check attempts), and times a cached lookup.
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import ScoreStore, DerivedSeriesCache
+from stattrack_ranks import RANKS_FILE, SeasonRanks, rank_timeline, prepare_rank_plot_data
+
+def made_up_season(season, rng):
+    with open(RANKS_FILE, 'r') as file:
+        levels = json.load(file)[season]
+    for name, level in levels.items():
+        level['ranks'] = [f"{name} {rank}" for rank in range(1, 5)]
+        for scenario in level['thresholds']:
+            level['thresholds'][scenario] = np.sort(rng.choice(np.arange(100, 1000, 25), len(level['ranks']), replace=False)).tolist()
+    return SeasonRanks(season, levels)
+
+def loop_timeline(times, challenges, scores, season_ranks):
+    # The straightforward version: after each attempt, rank every scenario's PB again
+    best = {}
+    values = []
+    for challenge, score in zip(challenges, scores):
+        best[challenge] = max(best.get(challenge, -np.inf), score)
+        level_energies = np.zeros(len(season_ranks.levels))
+        for slot, scenario in enumerate(season_ranks.scenarios):
+            if scenario in best:
+                level = season_ranks.slot_levels[slot]
+                energy = season_ranks.energy(np.array([slot]), np.array([best[scenario]]))[0]
+                level_energies[level] += energy / season_ranks.level_sizes[level]
+        values.append(season_ranks.season_value(level_energies[None, :])[0])
+    return np.array(values)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time benchmark rank timelines")
+    parser.add_argument('--attempts', type=int, default=200_000)
+    parser.add_argument('--season', default='Season 5')
+    parser.add_argument('--check', type=int, default=2000, help='Attempts to check against the loop')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    season_ranks = made_up_season(args.season, rng)
+    scenarios = list(dict.fromkeys(season_ranks.scenarios))
+    start = np.datetime64('2022-01-01T00:00:00', 'ns')
+    times = start + np.sort(rng.integers(0, 3 * 365 * 86400, args.attempts)).astype('timedelta64[s]')
+    challenges = rng.choice(scenarios, args.attempts)
+    scores = rng.uniform(0, 1100, args.attempts) * np.linspace(0.3, 1, args.attempts)
+    store = ScoreStore()
+    store.append(times, list(challenges), scores)
+
+    start_time = time.perf_counter()
+    rank_times, values = rank_timeline(store, season_ranks)
+    sweep_time = time.perf_counter() - start_time
+
+    checked = slice(0, args.check)
+    check_store = ScoreStore()
+    check_store.append(times[checked], list(challenges[checked]), scores[checked])
+    start_time = time.perf_counter()
+    expected = loop_timeline(times[checked], challenges[checked], scores[checked], season_ranks)
+    loop_time = time.perf_counter() - start_time
+    check_times, check_values = rank_timeline(check_store, season_ranks)
+    rows = np.searchsorted(times[checked].astype('datetime64[ns]'), check_times, side='right') - 1
+    np.testing.assert_allclose(check_values, expected[rows], atol=1e-9)
+
+    print(f"{args.season}: {len(season_ranks.scenarios)} scenarios, {args.attempts} attempts, {len(values)} progress changes")
+    print(f"sweep: {sweep_time:.3f} s; loop: {loop_time:.3f} s for {args.check} attempts "
+          f"(~{loop_time * args.attempts / args.check:.0f} s for all)")
+
+    cache = DerivedSeriesCache()
+    prepare_rank_plot_data(store, cache, [season_ranks])
+    start_time = time.perf_counter()
+    prepare_rank_plot_data(store, cache, [season_ranks])
+    print(f"cached plot data: {(time.perf_counter() - start_time) * 1000:.2f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Benchmark: aggregate view from raw attempts vs. the ScoreStore's daily rollup.
+#
+#   python benchmarks/bench_rollup.py --rows 1000000 --challenges 500
+#
+# Checks both paths give the same aggregate line, times each PB / Normalize
+# combination and period, and times adding a session's worth of new attempts.
+import argparse
+import itertools
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_pipeline import make_attempts, assert_same
+from stattrack_core import ScoreStore, DerivedSeriesCache, AGGREGATE_PERIODS, prepare_plot_data, prepare_plot_data_from_store
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare aggregate plot preparation")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--challenges', type=int, default=500)
+    args = parser.parse_args()
+
+    df = make_attempts(args.rows, args.challenges)
+    selected_challenges = [f'Scenario {code}' for code in range(args.challenges)]
+    start = time.perf_counter()
+    store = ScoreStore()
+    store.append(df['Datetime'], df['Challenge'], df['Score'])
+    print(f"{args.rows} attempts, {args.challenges} selected challenges, store and rollup built in {time.perf_counter() - start:.2f} s")
+
+    print(f"{'pb':>6}{'norm':>6}{'raw s':>8}{'rollup s':>10}{'speedup':>9}")
+    for show_pb, normalize in itertools.product([False, True], repeat=2):
+        start = time.perf_counter()
+        expected = prepare_plot_data(df, selected_challenges, show_pb, normalize, True)
+        raw_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = prepare_plot_data_from_store(store, DerivedSeriesCache(), selected_challenges, show_pb, normalize, True)
+        rollup_time = time.perf_counter() - start
+
+        assert_same(expected, actual)
+        print(f"{show_pb!s:>6}{normalize!s:>6}{raw_time:>8.3f}{rollup_time:>10.4f}{raw_time / rollup_time:>9.1f}")
+
+    for period in AGGREGATE_PERIODS:
+        start = time.perf_counter()
+        prepare_plot_data_from_store(store, DerivedSeriesCache(), selected_challenges, True, True, True, period=period)
+        print(f"aggregate by {period}: {time.perf_counter() - start:.4f} s")
+
+    # A session of new attempts on a few challenges, later than everything already stored
+    rng = np.random.default_rng(1)
+    last_time = df['Datetime'].max()
+    times = last_time + np.sort(rng.integers(1, 3 * 3600, 50)).astype('timedelta64[s]')
+    start = time.perf_counter()
+    store.append(times, [f'Scenario {code}' for code in rng.integers(0, 5, 50)], rng.uniform(100, 1000, 50))
+    print(f"append 50 new attempts (store and rollup): {time.perf_counter() - start:.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# Benchmark: filtering the challenge list, linear scan vs. ChallengeIndex.
+#
+#   python benchmarks/bench_search.py --challenges 20000
+#
+# Times each prefix of a few queries as if typed one key at a time, which is
+# what search-as-you-type does once the debounce delay passes.
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import ChallengeIndex
+
+WORDS = ['Tile', 'Frenzy', 'Close', 'Long', 'Strafe', 'VT', 'Pasu', 'Air', 'Angelic', 'Whisphere',
+         'Smoothbot', 'Voltaic', 'Dynamic', 'Static', 'Ground', 'Skybots', '1w4ts', 'Reload', 'Small', 'Invincible']
+
+QUERIES = ['pasu voltaic', 'whisphere', 'vt angelic 12', 'no such scenario']
+
+def linear_search(challenges, search_text):
+    # The old filter: lowercase every name on every search
+    search_text = search_text.lower()
+    return [challenge for challenge in challenges if search_text in challenge.lower()]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare challenge list filtering")
+    parser.add_argument('--challenges', type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    challenges = []
+    while len(challenges) < args.challenges:
+        challenges.append(' '.join(random.choice(WORDS) for _ in range(random.randint(2, 5))) + f' {len(challenges)}')
+
+    start = time.perf_counter()
+    index = ChallengeIndex(challenges)
+    build_time = time.perf_counter() - start
+    print(f"{args.challenges} challenges, index built in {build_time * 1000:.0f} ms")
+    print(f"{'query':<20}{'linear ms/key':>15}{'index ms/key':>14}")
+
+    for query in QUERIES:
+        prefixes = [query[:length] for length in range(1, len(query) + 1)]
+        start = time.perf_counter()
+        for prefix in prefixes:
+            linear_search(challenges, prefix)
+        linear_time = (time.perf_counter() - start) / len(prefixes)
+        start = time.perf_counter()
+        for prefix in prefixes:
+            index.search(prefix)
+        index_time = (time.perf_counter() - start) / len(prefixes)
+        print(f"{query:<20}{linear_time * 1000:>15.2f}{index_time * 1000:>14.2f}")
+
+if __name__ == '__main__':
+    main()
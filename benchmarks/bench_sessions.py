@@ -0,0 +1,90 @@
+# Benchmark: play-session statistics from a pandas groupby vs. the ScoreStore's session rollup.
+#
+#   python benchmarks/bench_sessions.py --rows 1000000 --challenges 500 --sessions 5000
+#
+# Attempts are clustered into sessions of up to two hours. Checks the rollup's per-session
+# best, mean and attempt count against a groupby over the raw attempts, times the session and
+# warm-up plot data, and times adding a session's worth of new attempts (which extends the
+# rollup) against adding older ones (which segments the whole store again).
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import ScoreStore, SESSION_GAP_MINUTES, prepare_session_plot_data
+
+def make_session_attempts(rows, challenges, sessions, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2022-01-01T00:00:00', 'ns')
+    session_starts = np.sort(rng.choice(3 * 365 * 24, sessions, replace=False)) * 3600 * 10**9
+    offsets = session_starts[rng.integers(0, sessions, rows)] + rng.integers(0, 2 * 3600 * 10**9, rows)
+    return pd.DataFrame({
+        'Datetime': start + np.sort(offsets).astype('timedelta64[ns]'),
+        'Challenge': [f'Scenario {code}' for code in rng.integers(0, challenges, rows)],
+        'Score': rng.uniform(100, 1000, rows),
+    })
+
+def groupby_sessions(df, gap_minutes):
+    # The straightforward version: number the sessions on the sorted times, then group
+    df = df.sort_values('Datetime', kind='stable')
+    session = (df['Datetime'].diff() > pd.Timedelta(minutes=gap_minutes)).cumsum()
+    return df.groupby([df['Challenge'], session])['Score'].agg(['max', 'mean', 'count'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare play-session statistics")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--challenges', type=int, default=500)
+    parser.add_argument('--sessions', type=int, default=5000)
+    args = parser.parse_args()
+
+    df = make_session_attempts(args.rows, args.challenges, args.sessions)
+    start = time.perf_counter()
+    store = ScoreStore()
+    store.append(df['Datetime'], df['Challenge'], df['Score'])
+    print(f"{args.rows} attempts, {len(store.sessions)} sessions, store and rollups built in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    expected = groupby_sessions(df, SESSION_GAP_MINUTES)
+    groupby_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = {challenge: store.session_totals(challenge) for challenge in store.scenarios}
+    rollup_time = time.perf_counter() - start
+    for challenge, (numbers, bests, totals, counts) in actual.items():
+        rows = expected.loc[challenge]
+        np.testing.assert_array_equal(rows.index.to_numpy(), numbers)
+        np.testing.assert_allclose(rows['max'].to_numpy(), bests)
+        np.testing.assert_allclose(rows['mean'].to_numpy(), totals / counts)
+        np.testing.assert_array_equal(rows['count'].to_numpy(), counts)
+    print(f"per-session stats, every challenge: groupby {groupby_time:.3f} s, rollup {rollup_time:.3f} s")
+
+    selected_challenges = store.scenarios[:50]
+    for x_axis in ('session', 'warmup'):
+        for aggregate in (False, True):
+            start = time.perf_counter()
+            prepare_session_plot_data(store, selected_challenges, True, True, aggregate, x_axis=x_axis)
+            print(f"{x_axis} plot, {len(selected_challenges)} challenges{', aggregate' if aggregate else ''}: {time.perf_counter() - start:.4f} s")
+
+    # A session of new attempts on a few challenges, later than everything already stored
+    rng = np.random.default_rng(1)
+    last_time = df['Datetime'].max()
+    times = last_time + np.sort(rng.integers(3600, 3 * 3600, 50)).astype('timedelta64[s]')
+    start = time.perf_counter()
+    store.append(times, [f'Scenario {code}' for code in rng.integers(0, 5, 50)], rng.uniform(100, 1000, 50))
+    print(f"append 50 new attempts (extends the sessions): {time.perf_counter() - start:.3f} s")
+
+    # The same number of attempts from an old stats folder, which renumbers the sessions
+    first_time = df['Datetime'].min()
+    times = first_time + np.sort(rng.integers(3600, 3 * 3600, 50)).astype('timedelta64[s]')
+    start = time.perf_counter()
+    store.append(times, [f'Scenario {code}' for code in rng.integers(0, 5, 50)], rng.uniform(100, 1000, 50))
+    print(f"append 50 older attempts (segments everything again): {time.perf_counter() - start:.3f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+# Benchmark: trend lines on one long-played scenario, full passes vs. extending the cached line.
+#
+#   python benchmarks/bench_smoothing.py --attempts 100000 --window 50
+#
+# Times every smoothing mode over a window of attempts and of days, checks the streaming rolling
+# median against a sliding-window median that sorts every window (O(n w log w)), and times
+# extending each cached line by a session's worth of new attempts.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import ScoreStore, DerivedSeriesCache, SMOOTHING_MODES, Smoothing, smooth_values, smoothed_series
+
+def main():
+    parser = argparse.ArgumentParser(description="Time trend line computation")
+    parser.add_argument('--attempts', type=int, default=100_000)
+    parser.add_argument('--window', type=int, default=50)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--new', type=int, default=50, help='Attempts added after the first pass')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    start = np.datetime64('2022-01-01T00:00:00', 'ns').astype(np.int64)
+    times = start + np.sort(rng.integers(0, 3 * 365 * 86400, args.attempts + args.new)) * 10**9
+    scores = rng.uniform(100, 1000, args.attempts + args.new)
+    old, new = slice(0, args.attempts), slice(args.attempts, None)
+
+    start_time = time.perf_counter()
+    windows = sliding_window_view(scores[old], args.window)
+    expected = np.median(windows, axis=1)
+    sorted_time = time.perf_counter() - start_time
+    actual = smooth_values(times[old], scores[old], Smoothing('median', args.window, 'attempts'))
+    np.testing.assert_allclose(actual[args.window - 1:], expected)
+    print(f"{args.attempts} attempts; median of {args.window} by sorting every window: {sorted_time:.3f} s")
+
+    print(f"{'mode':<8}{'window':>14}{'full s':>9}{'extend ms':>11}")
+    for mode in SMOOTHING_MODES:
+        for smoothing in (Smoothing(mode, args.window, 'attempts'), Smoothing(mode, args.days, 'days')):
+            store = ScoreStore()
+            store.append(times[old].view('datetime64[ns]'), ['Scenario'] * args.attempts, scores[old])
+            cache = DerivedSeriesCache()
+            start_time = time.perf_counter()
+            smoothed_series(store, cache, 'Scenario', smoothing)
+            full_time = time.perf_counter() - start_time
+
+            store.append(times[new].view('datetime64[ns]'), ['Scenario'] * args.new, scores[new])
+            start_time = time.perf_counter()
+            _, extended = smoothed_series(store, cache, 'Scenario', smoothing)
+            extend_time = time.perf_counter() - start_time
+            np.testing.assert_allclose(extended, smooth_values(times, scores, smoothing))
+            print(f"{mode:<8}{f'{smoothing.window} {smoothing.unit}':>14}{full_time:>9.3f}{extend_time * 1000:>11.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Benchmark: memory held by a session's scores, Python lists vs. ScoreStore.
+#
+#   python benchmarks/bench_store.py --sheets 1000000 --challenges 2000
+#
+# Compares the old approach (lists of datetime objects and scenario strings
+# turned into a DataFrame) against the columnar ScoreStore, using tracemalloc.
+# The store's own accounting is broken down into its attempt arrays and the
+# daily and session rollups kept alongside them.
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stattrack_core import ScoreStore
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare in-memory score representations")
+    parser.add_argument('--sheets', type=int, default=1_000_000)
+    parser.add_argument('--challenges', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    scenario_names = [f'Benchmark Scenario {code} Voltaic' for code in range(args.challenges)]
+    scenario_codes = rng.integers(0, args.challenges, args.sheets)
+    minutes = np.sort(rng.integers(0, 3 * 365 * 24 * 60, args.sheets))
+    scores = rng.uniform(100, 1000, args.sheets)
+    start = datetime(2022, 1, 1)
+
+    def build_lists():
+        # Mirrors the old 'data' dict: one datetime and one (copied) string per attempt
+        data = {
+            'Datetime': [start + timedelta(minutes=int(minute)) for minute in minutes],
+            'Challenge': [''.join(scenario_names[code]) for code in scenario_codes],
+            'Score': scores.tolist(),
+        }
+        return data, pd.DataFrame(data)
+
+    def build_store():
+        store = ScoreStore()
+        store.append(
+            np.datetime64('2022-01-01T00:00', 'm') + minutes.astype('timedelta64[m]'),
+            pd.Categorical.from_codes(scenario_codes, categories=scenario_names),
+            scores)
+        return store
+
+    _, list_current, list_peak, list_time = measure(build_lists)
+    store, store_current, store_peak, store_time = measure(build_store)
+
+    print(f"{args.sheets} sheets, {args.challenges} scenarios")
+    print(f"{'representation':<16}{'held MiB':>10}{'peak MiB':>10}{'build s':>9}")
+    print(f"{'lists+DataFrame':<16}{list_current / 2**20:>10.1f}{list_peak / 2**20:>10.1f}{list_time:>9.2f}")
+    print(f"{'ScoreStore':<16}{store_current / 2**20:>10.1f}{store_peak / 2**20:>10.1f}{store_time:>9.2f}")
+    print(f"ScoreStore.memory_usage(): {store.memory_usage() / 2**20:.1f} MiB"
+          f" (arrays {store.arrays_memory_usage() / 2**20:.1f}, daily rollup {store.daily.memory_usage() / 2**20:.1f},"
+          f" session rollup {store.sessions.memory_usage() / 2**20:.1f})")
+
+if __name__ == '__main__':
+    main()
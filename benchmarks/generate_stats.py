@@ -0,0 +1,156 @@
+# Synthetic Kovaak's stats folder generator for benchmarks.
+#
+#   python benchmarks/generate_stats.py out/stats --sheets 10000 --scenarios 200 --days 365
+#
+# Writes sheets in the layout Kovaak's uses (kill table, weapon table, then the
+# "Key:,Value" summary block at the end), named "<Scenario> - Challenge -
+# YYYY.MM.DD-HH.MM.SS Stats.csv" and with their mtime set to the end of the run.
+# Scenario popularity follows a Zipf distribution by default, so a few scenarios
+# get most of the plays as in a real folder; the first scenarios are the Voltaic
+# benchmark names so the benchmark sets select something. The same arguments and
+# seed always produce the same folder.
+import argparse
+import json
+import os
+import random
+from datetime import datetime, timedelta
+
+VOLTAIC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'voltaic_challenges.json')
+
+KILL_HEADER = "Kill #,Timestamp,Bot,Weapon,TTK,Shots,Hits,Accuracy,Damage Done,Damage Possible,Efficiency,Cheated,OverShots"
+WEAPON_HEADER = ("Weapon,Shots,Hits,Damage Done,Damage Possible,,Sens Scale,Horiz Sens,Vert Sens,FOV,Hide Gun,"
+                 "Crosshair,Crosshair Scale,Crosshair Color,ADS Sens,ADS Zoom Scale")
+
+def scenario_names(count):
+    # Voltaic benchmark scenarios first, then made-up ones
+    with open(VOLTAIC_FILE, 'r') as file:
+        voltaic = json.load(file)
+    names = list(dict.fromkeys(
+        challenge for levels in voltaic.values() for challenges in levels.values() for challenge in challenges))
+    names = names[:count]
+    names += [f"Generated Scenario {index:05d}" for index in range(count - len(names))]
+    return names
+
+def scenario_weights(count, distribution, zipf_exponent):
+    if distribution == 'uniform':
+        return [1.0] * count
+    return [1.0 / (rank + 1) ** zipf_exponent for rank in range(count)]
+
+def sheet_lines(scenario, start, duration, score, kills, rng):
+    lines = [KILL_HEADER]
+    kill_time = start
+    for kill in range(kills):
+        kill_time += timedelta(seconds=duration / max(kills, 1))
+        shots = rng.randint(1, 6)
+        hits = rng.randint(1, shots)
+        lines.append(f"{kill + 1},{kill_time.strftime('%H:%M:%S.%f')[:-3]},Bot,pistol,{rng.uniform(0.2, 1.5):.3f}s,"
+                     f"{shots},{hits},{hits / shots:.6f},{hits * 100.0:.1f},{shots * 100.0:.1f},{hits / shots:.6f},false,0")
+    lines += [
+        "",
+        WEAPON_HEADER,
+        f"pistol,{kills * 3},{kills * 2},{kills * 200}.0,{kills * 300}.0,,Valorant,0.3,0.3,103.0,true,default.png,1.0,FFFFFF,1.0,1.0",
+        "",
+        f"Kills:,{kills}",
+        "Deaths:,0",
+        f"Fight Time:,{duration:.3f}",
+        f"Avg TTK:,{duration / max(kills, 1):.6f}",
+        f"Damage Done:,{kills * 200}.0",
+        "Damage Taken:,0.0",
+        "Midairs:,0",
+        "Midaired:,0",
+        "Directs:,0",
+        "Directed:,0",
+        "Distance Traveled:,0.0",
+        f"Score:,{score:.1f}",
+        f"Scenario:,{scenario}",
+        "Hash:,0123456789abcdef0123456789abcdef",
+        "Game Version:,3.4.1.2023-06-01-11-46-00",
+        f"Challenge Start:,{start.strftime('%H:%M:%S.%f')[:-3]}",
+        "Input Lag:,0",
+        "Max FPS (config):,240.0",
+        "Sens Scale:,Valorant",
+        "Horiz Sens:,0.3",
+        "Vert Sens:,0.3",
+        "FOV:,103.0",
+        "Hide Gun:,true",
+        "Crosshair:,default.png",
+        "Crosshair Scale:,1.0",
+        "Crosshair Color:,FFFFFF",
+        "Resolution:,1920x1080",
+        "Avg FPS:,239.9",
+        "Resolution Scale:,100.0",
+        "Pause Count:,0",
+        "Pause Duration:,0.0",
+        "",
+    ]
+    return lines
+
+def generate_stats_folder(directory_path, sheets, scenarios=50, distribution='zipf', zipf_exponent=1.1,
+                          kills=(20, 80), days=365, end_date=datetime(2024, 6, 30), malformed=0.0, seed=0):
+    # Write `sheets` stat sheets spread over the `days` days up to end_date. kills is the
+    # (min, max) size of each kill table; malformed is the fraction of sheets cut off before
+    # their summary block. Returns [(filename, scenario, end time, score)], with None for the
+    # scenario and score of malformed sheets.
+    os.makedirs(directory_path, exist_ok=True)
+    rng = random.Random(seed)
+    names = scenario_names(scenarios)
+    weights = scenario_weights(scenarios, distribution, zipf_exponent)
+    base_scores = [rng.uniform(300, 3000) for _ in names]
+    first_time = end_date - timedelta(days=days)
+
+    # Play times in order, so scores can improve over the folder's history
+    offsets = sorted(rng.uniform(0, days * 86400) for _ in range(sheets))
+    picks = rng.choices(range(scenarios), weights=weights, k=sheets)
+
+    written = []
+    used_names = set()
+    for offset, pick in zip(offsets, picks):
+        scenario = names[pick]
+        duration = rng.choice((30.0, 60.0, 60.0, 60.0, 90.0))
+        end = first_time + timedelta(seconds=offset)
+        start = end - timedelta(seconds=duration)
+        progress = offset / (days * 86400)
+        score = base_scores[pick] * (0.7 + 0.3 * progress) * rng.uniform(0.85, 1.1)
+
+        filename = f"{scenario} - Challenge - {end.strftime('%Y.%m.%d-%H.%M.%S')} Stats.csv"
+        while filename in used_names:
+            # Two runs of one scenario can't end in the same second; nudge the later one
+            end += timedelta(seconds=1)
+            filename = f"{scenario} - Challenge - {end.strftime('%Y.%m.%d-%H.%M.%S')} Stats.csv"
+        used_names.add(filename)
+
+        lines = sheet_lines(scenario, start, duration, score, rng.randint(*kills), rng)
+        is_malformed = rng.random() < malformed
+        if is_malformed:
+            lines = lines[:rng.randint(1, lines.index(WEAPON_HEADER))]
+        file_path = os.path.join(directory_path, filename)
+        with open(file_path, 'w', newline='\n') as file:
+            file.write('\n'.join(lines))
+        mtime = end.timestamp()
+        os.utime(file_path, (mtime, mtime))
+        written.append((filename, None if is_malformed else scenario, end, None if is_malformed else round(score, 1)))
+
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Kovaak's stats folder")
+    parser.add_argument('directory', help='Folder to write the sheets to')
+    parser.add_argument('--sheets', type=int, default=10000)
+    parser.add_argument('--scenarios', type=int, default=200)
+    parser.add_argument('--distribution', choices=['zipf', 'uniform'], default='zipf', help='How plays are spread over scenarios')
+    parser.add_argument('--zipf-exponent', type=float, default=1.1)
+    parser.add_argument('--min-kills', type=int, default=20)
+    parser.add_argument('--max-kills', type=int, default=80)
+    parser.add_argument('--days', type=int, default=365, help='Days of history the sheets are spread over')
+    parser.add_argument('--end-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d'), default=datetime(2024, 6, 30))
+    parser.add_argument('--malformed', type=float, default=0.0, help='Fraction of sheets to truncate')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    written = generate_stats_folder(
+        args.directory, args.sheets, args.scenarios, args.distribution, args.zipf_exponent,
+        (args.min_kills, args.max_kills), args.days, args.end_date, args.malformed, args.seed)
+    print(f"Wrote {len(written)} sheets to {args.directory}")
+
+if __name__ == '__main__':
+    main()
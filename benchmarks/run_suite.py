@@ -0,0 +1,201 @@
+# Benchmark suite: folder discovery, full parse, store loading, plot data preparation and
+# challenge filtering on generated stats folders of several sizes, saved as JSON.
+#
+#   python benchmarks/run_suite.py --sizes 1000 10000 100000 --data-dir benchmarks/data
+#   python benchmarks/run_suite.py --sizes 1000 10000 --compare benchmarks/results/abc1234.json
+#
+# Each size gets its own generated folder (kept under --data-dir so later runs can skip
+# generating it) and a fresh sheet index. Every case reports its best per-call time over
+# --repeat rounds, except the full parse, which can only run cold once. Results go to
+# benchmarks/results/<commit>.json unless --output is given; --compare prints the change
+# against an earlier results file and exits non-zero when a case slowed past --threshold.
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from generate_stats import generate_stats_folder
+from stattrack_core import (
+    ChallengeIndex, DerivedSeriesCache, discover_challenges, load_ingest_settings, load_score_store, open_stats_index,
+    prepare_plot_data_from_store, sort_challenges, update_stats_index,
+)
+
+RESULTS_DIRECTORY = os.path.join('benchmarks', 'results')
+
+# Typed one key at a time, as search-as-you-type sees them
+SEARCH_QUERIES = ['pasu voltaic', 'generated scenario 01', 'vt ww5t', 'no such scenario']
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def best_time(function, repeat, min_round=0.05):
+    # Best per-call time over `repeat` rounds. Quick cases are called in a loop so each
+    # round lasts at least min_round seconds and timer noise doesn't swamp them.
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round or loops >= 10000:
+            break
+        loops *= 10
+    best = elapsed / loops
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            function()
+        best = min(best, (time.perf_counter() - start) / loops)
+    return best
+
+def folder_for(data_directory, sheets, scenarios, seed):
+    # Generate the folder unless a previous run already left an identical one
+    directory_path = os.path.join(data_directory, f'stats_{sheets}_{scenarios}_{seed}')
+    marker = directory_path + '.done'
+    if not os.path.exists(marker):
+        shutil.rmtree(directory_path, ignore_errors=True)
+        start = time.perf_counter()
+        generate_stats_folder(directory_path, sheets, scenarios, seed=seed)
+        print(f"  generated {sheets} sheets in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        with open(marker, 'w'):
+            pass
+    return directory_path
+
+def run_size(directory_path, index_path, repeat):
+    results = {}
+
+    results['discover_challenges'] = best_time(lambda: discover_challenges(directory_path), repeat)
+    challenges = sort_challenges(discover_challenges(directory_path))
+
+    conn = open_stats_index(index_path)
+    try:
+        start = time.perf_counter()
+        update_stats_index(conn, directory_path)
+        results['full_parse'] = time.perf_counter() - start
+        results['rescan_unchanged'] = best_time(lambda: update_stats_index(conn, directory_path), repeat)
+
+        results['load_store'] = best_time(lambda: load_score_store(conn, directory_path), repeat)
+        store = load_score_store(conn, directory_path)
+    finally:
+        conn.close()
+
+    selections = {
+        'single': challenges[:1],
+        'many': challenges[:50],
+    }
+    for name, selected in selections.items():
+        results[f'plot_{name}'] = best_time(
+            lambda: prepare_plot_data_from_store(store, DerivedSeriesCache(), selected, True, True, False), repeat)
+    results['plot_aggregate'] = best_time(
+        lambda: prepare_plot_data_from_store(store, DerivedSeriesCache(), challenges[:50], True, True, True), repeat)
+    cache = DerivedSeriesCache()
+    prepare_plot_data_from_store(store, cache, challenges[:50], True, True, False)
+    results['plot_many_cached'] = best_time(
+        lambda: prepare_plot_data_from_store(store, cache, challenges[:50], True, True, False), repeat)
+
+    results['challenge_index_build'] = best_time(lambda: ChallengeIndex(challenges), repeat)
+    challenge_index = ChallengeIndex(challenges)
+
+    def type_queries():
+        for query in SEARCH_QUERIES:
+            for length in range(1, len(query) + 1):
+                challenge_index.search(query[:length])
+
+    keystrokes = sum(len(query) for query in SEARCH_QUERIES)
+    results['filter_per_keystroke'] = best_time(type_queries, repeat) / keystrokes
+
+    results['challenges'] = len(challenges)
+    results['attempts'] = len(store)
+    return results
+
+def compare(old_results, new_results, threshold, min_change=1e-4):
+    # Print old and new times per case and return the cases that got slower by more than
+    # threshold (and by at least min_change seconds, so sub-millisecond jitter isn't flagged)
+    regressions = []
+    print(f"{'sheets':>8}  {'case':<24}{'old ms':>11}{'new ms':>11}{'change':>9}")
+    for size, new_cases in new_results['results'].items():
+        old_cases = old_results['results'].get(size, {})
+        for case, new_value in new_cases.items():
+            old_value = old_cases.get(case)
+            if case in ('challenges', 'attempts') or not old_value:
+                continue
+            change = new_value / old_value - 1
+            regressed = change > threshold and new_value - old_value >= min_change
+            print(f"{size:>8}  {case:<24}{old_value * 1000:>11.3f}{new_value * 1000:>11.3f}{change:>+9.0%}{'  <-' if regressed else ''}")
+            if regressed:
+                regressions.append((size, case, change))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the StatTrack benchmark suite")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Sheets per generated folder')
+    parser.add_argument('--scenarios', type=int, nargs='+', help='Scenarios per folder (default: sheets / 50, at least 50)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--data-dir', help='Keep generated folders here for later runs (default: a temporary folder)')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', metavar='FILE', help='Earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Slowdown reported as a regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    scenario_counts = args.scenarios or [max(50, sheets // 50) for sheets in args.sizes]
+    if len(scenario_counts) != len(args.sizes):
+        parser.error("--scenarios needs one value per size")
+
+    commit = git_commit()
+    workers, pool = load_ingest_settings()
+    report = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ingest_workers': workers,
+        'ingest_pool': pool,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': {},
+    }
+
+    temporary_directory = None if args.data_dir else tempfile.TemporaryDirectory()
+    data_directory = args.data_dir or temporary_directory.name
+    os.makedirs(data_directory, exist_ok=True)
+    try:
+        for sheets, scenarios in zip(args.sizes, scenario_counts):
+            print(f"{sheets} sheets, {scenarios} scenarios", file=sys.stderr)
+            directory_path = folder_for(data_directory, sheets, scenarios, args.seed)
+            with tempfile.TemporaryDirectory() as index_directory:
+                results = run_size(directory_path, os.path.join(index_directory, 'stats_index.db'), args.repeat)
+            report['results'][str(sheets)] = results
+            for case, value in results.items():
+                print(f"  {case:<24}{value * 1000:>12.3f} ms" if isinstance(value, float) else f"  {case:<24}{value:>12}", file=sys.stderr)
+    finally:
+        if temporary_directory is not None:
+            temporary_directory.cleanup()
+
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=4)
+    print(f"Wrote {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            regressions = compare(json.load(file), report, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
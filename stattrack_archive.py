@@ -0,0 +1,109 @@
+import os
+import struct
+import tarfile
+import zipfile
+import zlib
+from collections import namedtuple
+from datetime import datetime
+
+# Reading stat sheets straight out of zip and tar archives of old stats folders, without
+# extracting them. Members of zip files and plain tar files are read by seeking to their
+# recorded offset; compressed tar files can only be read front to back, so their members'
+# contents are read in one pass and carried along with the member.
+
+ZIP_SUFFIXES = ('.zip',)
+SEEKABLE_TAR_SUFFIXES = ('.tar',)
+COMPRESSED_TAR_SUFFIXES = ('.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+ARCHIVE_SUFFIXES = ZIP_SUFFIXES + SEEKABLE_TAR_SUFFIXES + COMPRESSED_TAR_SUFFIXES
+
+TAR_BLOCK_SIZE = 512
+
+# A stat sheet inside an archive. kind is 'zip', 'tar' (seekable) or 'tar-stream' (compressed).
+# offset is where the zip local header or the tar member's data starts; data holds the
+# contents of a compressed tar member once they have been read.
+ArchiveMember = namedtuple('ArchiveMember', 'archive name kind offset size compress_type compressed_size data')
+
+def is_stats_archive(path):
+    return path.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(path)
+
+def archive_kind(archive_path):
+    lowered = archive_path.lower()
+    if lowered.endswith(ZIP_SUFFIXES):
+        return 'zip'
+    if lowered.endswith(SEEKABLE_TAR_SUFFIXES):
+        return 'tar'
+    return 'tar-stream'
+
+def list_archive_members(archive_path, resume_offset=0):
+    # (ArchiveMember, mtime_ns) for every file in the archive. For a plain tar file,
+    # resume_offset skips straight to the first member header after it, which is how an
+    # archive that has only had members appended is listed without re-reading the rest.
+    kind = archive_kind(archive_path)
+    members = []
+    if kind == 'zip':
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                mtime_ns = int(datetime(*info.date_time).timestamp() * 1e9)
+                members.append((ArchiveMember(
+                    archive_path, info.filename, kind, info.header_offset, info.file_size,
+                    info.compress_type, info.compress_size, None), mtime_ns))
+        return members
+
+    with open(archive_path, 'rb') as file:
+        file.seek(resume_offset)
+        with tarfile.open(fileobj=file, mode='r:' if kind == 'tar' else 'r:*') as archive:
+            for info in archive:
+                if info.isfile():
+                    members.append((ArchiveMember(
+                        archive_path, info.name, kind, info.offset_data, info.size, None, info.size, None), int(info.mtime * 1e9)))
+    return members
+
+def tar_member_end(offset, size):
+    # Where the header after a tar member starts: its data is padded to whole blocks
+    return offset + -(-size // TAR_BLOCK_SIZE) * TAR_BLOCK_SIZE
+
+def load_member_data(members):
+    # Read the contents of compressed tar members in a single pass over each archive
+    wanted = {}
+    for member in members:
+        wanted.setdefault(member.archive, {})[member.name] = member
+    loaded = {}
+    for archive_path, by_name in wanted.items():
+        with tarfile.open(archive_path, 'r:*') as archive:
+            for info in archive:
+                member = by_name.get(info.name)
+                if member is not None and info.isfile():
+                    loaded[(archive_path, info.name)] = member._replace(data=archive.extractfile(info).read())
+    return [loaded.get((member.archive, member.name), member) for member in members]
+
+def read_archive_member(member):
+    # The member's contents as bytes
+    if member.data is not None:
+        return member.data
+    try:
+        if member.kind == 'tar':
+            with open(member.archive, 'rb') as file:
+                file.seek(member.offset)
+                return file.read(member.size)
+        if member.kind == 'tar-stream':
+            with tarfile.open(member.archive, 'r:*') as archive:
+                return archive.extractfile(member.name).read()
+
+        if member.compress_type in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            # Go straight to the local header rather than parsing the whole central directory
+            with open(member.archive, 'rb') as file:
+                file.seek(member.offset)
+                header = file.read(30)
+                if header[:4] != b'PK\x03\x04':
+                    raise ValueError("no zip local header at the recorded offset")
+                name_length, extra_length = struct.unpack('<HH', header[26:30])
+                file.seek(name_length + extra_length, os.SEEK_CUR)
+                data = file.read(member.compressed_size)
+            return data if member.compress_type == zipfile.ZIP_STORED else zlib.decompress(data, -15)
+        with zipfile.ZipFile(member.archive) as archive:
+            return archive.read(member.name)
+    except (zlib.error, zipfile.BadZipFile, tarfile.TarError, NotImplementedError, RuntimeError, KeyError) as error:
+        # Raised as ValueError so a bad member counts as an unreadable sheet
+        raise ValueError(f"unreadable archive member: {error}") from None
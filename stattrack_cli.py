@@ -0,0 +1,211 @@
+import argparse
+import os
+import sys
+from datetime import date
+
+from stattrack_core import (
+    AGGREGATE_PERIODS, X_AXIS_MODES, SMOOTHING_MODES, SMOOTHING_UNITS, DEFAULT_SMOOTHING_WINDOW, Smoothing, load_session_gap, load_voltaic_challenges, load_custom_sets, load_points_of_interest,
+    DEEP_INGEST_MODES, load_deep_ingest, open_stats_index, load_challenge_dataset, DerivedSeriesCache, prepare_plot_data_from_store, prepare_player_plot_data, voltaic_levels,
+    voltaic_benchmark_groups, plot_data_to_frame, save_ingest_workers, use_ingest_workers, load_stats_folders, DEFAULT_PLAYER,
+)
+from stattrack_details import DETAIL_METRICS, update_attempt_details, load_attempt_details, prepare_metric_plot_data, load_setup_changes
+from stattrack_ranks import ranks_file_path, load_voltaic_ranks, rank_tables, prepare_rank_plot_data
+from stattrack_profile import profiler
+
+# Headless StatTrack: plot or export scores for a stats folder without opening a window.
+#
+#   python stattrack_cli.py "C:/Kovaaks/stats" --set "Season 5/Advanced" --pb --normalize --aggregate -o s5.png -o s5.csv
+#   python stattrack_cli.py Alice=D:/alice/stats Bob=D:/bob/stats --set "Season 5" --compare-players -o s5.png
+#   python stattrack_cli.py "C:/Kovaaks/stats" --set "Season 5" --ranks -o s5-ranks.png
+#
+# Stats folders can be tagged with a player as PLAYER=FOLDER; with no folders given, the ones
+# registered in the app (its settings.json) are used.
+# Image formats (png, svg, pdf, ...) follow the output file's extension; .csv writes the
+# plotted series. matplotlib is only imported when an image is requested.
+
+APP_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+def parse_stats_folder(value):
+    # "PLAYER=FOLDER" or just "FOLDER", as a (folder, player) pair
+    player, separator, directory_path = value.partition('=')
+    if not separator:
+        return value, DEFAULT_PLAYER
+    return directory_path, player
+
+def resolve_selection(args, voltaic_challenges, custom_sets):
+    # Returns the selected challenges and the start-marker groups for aggregate plots
+    selected_challenges = list(args.challenge)
+    selected_pairs = []
+
+    for benchmark in args.set:
+        season, _, level = benchmark.partition('/')
+        if season not in voltaic_challenges:
+            raise SystemExit(f"Unknown Voltaic season: {season}")
+        for difficulty in voltaic_levels(voltaic_challenges, season, level or "All"):
+            if difficulty not in voltaic_challenges[season]:
+                raise SystemExit(f"Unknown Voltaic level for {season}: {difficulty}")
+            selected_pairs.append((season, difficulty))
+            selected_challenges.extend(voltaic_challenges[season][difficulty])
+
+    for set_name in args.custom_set:
+        if set_name not in custom_sets:
+            raise SystemExit(f"Unknown custom set: {set_name}")
+        selected_challenges.extend(custom_sets[set_name])
+
+    selected_challenges = list(dict.fromkeys(selected_challenges))
+    benchmark_groups = voltaic_benchmark_groups(voltaic_challenges, selected_pairs) if selected_pairs else None
+    return selected_challenges, benchmark_groups
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plot or export Kovaak's scores without the GUI")
+    parser.add_argument('stats_folders', nargs='*', type=parse_stats_folder, metavar='[PLAYER=]FOLDER',
+                        help="Kovaak's stats folders (default: the folders registered in the app)")
+    parser.add_argument('--set', action='append', default=[], metavar='SEASON[/LEVEL]',
+                        help='Voltaic benchmark, e.g. "Season 5" or "Season 5/Advanced"')
+    parser.add_argument('--custom-set', action='append', default=[], metavar='NAME', help="One of the app's custom sets, or one from --custom-sets")
+    parser.add_argument('--challenge', action='append', default=[], metavar='NAME', help='Individual scenario name')
+    parser.add_argument('--pb', action='store_true', help='Graph personal bests')
+    parser.add_argument('--normalize', action='store_true', help='Normalize each challenge to its best score')
+    parser.add_argument('--aggregate', action='store_true', help='Combine the selection into one line')
+    parser.add_argument('--period', choices=AGGREGATE_PERIODS, default='day', help='Granularity of the aggregate line (default: %(default)s)')
+    parser.add_argument('--metric', choices=['score', *DETAIL_METRICS], default='score',
+                        help='What to plot; anything but score is read from the deep-ingest tables (default: %(default)s)')
+    parser.add_argument('--deep-ingest', choices=DEEP_INGEST_MODES,
+                        help='Also parse whole sheets (summary) and their kill tables (kills) into the index (default: the app setting)')
+    parser.add_argument('--mark-setup-changes', action='store_true', help='Mark days the sensitivity or FOV changed')
+    parser.add_argument('--compare-players', action='store_true', help="Draw each player's lines separately")
+    parser.add_argument('--ranks', action='store_true',
+                        help="Plot the --set seasons' benchmark rank over time and print the current ranks")
+    parser.add_argument('--smooth', choices=SMOOTHING_MODES,
+                        help='Draw a trend line instead of the raw scores: rolling median, 75th/90th percentile, or EWMA')
+    parser.add_argument('--window', type=int, default=DEFAULT_SMOOTHING_WINDOW,
+                        help="The trend line's window, or EWMA span or half-life (default: %(default)s)")
+    parser.add_argument('--window-unit', choices=SMOOTHING_UNITS, default='attempts', help='What --window counts (default: %(default)s)')
+    parser.add_argument('--x-axis', choices=X_AXIS_MODES, default='date',
+                        help='Plot scores by date, by play session, or by attempt within a session (default: %(default)s)')
+    parser.add_argument('--session-gap', type=float, metavar='MINUTES',
+                        help='Idle time that ends a play session (default: the app setting)')
+    parser.add_argument('--since', type=date.fromisoformat, metavar='YYYY-MM-DD', help='Only plot attempts from this date on')
+    parser.add_argument('--until', type=date.fromisoformat, metavar='YYYY-MM-DD', help='Only plot attempts up to and including this date')
+    parser.add_argument('-o', '--output', action='append', required=True, metavar='FILE', help='PNG/SVG/PDF image or CSV file')
+    parser.add_argument('--index', help="Sheet index database (default: the app's, stats_index.db next to settings.json)")
+    parser.add_argument('--custom-sets', metavar='FILE', help="Custom sets file (default: the app's custom sets)")
+    parser.add_argument('--points-of-interest', metavar='FILE', help='Points of interest file to mark on the plot')
+    parser.add_argument('--voltaic', default=os.path.join(APP_DIRECTORY, 'voltaic_challenges.json'), help=argparse.SUPPRESS)
+    parser.add_argument('--ranks-file', metavar='FILE', help='Rank thresholds file (default: the one next to settings.json)')
+    parser.add_argument('--workers', type=int, help='Number of workers used to read stat sheets on this run')
+    parser.add_argument('--save', action='store_true', help='Keep --workers as the setting for later runs and the app')
+    parser.add_argument('--profile', metavar='FILE', help='Write a JSON report of where the time went')
+    args = parser.parse_args(argv)
+    profiler.enabled = bool(args.profile)
+
+    if args.workers:
+        use_ingest_workers(args.workers)
+        if args.save:
+            save_ingest_workers(args.workers)
+
+    voltaic_challenges = load_voltaic_challenges(args.voltaic)
+    custom_sets = load_custom_sets(args.custom_sets)
+    points_of_interest = load_points_of_interest(args.points_of_interest) if args.points_of_interest else []
+
+    selected_challenges, benchmark_groups = resolve_selection(args, voltaic_challenges, custom_sets)
+    if not selected_challenges:
+        parser.error("nothing selected; use --set, --custom-set or --challenge")
+    if args.x_axis != 'date' and args.metric != 'score':
+        parser.error("--x-axis session and warmup only plot scores")
+    if args.smooth and (args.x_axis != 'date' or args.metric != 'score'):
+        parser.error("--smooth only applies to scores by date")
+    if args.window < 1:
+        parser.error("--window must be at least 1")
+    if args.ranks:
+        if not args.set or args.custom_set or args.challenge:
+            parser.error("--ranks needs one or more --set seasons and nothing else selected")
+        if args.metric != 'score' or args.x_axis != 'date' or args.smooth or args.compare_players:
+            parser.error("--ranks can't be combined with --metric, --x-axis, --smooth or --compare-players")
+        ranks_file = args.ranks_file or ranks_file_path()
+        try:
+            voltaic_ranks = load_voltaic_ranks(ranks_file)
+        except ValueError as error:
+            parser.error(f"{ranks_file}: {error}")
+        if not voltaic_ranks:
+            parser.error(f"no rank thresholds configured; fill them in in {ranks_file}")
+        seasons = list(dict.fromkeys(benchmark.partition('/')[0] for benchmark in args.set))
+        missing = [season for season in seasons if season not in voltaic_ranks]
+        if missing:
+            parser.error(f"no rank thresholds filled in for {', '.join(missing)} in {ranks_file}")
+        selected_challenges = list(dict.fromkeys(
+            scenario for season in seasons for scenario in voltaic_ranks[season].scenarios))
+
+    stats_folders = args.stats_folders or load_stats_folders()
+    if not stats_folders:
+        parser.error("no stats folder given or registered")
+
+    # Sessions are found from every challenge's attempts, so those need loading in full
+    dataset, unreadable = load_challenge_dataset(
+        stats_folders, selected_challenges if args.x_axis == 'date' else None, index_filename=args.index,
+        session_gap_minutes=args.session_gap or load_session_gap())
+    if dataset.duplicates:
+        print(f"Skipped {dataset.duplicates} duplicate attempt(s)", file=sys.stderr)
+    if unreadable:
+        print(f"Skipped {len(unreadable)} unreadable sheet(s):", file=sys.stderr)
+        for filename, reason in unreadable[:5]:
+            print(f"  {filename}: {reason}", file=sys.stderr)
+        if len(unreadable) > 5:
+            print(f"  ...and {len(unreadable) - 5} more", file=sys.stderr)
+
+    # Metrics other than score, and setup changes, come from the deep-ingest tables, which are
+    # filled in here if the setting (or --deep-ingest) hasn't kept them up to date already
+    deep_ingest = args.deep_ingest or load_deep_ingest()
+    needs_details = args.metric != 'score' or args.mark_setup_changes
+    if deep_ingest != 'off' or needs_details:
+        directory_paths = [directory_path for directory_path, _ in stats_folders]
+        include_kills = deep_ingest == 'kills' or (args.metric != 'score' and DETAIL_METRICS[args.metric][2])
+        conn = open_stats_index(args.index)
+        try:
+            update_attempt_details(conn, directory_paths, include_kills)
+            if args.metric != 'score':
+                with profiler.stage('prepare_plot_data'):
+                    details = load_attempt_details(conn, stats_folders, selected_challenges, DETAIL_METRICS[args.metric][2])
+                    plot_data = prepare_metric_plot_data(
+                        details, selected_challenges, args.metric, args.aggregate, args.since, args.until, args.compare_players)
+            if args.mark_setup_changes:
+                points_of_interest = points_of_interest + load_setup_changes(conn, stats_folders)
+        finally:
+            conn.close()
+
+    if args.ranks:
+        season_ranks_list = [voltaic_ranks[season] for season in seasons]
+        with profiler.stage('prepare_plot_data'):
+            plot_data = prepare_rank_plot_data(dataset.combined, DerivedSeriesCache(), season_ranks_list, args.since, args.until)
+        for season_ranks in season_ranks_list:
+            scenarios, levels, season_rank = rank_tables(dataset.combined, season_ranks)
+            print(f"{season_ranks.season}: {season_rank}")
+            print(levels.to_string(index=False))
+            print(scenarios.to_string(index=False))
+            print()
+    elif args.metric == 'score':
+        prepare, source = prepare_plot_data_from_store, dataset.combined
+        if args.compare_players:
+            prepare, source = prepare_player_plot_data, dataset
+        with profiler.stage('prepare_plot_data'):
+            plot_data = prepare(
+                source, DerivedSeriesCache(), selected_challenges, args.pb, args.normalize, args.aggregate, benchmark_groups,
+                args.period, args.since, args.until, args.x_axis,
+                Smoothing(args.smooth, args.window, args.window_unit) if args.smooth else None)
+
+    for output in args.output:
+        if output.lower().endswith('.csv'):
+            with profiler.stage('write_csv'):
+                plot_data_to_frame(plot_data).to_csv(output, index=False)
+        else:
+            from stattrack_plot import save_scores_plot
+            with profiler.stage('render'):
+                save_scores_plot(output, plot_data, args.normalize and args.metric == 'score', points_of_interest)
+        print(f"Wrote {output}", file=sys.stderr)
+
+    if args.profile:
+        profiler.save_report(args.profile)
+        print(f"Wrote {args.profile}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
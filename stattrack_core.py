@@ -0,0 +1,1698 @@
+import copy
+import json
+import multiprocessing
+import os
+import posixpath
+import re
+import shutil
+import sqlite3
+import sys
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from stattrack_archive import ArchiveMember, is_stats_archive, archive_kind, list_archive_members, load_member_data, read_archive_member, tar_member_end
+from stattrack_profile import profiler, Profiler, DISABLED_PROFILER
+from stattrack_settings import settings
+
+# Core of StatTrack: stat sheet parsing, the sheet index, score loading and plot data
+# preparation. Nothing here imports tkinter or matplotlib, so it can be used headless.
+
+# SQLite index of parsed stat sheets, kept next to settings.json
+STATS_INDEX_FILE = 'stats_index.db'
+
+# Bumped whenever the index layout or the way sheets are parsed changes; an index written
+# by another version is rebuilt from the sheets. 2: dates from filename stamps, error column.
+# 3: archive members and the archives table. 4: start times without a leading zero.
+# 5: zip members' compression, so unchanged archives are read without listing them.
+STATS_INDEX_VERSION = 5
+
+# Default memory budget for the derived-series cache
+DERIVED_CACHE_BYTES = 256 * 2**20
+
+# Size of a NumPy array object apart from its data, which adds up over many small arrays
+NDARRAY_BYTES = sys.getsizeof(np.empty(0))
+
+# Attempts compared on each side of a challenge's recent trend
+TREND_ATTEMPTS = 10
+
+# Granularities the aggregate view can be rolled up to
+AGGREGATE_PERIODS = ('day', 'week', 'month')
+
+# What the plot's x axis shows: the date of each attempt, the play session it was in, or its
+# place within the session (warm-up curves)
+X_AXIS_MODES = ('date', 'session', 'warmup')
+
+# Idle time that ends a play session
+SESSION_GAP_MINUTES = 30
+
+# Attempts per session shown by warm-up curves
+WARMUP_ATTEMPTS = 20
+
+# Trend lines drawn in place of the raw scores: rolling quantiles (the median and upper
+# percentiles) over the last `window` attempts or days, or an exponentially weighted mean
+SMOOTHING_QUANTILES = {'median': 0.5, 'p75': 0.75, 'p90': 0.9}
+SMOOTHING_MODES = (*SMOOTHING_QUANTILES, 'ewma')
+SMOOTHING_UNITS = ('attempts', 'days')
+DEFAULT_SMOOTHING_WINDOW = 20
+
+# A trend line: mode from SMOOTHING_MODES, window size and its unit from SMOOTHING_UNITS. For
+# EWMA the window is the span in attempts, or the half-life in days.
+Smoothing = namedtuple('Smoothing', 'mode window unit')
+
+# Player name for stats folders registered without one
+DEFAULT_PLAYER = 'Me'
+
+# Pool type ('process' or 'thread') used to parse stat sheets when the ingest_pool setting isn't
+# set. Spawned worker processes each import pandas (and, from the app, tkinter and matplotlib)
+# again, which costs more than the parse gains on all but very large folders.
+DEFAULT_INGEST_POOL = 'thread'
+
+# Worker count for this run only (the CLI's --workers), used ahead of the ingest_workers setting
+ingest_workers_override = None
+
+# Deep ingest: off, the whole summary and weapon table of each sheet, or those plus its kill table
+DEEP_INGEST_MODES = ('off', 'summary', 'kills')
+
+# Kovaak's names sheets "<Scenario> - Challenge - YYYY.MM.DD-HH.MM.SS Stats.csv"
+STAT_SHEET_FILENAME_PATTERN = re.compile(r'^(?P<scenario>.+?) - Challenge - (?P<stamp>\d{4}\.\d{2}\.\d{2}-\d{2}\.\d{2}\.\d{2}) Stats\.csv$')
+
+class MalformedSheetError(ValueError):
+    # A stat sheet that can't be read as an attempt; the message says why
+    pass
+
+class IngestCancelled(Exception):
+    # Raised by the ingestion functions when their cancel_event is set
+    pass
+
+def load_voltaic_challenges(filename):
+    with open(filename, 'r') as file:
+        return json.load(file)
+
+def load_custom_sets(filename=None):
+    # The app's custom sets, or the ones in a custom_sets.json-style file
+    if filename is None:
+        return settings.get('custom_sets', {})
+    if os.path.exists(filename):
+        with open(filename, 'r') as file:
+            return json.load(file)
+    return {}
+
+def save_custom_sets(custom_sets):
+    settings.set('custom_sets', custom_sets)
+
+def load_points_of_interest(filename=None):
+    # The app's points of interest, or the ones in a points_of_interest.json-style file
+    if filename is None:
+        return settings.get('points_of_interest', [])
+    if os.path.exists(filename):
+        with open(filename, 'r') as file:
+            return json.load(file)
+    return []
+
+def save_points_of_interest(points_of_interest):
+    settings.set('points_of_interest', points_of_interest)
+
+# Summary fields needed to place a sheet on the plot
+REQUIRED_SUMMARY_FIELDS = ('Challenge Start', 'Scenario', 'Score')
+
+def parse_summary_lines(lines, summary, stop_at_block_start=True):
+    # Kovaak's writes the "Key:,Value" summary block at the end of the sheet,
+    # after the kill and weapon tables, so walk the lines from the bottom up
+    for line in reversed(lines):
+        line = line.strip()
+        key, separator, value = line.partition(':,')
+        if not separator or ',' in key:
+            # Skip trailing blank lines, otherwise we've reached the tables above the summary
+            if stop_at_block_start and (line or summary):
+                return True
+            continue
+        summary.setdefault(key, value.strip())
+    return False
+
+def read_sheet_summary(file_path, fields=REQUIRED_SUMMARY_FIELDS, chunk_size=4096):
+    # Read the summary block from the tail of the file in growing chunks, stopping
+    # as soon as the requested fields are found. Pass fields=None to get every summary field.
+    # Returns the summary dict and the number of bytes read. file_path may also be an ArchiveMember,
+    # which is read whole since compressed members can't be read from the end.
+    summary = {}
+    if isinstance(file_path, ArchiveMember):
+        data = read_archive_member(file_path)
+        lines = data.decode('utf-8', errors='replace').split('\n')
+        parse_summary_lines(lines, summary)
+        if fields is not None and not all(field in summary for field in fields):
+            parse_summary_lines(lines, summary, stop_at_block_start=False)
+        return summary, len(data)
+
+    bytes_read = 0
+    with open(file_path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        position = file.tell()
+        tail = b''
+        while position > 0:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            file.seek(position)
+            tail = file.read(read_size) + tail
+            bytes_read += read_size
+
+            lines = tail.decode('utf-8', errors='replace').split('\n')
+            if position > 0:
+                # The first line may have been cut in half by the chunk boundary
+                lines = lines[1:]
+
+            summary = {}
+            reached_block_start = parse_summary_lines(lines, summary)
+            if fields is not None and all(field in summary for field in fields):
+                return summary, bytes_read
+            if reached_block_start:
+                break
+            chunk_size *= 2
+
+        if fields is not None and not all(field in summary for field in fields):
+            # Unusual layout: fall back to looking for the fields anywhere in the sheet
+            file.seek(0)
+            data = file.read()
+            bytes_read += len(data)
+            parse_summary_lines(data.decode('utf-8', errors='replace').split('\n'), summary, stop_at_block_start=False)
+
+    return summary, bytes_read
+
+def sheet_end_time(filename):
+    # When the run ended, from the "YYYY.MM.DD-HH.MM.SS" stamp in a Kovaak's sheet name, or None
+    match = STAT_SHEET_FILENAME_PATTERN.match(filename)
+    if match is None:
+        return None
+    stamp = match.group('stamp')
+    try:
+        return datetime(int(stamp[0:4]), int(stamp[5:7]), int(stamp[8:10]), int(stamp[11:13]), int(stamp[14:16]), int(stamp[17:19]))
+    except ValueError:
+        # Digits in the right places, but not a real date
+        return None
+
+def sheet_name(file_path):
+    # File name of a sheet on disk or in an archive
+    if isinstance(file_path, ArchiveMember):
+        return posixpath.basename(file_path.name)
+    return os.path.basename(file_path)
+
+def parse_start_time(value):
+    # "HH:MM:SS.fff"; fromisoformat is the fast path, but some sheets drop the hour's leading zero
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.strptime(value, '%H:%M:%S.%f').time()
+    except ValueError:
+        raise MalformedSheetError(f"unreadable challenge start {value!r}") from None
+
+def parse_stat_sheet(file_path, mtime_ns=None, sheet_profiler=DISABLED_PROFILER):
+    # Returns (start datetime, scenario, score), or raises MalformedSheetError. The date comes
+    # from the filename stamp, which survives copying and syncing; the file's mtime (mtime_ns
+    # if the caller already has it) is only used for sheets that have been renamed.
+    with sheet_profiler.stage('sheet_read_summary'):
+        summary, bytes_read = read_sheet_summary(file_path)
+    sheet_profiler.count('bytes_read', bytes_read)
+
+    missing = [field for field in REQUIRED_SUMMARY_FIELDS if field not in summary]
+    if missing:
+        raise MalformedSheetError(f"missing {', '.join(missing)}")
+
+    with sheet_profiler.stage('sheet_parse_fields'):
+        scenario = summary['Scenario']
+        try:
+            score = float(summary['Score'])
+        except ValueError:
+            raise MalformedSheetError(f"unreadable score {summary['Score']!r}") from None
+        start_time = parse_start_time(summary['Challenge Start'])
+
+    with sheet_profiler.stage('sheet_end_time'):
+        end = sheet_end_time(sheet_name(file_path))
+        if end is None:
+            if mtime_ns is None:
+                mtime_ns = os.stat(file_path).st_mtime_ns
+            end = datetime.fromtimestamp(mtime_ns / 1e9)
+
+    start = datetime.combine(end.date(), start_time)
+    if start > end:
+        # Started before midnight and finished after it
+        start -= timedelta(days=1)
+    return start, scenario, score
+
+def parse_stat_sheet_batch(sheets, sheet_profiler=DISABLED_PROFILER):
+    # sheets are (path, mtime_ns or None) pairs. Returns (datetime, scenario, score, error) for
+    # each, where error is None for a readable sheet and says what went wrong otherwise.
+    results = []
+    for file_path, mtime_ns in sheets:
+        try:
+            results.append((*parse_stat_sheet(file_path, mtime_ns, sheet_profiler), None))
+        except (OSError, ValueError) as error:
+            # One bad sheet shouldn't take the rest of the batch down with it
+            results.append((None, None, None, str(error)))
+    return results
+
+def profile_stat_sheet_batch(sheets, parse_batch=parse_stat_sheet_batch):
+    # parse_batch with its own profiler, whose numbers are returned alongside the results so
+    # they make it back from worker processes
+    batch_profiler = Profiler(enabled=True)
+    results = parse_batch(sheets, sheet_profiler=batch_profiler)
+    return results, batch_profiler.snapshot()
+
+def iter_stat_sheet_batches(sheets, workers=1, pool=DEFAULT_INGEST_POOL, batch_size=256, parse_batch=parse_stat_sheet_batch):
+    # Parse (path, mtime_ns) sheets in batches across a thread or process pool, yielding
+    # (batch, results) in input order. parse_batch must be picklable for a process pool and
+    # take a sheet_profiler keyword; its results start with None for sheets that failed.
+    sheets = list(sheets)
+    batches = [sheets[start:start + batch_size] for start in range(0, len(sheets), batch_size)]
+
+    profiled = profiler.enabled
+    if profiled:
+        parse_batch = partial(profile_stat_sheet_batch, parse_batch=parse_batch)
+
+    def collect(results):
+        if profiled:
+            results, snapshot = results
+            profiler.merge(snapshot)
+            profiler.count('sheets_read', len(results))
+            profiler.count('parse_failures', sum(1 for result in results if result[0] is None))
+        return results
+
+    # Not worth paying for pool start-up on a handful of files
+    if workers <= 1 or len(batches) <= 1:
+        for batch in batches:
+            yield batch, collect(parse_batch(batch))
+        return
+
+    if pool == 'process':
+        # Spawned rather than forked: forking a process that has other threads running (a Tk
+        # app, the settings store's save timer) can deadlock the children
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(batches)), mp_context=multiprocessing.get_context('spawn'))
+    else:
+        executor = ThreadPoolExecutor(max_workers=min(workers, len(batches)))
+    try:
+        futures = [executor.submit(parse_batch, batch) for batch in batches]
+        for batch, future in zip(batches, futures):
+            yield batch, collect(future.result())
+    finally:
+        # Drop any batches that haven't started if the caller stopped early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def parse_stat_sheets(sheets, workers=1, pool=DEFAULT_INGEST_POOL, batch_size=256):
+    return [result for _, results in iter_stat_sheet_batches(sheets, workers, pool, batch_size) for result in results]
+
+def load_stat_sheets(directory_path, workers=None, pool=None, batch_size=256):
+    # Parse every sheet in a folder into one DataFrame
+    if workers is None or pool is None:
+        default_workers, default_pool = load_ingest_settings()
+        workers = workers or default_workers
+        pool = pool or default_pool
+
+    with os.scandir(directory_path) as entries:
+        filenames = [entry.name for entry in entries if entry.is_file()]
+    results = parse_stat_sheets(((os.path.join(directory_path, filename), None) for filename in filenames), workers, pool, batch_size)
+
+    data = {
+        'Filename': [],
+        'Datetime': [],
+        'Challenge': [],
+        'Score': []
+    }
+    for filename, (datetime_value, challenge, score, _) in zip(filenames, results):
+        if datetime_value is not None:
+            data['Filename'].append(filename)
+            data['Datetime'].append(datetime_value)
+            data['Challenge'].append(challenge)
+            data['Score'].append(score)
+
+    df = pd.DataFrame(data)
+    df['Datetime'] = pd.to_datetime(df['Datetime'])
+    return df
+
+def stats_index_path():
+    # The index lives next to settings.json so every working directory shares it. One left in the
+    # working directory by older versions is copied over the first time, and left in place.
+    path = os.path.join(os.path.dirname(settings.path()), STATS_INDEX_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not os.path.exists(path) and os.path.exists(STATS_INDEX_FILE):
+        shutil.copyfile(STATS_INDEX_FILE, path)
+    return path
+
+def open_stats_index(filename=None):
+    # filename defaults to stats_index_path()
+    conn = sqlite3.connect(filename or stats_index_path())
+    if conn.execute("PRAGMA user_version").fetchone()[0] != STATS_INDEX_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS sheets")
+            conn.execute("DROP TABLE IF EXISTS archives")
+            conn.execute(f"PRAGMA user_version = {STATS_INDEX_VERSION}")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sheets (
+            directory TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            datetime TEXT,
+            scenario TEXT,
+            score REAL,
+            error TEXT,
+            member_offset INTEGER,
+            member_compress_type INTEGER,
+            member_compressed_size INTEGER,
+            PRIMARY KEY (directory, filename)
+        )
+    """)
+    # Size and mtime of each archive when it was last indexed in full, so an unchanged archive isn't opened
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS archives (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS sheets_scenario ON sheets (directory, scenario)")
+    return conn
+
+def update_stats_index(conn, directory_path, progress=None, cancel_event=None):
+    return update_stats_indexes(conn, [directory_path], progress, cancel_event)
+
+def update_stats_indexes(conn, directory_paths, progress=None, cancel_event=None):
+    # Like update_stats_index for several folders. The changed sheets of every folder go
+    # through the parsing pool together, so folders are read in parallel rather than in turn.
+    # Stats folders may also be zip or tar archives.
+    changed_entries = []
+    removed = 0
+    archive_stamps = []
+    for directory_path in directory_paths:
+        if is_stats_archive(directory_path):
+            folder_entries, folder_removed, stamp = scan_stats_archive(conn, directory_path)
+            if stamp is not None:
+                archive_stamps.append(stamp)
+        else:
+            folder_entries, folder_removed = scan_stats_folder(conn, directory_path)
+        changed_entries += folder_entries
+        removed += folder_removed
+    index_stat_sheets(conn, changed_entries, progress, cancel_event)
+
+    # Only now is every member of those archives in the index
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO archives VALUES (?, ?, ?)", archive_stamps)
+    return len(changed_entries), removed
+
+def scan_stats_archive(conn, archive_path):
+    # scan_stats_folder for an archive. Also returns the archive's (path, size, mtime_ns) to record
+    # once its members are indexed, or None if it hasn't changed since it last was.
+    archive_path = os.path.abspath(archive_path)
+    stat = os.stat(archive_path)
+    recorded = archive_stamp(conn, archive_path)
+    if recorded == (stat.st_size, stat.st_mtime_ns):
+        return [], 0, None
+
+    with profiler.stage('index_lookup'):
+        known = {
+            filename: (size, mtime_ns, member_offset)
+            for filename, size, mtime_ns, member_offset in conn.execute(
+                "SELECT filename, size, mtime_ns, member_offset FROM sheets WHERE directory = ?", (archive_path,))
+        }
+
+    with profiler.stage('scan_archive'):
+        # A plain tar file that has only grown has had members appended (tar -r), so listing
+        # can start after the last member already indexed
+        resume_offset = 0
+        if archive_kind(archive_path) == 'tar' and recorded is not None and stat.st_size > recorded[0] and known:
+            resume_offset = max(tar_member_end(member_offset, size) for size, _, member_offset in known.values())
+        try:
+            members = list_archive_members(archive_path, resume_offset)
+        except Exception:
+            if not resume_offset:
+                raise
+            resume_offset = 0
+            members = list_archive_members(archive_path)
+
+    changed_entries = [
+        (archive_path, member.name, member, member.size, mtime_ns)
+        for member, mtime_ns in members
+        if known.get(member.name) != (member.size, mtime_ns, member.offset)
+    ]
+    if archive_kind(archive_path) == 'tar-stream' and changed_entries:
+        # Compressed members can't be seeked to, so read the changed ones now in a single pass
+        loaded = load_member_data([member for _, _, member, _, _ in changed_entries])
+        changed_entries = [entry[:2] + (member,) + entry[3:] for entry, member in zip(changed_entries, loaded)]
+    profiler.count('files_listed', len(members))
+
+    removed = []
+    if not resume_offset:
+        removed = [(archive_path, filename) for filename in known.keys() - {member.name for member, _ in members}]
+        with conn:
+            conn.executemany("DELETE FROM sheets WHERE directory = ? AND filename = ?", removed)
+    return changed_entries, len(removed), (archive_path, stat.st_size, stat.st_mtime_ns)
+
+def archive_stamp(conn, archive_path):
+    # (size, mtime_ns) of the archive when it was last indexed in full, or None
+    return conn.execute("SELECT size, mtime_ns FROM archives WHERE path = ?", (os.path.abspath(archive_path),)).fetchone()
+
+def indexed_archive_members(conn, archive_path):
+    # Name -> ArchiveMember for every sheet of an archive that hasn't changed since it was
+    # indexed, rebuilt from the offsets in the index rather than by listing the archive again.
+    # None if the archive has changed (or was never indexed), so it has to be listed.
+    archive_path = os.path.abspath(archive_path)
+    stat = os.stat(archive_path)
+    if archive_stamp(conn, archive_path) != (stat.st_size, stat.st_mtime_ns):
+        return None
+    kind = archive_kind(archive_path)
+    return {
+        filename: ArchiveMember(archive_path, filename, kind, offset, size, compress_type, compressed_size, None)
+        for filename, size, offset, compress_type, compressed_size in conn.execute(
+            "SELECT filename, size, member_offset, member_compress_type, member_compressed_size FROM sheets WHERE directory = ?",
+            (archive_path,))
+    }
+
+def scan_stats_folder(conn, directory_path):
+    # Drop deleted sheets from the index and return the entries of new or changed sheets, along
+    # with how many were deleted
+    directory_path = os.path.abspath(directory_path)
+
+    # Load what we already know about this directory
+    with profiler.stage('index_lookup'):
+        known = {
+            filename: (size, mtime_ns)
+            for filename, size, mtime_ns in conn.execute(
+                "SELECT filename, size, mtime_ns FROM sheets WHERE directory = ?", (directory_path,))
+        }
+
+    # Only parse files that are new or whose size/mtime changed since the last scan
+    changed_entries = []
+    seen = set()
+    with profiler.stage('scan_folder'), os.scandir(directory_path) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            seen.add(entry.name)
+            stat = entry.stat()
+            if known.get(entry.name) != (stat.st_size, stat.st_mtime_ns):
+                changed_entries.append((directory_path, entry.name, entry.path, stat.st_size, stat.st_mtime_ns))
+    profiler.count('files_listed', len(seen))
+
+    removed = [(directory_path, filename) for filename in known.keys() - seen]
+    with conn:
+        conn.executemany("DELETE FROM sheets WHERE directory = ? AND filename = ?", removed)
+    return changed_entries, len(removed)
+
+def index_stat_sheets(conn, sheet_entries, progress=None, cancel_event=None):
+    # Parse (directory, filename, path, size, mtime_ns) entries into the index and return the rows
+    # written. Each parsed batch is committed as it arrives so a cancelled scan keeps the work it
+    # already did.
+    with profiler.stage('ingest_sheets'):
+        workers, pool = load_ingest_settings()
+        indexed = []
+        done = 0
+        for batch, results in iter_stat_sheet_batches(((path, mtime_ns) for _, _, path, _, mtime_ns in sheet_entries), workers, pool):
+            changed = []
+            for (directory_path, filename, path, size, mtime_ns), (datetime_value, challenge, score, error) in zip(sheet_entries[done:done + len(batch)], results):
+                # Unreadable sheets are stored with a NULL scenario and the reason, so they're
+                # reported rather than re-read every launch
+                changed.append((
+                    directory_path, filename, size, mtime_ns,
+                    datetime_value.isoformat(sep=' ') if datetime_value else None,
+                    challenge, score, error,
+                    *((path.offset, path.compress_type, path.compressed_size) if isinstance(path, ArchiveMember) else (None, None, None)),
+                ))
+            with profiler.stage('index_write'), conn:
+                conn.executemany("INSERT OR REPLACE INTO sheets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", changed)
+            indexed.extend(changed)
+            done += len(batch)
+
+            if progress:
+                progress(done, len(sheet_entries))
+            if cancel_event is not None and cancel_event.is_set():
+                raise IngestCancelled()
+
+        return indexed
+
+def list_sheet_names(directory_path):
+    with os.scandir(directory_path) as entries:
+        return {entry.name for entry in entries if entry.is_file()}
+
+def find_new_sheets(directory_path, known_names, last_mtime_ns=None):
+    # Adding a file bumps the folder's own mtime, so an unchanged folder costs a single stat.
+    # Returns the names not in known_names and the folder mtime to pass in next time.
+    mtime_ns = os.stat(directory_path).st_mtime_ns
+    if mtime_ns == last_mtime_ns:
+        return [], mtime_ns
+    return sorted(list_sheet_names(directory_path) - known_names), mtime_ns
+
+def index_new_sheets(conn, directory_path, filenames):
+    # Index just the given sheets, without rescanning the rest of the folder
+    directory_path = os.path.abspath(directory_path)
+    sheet_entries = []
+    for filename in filenames:
+        file_path = os.path.join(directory_path, filename)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        sheet_entries.append((directory_path, filename, file_path, stat.st_size, stat.st_mtime_ns))
+    return index_stat_sheets(conn, sheet_entries)
+
+def load_unreadable_sheets(conn, directory_path):
+    # (filename, reason) for every sheet in the folder that couldn't be read as an attempt
+    return conn.execute(
+        "SELECT filename, error FROM sheets WHERE directory = ? AND scenario IS NULL ORDER BY filename",
+        (os.path.abspath(directory_path),)).fetchall()
+
+def load_dataset_unreadable_sheets(conn, stats_folders):
+    # load_unreadable_sheets for several (folder, player) pairs, with each sheet's folder
+    return [
+        (os.path.join(directory_path, filename), reason)
+        for directory_path, _ in stats_folders for filename, reason in load_unreadable_sheets(conn, directory_path)
+    ]
+
+class ScoreStore:
+    # Compact columnar store of every attempt in a stats folder, held once per session.
+    # Rows are kept sorted by (scenario code, time) so each challenge is a contiguous
+    # slice of the arrays and can be handed out as a NumPy view.
+
+    def __init__(self, session_gap_minutes=SESSION_GAP_MINUTES, name=None):
+        self.name = name             # Player the attempts belong to (None for everyone's), which keeps stores apart in a shared cache
+        self.scenarios = []          # Interned scenario names, indexed by code
+        self.scenario_codes = {}     # Scenario name -> code
+        self.times = np.empty(0, dtype=np.int64)    # Nanoseconds since the epoch (naive local time)
+        self.scores = np.empty(0, dtype=np.float64)
+        self.codes = np.empty(0, dtype=np.int32)
+        self.offsets = np.zeros(1, dtype=np.int64)  # Row where each code's slice starts, plus the end
+        self.version = 0             # Bumped on every change so derived data can tell it's stale
+        self.daily = DailyRollup()   # Per-challenge daily summaries, kept up to date by append
+        self.sessions = SessionRollup(session_gap_minutes)  # Play sessions and per-challenge session summaries, likewise
+
+    def __len__(self):
+        return len(self.scores)
+
+    def intern(self, scenario):
+        code = self.scenario_codes.get(scenario)
+        if code is None:
+            code = self.scenario_codes[scenario] = len(self.scenarios)
+            self.scenarios.append(scenario)
+        return code
+
+    def append(self, times, scenarios, scores):
+        # times is anything pd.to_datetime accepts; scenarios are names
+        times = pd.to_datetime(pd.Series(times), format='ISO8601').to_numpy(dtype='datetime64[ns]').view(np.int64)
+        scenario_codes, unique_scenarios = pd.factorize(pd.Series(scenarios, dtype=object))
+        codes = np.array([self.intern(scenario) for scenario in unique_scenarios], dtype=np.int32)[scenario_codes] if len(times) else self.codes[:0]
+        scores = np.asarray(scores, dtype=np.float64)
+        previous_times, previous_offsets = self.times, self.offsets
+
+        # Sort only the new rows, then merge them in: each lands after the existing attempts of
+        # its challenge that are no later, found by a binary search within that challenge's
+        # slice. Challenges seen for the first time have the highest codes, so they go at the end.
+        order = np.lexsort((times, codes))
+        new_times, new_scores, new_codes = times[order], scores[order], codes[order]
+        positions = np.full(len(new_codes), len(previous_times), dtype=np.int64)
+        touched, group_starts = np.unique(new_codes, return_index=True)
+        group_ends = np.append(group_starts[1:], len(new_codes))
+        for code, group_start, group_end in zip(touched.tolist(), group_starts.tolist(), group_ends.tolist()):
+            if code + 1 < len(previous_offsets):
+                start, end = previous_offsets[code], previous_offsets[code + 1]
+                positions[group_start:group_end] = start + np.searchsorted(
+                    previous_times[start:end], new_times[group_start:group_end], side='right')
+        self.times = np.insert(previous_times, positions, new_times)
+        self.scores = np.insert(self.scores, positions, new_scores)
+        self.codes = np.insert(self.codes, positions, new_codes)
+
+        counts = np.bincount(new_codes, minlength=len(self.scenarios))
+        counts[:len(previous_offsets) - 1] += np.diff(previous_offsets)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.daily.update(self, codes, times, previous_times, previous_offsets)
+        self.sessions.update(self, codes, times, previous_times, previous_offsets)
+        self.version += 1
+
+    def copy(self):
+        # A copy to append to while this store is still being read elsewhere. Arrays are only
+        # ever replaced, never changed in place, so the copy shares them until it's appended to.
+        store = copy.copy(self)
+        store.scenarios = list(self.scenarios)
+        store.scenario_codes = dict(self.scenario_codes)
+        store.daily = self.daily.copy()
+        store.sessions = self.sessions.copy()
+        return store
+
+    def set_session_gap(self, minutes):
+        # Segment the attempts into sessions again with a different idle gap
+        if minutes != self.sessions.gap_minutes:
+            self.sessions = SessionRollup(minutes)
+            self.sessions.update(self, self.codes, self.times, self.times[:0], self.offsets[:1])
+            self.version += 1
+
+    def challenge_rows(self, challenge):
+        # (times, scores) views for one challenge, in time order
+        code = self.scenario_codes.get(challenge)
+        if code is None:
+            return self.times[:0], self.scores[:0]
+        start, end = self.offsets[code], self.offsets[code + 1]
+        return self.times[start:end], self.scores[start:end]
+
+    def counts(self):
+        return Counter(dict(zip(self.scenarios, np.diff(self.offsets).tolist())))
+
+    def daily_totals(self, challenge, show_pb=False, normalize=False, period='day', start=None, end=None):
+        # (period starts, score totals, attempt counts) for one challenge, read from the daily rollup
+        code = self.scenario_codes.get(challenge)
+        if code is None:
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0, dtype=np.int64)
+        return self.daily.totals(code, show_pb, normalize, period, start, end)
+
+    def session_totals(self, challenge, show_pb=False, normalize=False, start=None, end=None):
+        # (session numbers, bests, score totals, attempt counts) for one challenge, read from the session rollup
+        code = self.scenario_codes.get(challenge)
+        if code is None:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+        return self.sessions.totals(code, show_pb, normalize, start, end)
+
+    def to_frame(self, challenges):
+        # DataFrame of the selected challenges with a categorical Challenge column,
+        # so no per-row datetime or string objects are created
+        codes = [self.scenario_codes[challenge] for challenge in dict.fromkeys(challenges) if challenge in self.scenario_codes]
+        slices = [slice(self.offsets[code], self.offsets[code + 1]) for code in codes]
+        times = np.concatenate([self.times[rows] for rows in slices]) if slices else self.times[:0]
+        scores = np.concatenate([self.scores[rows] for rows in slices]) if slices else self.scores[:0]
+        row_codes = np.concatenate([self.codes[rows] for rows in slices]) if slices else self.codes[:0]
+        return pd.DataFrame({
+            'Datetime': times.view('datetime64[ns]'),
+            'Challenge': pd.Categorical.from_codes(row_codes, categories=self.scenarios),
+            'Score': scores,
+        })
+
+    def challenge_stats(self, recent=TREND_ATTEMPTS):
+        # Per-challenge summary in one pass over the arrays: attempt count, personal best, time of the
+        # last attempt, and trend as the mean of the last `recent` attempts relative to the `recent`
+        # before them (NaN until a challenge has more than `recent` attempts)
+        counts = np.diff(self.offsets)
+        played = np.flatnonzero(counts)
+        starts, ends = self.offsets[:-1][played], self.offsets[1:][played]
+
+        best = np.maximum.reduceat(self.scores, starts) if len(played) else self.scores[:0]
+        cumulative = np.concatenate(([0.0], np.cumsum(self.scores)))
+        middle = np.maximum(starts, ends - recent)
+        earliest = np.maximum(starts, middle - recent)
+        recent_mean = (cumulative[ends] - cumulative[middle]) / np.maximum(ends - middle, 1)
+        previous_mean = (cumulative[middle] - cumulative[earliest]) / np.maximum(middle - earliest, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trend = np.where((middle > earliest) & (previous_mean != 0), recent_mean / previous_mean - 1, np.nan)
+
+        return pd.DataFrame({
+            'Attempts': counts[played],
+            'PB': best,
+            'Last Played': self.times[ends - 1].view('datetime64[ns]'),
+            'Trend': trend,
+        }, index=pd.Index([self.scenarios[code] for code in played], name='Challenge'))
+
+    def challenge_fingerprint(self, challenge):
+        # (attempt count, first time, last time, score total) for one challenge. It stays the same
+        # when the store is reloaded or other challenges change, so derived data can be reused.
+        code = self.scenario_codes.get(challenge)
+        if code is None:
+            return (0,)
+        start, end = self.offsets[code], self.offsets[code + 1]
+        if start == end:
+            return (0,)
+        return (int(end - start), int(self.times[start]), int(self.times[end - 1]), float(self.scores[start:end].sum()))
+
+    def memory_usage(self):
+        # Bytes held by the arrays, the interned scenario table and the daily and session rollups
+        return self.arrays_memory_usage() + self.daily.memory_usage() + self.sessions.memory_usage()
+
+    def arrays_memory_usage(self):
+        # Bytes held by the attempt arrays and the interned scenario table alone
+        return (self.times.nbytes + self.scores.nbytes + self.codes.nbytes + self.offsets.nbytes
+                + sum(len(scenario.encode('utf-8')) for scenario in self.scenarios))
+
+class ScoreDataset:
+    # Attempts from several stats folders, each belonging to a player. Every player has a
+    # ScoreStore of their own for side-by-side comparisons, and `combined` holds everyone's
+    # attempts for the challenge list and the usual plots (it is the player's store when there
+    # is only one). An attempt a player already has - the same sheet synced to two machines,
+    # or copied into a merged folder - is dropped using a sorted array of row hashes.
+
+    def __init__(self, players, session_gap_minutes=SESSION_GAP_MINUTES):
+        self.players = {player: ScoreStore(session_gap_minutes, player) for player in dict.fromkeys(players)}
+        self.combined = next(iter(self.players.values())) if len(self.players) == 1 else ScoreStore(session_gap_minutes)
+        self.hashes = np.empty(0, dtype=np.uint64)  # Hash of (player, scenario, time, score) per attempt kept
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.combined)
+
+    def append(self, players, times, scenarios, scores):
+        # players is one name for all the attempts or a name per attempt. Returns how many were new.
+        times = pd.to_datetime(pd.Series(times), format='ISO8601').to_numpy(dtype='datetime64[ns]')
+        frame = pd.DataFrame({
+            'player': np.broadcast_to(np.asarray(players, dtype=object), len(times)),
+            'scenario': np.asarray(scenarios, dtype=object),
+            'time': times,
+            'score': np.asarray(scores, dtype=np.float64),
+        })
+        hashes = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+        # Keep the first of any repeats within the batch, then anything not already held
+        new = ~pd.Series(hashes).duplicated().to_numpy()
+        if len(self.hashes):
+            positions = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+            new &= self.hashes[positions] != hashes
+        added = np.sort(hashes[new])
+        self.hashes = np.insert(self.hashes, np.searchsorted(self.hashes, added), added)
+        self.duplicates += int(len(hashes) - new.sum())
+
+        frame = frame[new]
+        for player, rows in frame.groupby('player', sort=False):
+            self.players[player].append(rows['time'], rows['scenario'], rows['score'])
+        if len(self.players) > 1:
+            self.combined.append(frame['time'], frame['scenario'], frame['score'])
+        return len(frame)
+
+    def copy(self):
+        # ScoreStore.copy for every store, keeping the combined store the player's when there's one
+        dataset = copy.copy(self)
+        dataset.players = {player: store.copy() for player, store in self.players.items()}
+        dataset.combined = next(iter(dataset.players.values())) if len(dataset.players) == 1 else self.combined.copy()
+        return dataset
+
+    def stores(self):
+        stores = list(self.players.values())
+        if len(stores) > 1:
+            stores.append(self.combined)
+        return stores
+
+    def set_session_gap(self, minutes):
+        for store in self.stores():
+            store.set_session_gap(minutes)
+
+    def memory_usage(self):
+        return sum(store.memory_usage() for store in self.stores()) + self.hashes.nbytes
+
+def summarize_days(times, scores, codes, best_before=-np.inf):
+    # Group attempts sorted by (code, time) into one row per challenge per day. Returns each group's
+    # code, day, attempt count, best score, score total and total of the running PB after each
+    # attempt; best_before seeds the running PB when extending a single challenge.
+    return summarize_groups(times.view('datetime64[ns]').astype('datetime64[D]'), scores, codes, best_before)
+
+def summarize_groups(keys, scores, codes, best_before=-np.inf):
+    # summarize_days for any key that never decreases within a challenge, such as a session number
+    if not len(keys):
+        empty = np.empty(0)
+        return codes[:0], keys[:0], np.empty(0, dtype=np.int64), empty, empty, empty
+    running_best = np.maximum(pd.Series(scores).groupby(codes, sort=False).cummax().to_numpy(), best_before)
+
+    new_group = np.ones(len(keys), dtype=bool)
+    new_group[1:] = (codes[1:] != codes[:-1]) | (keys[1:] != keys[:-1])
+    starts = np.flatnonzero(new_group)
+    return (
+        codes[starts],
+        keys[starts],
+        np.diff(np.append(starts, len(keys))),
+        np.maximum.reduceat(scores, starts),
+        np.add.reduceat(scores, starts),
+        np.add.reduceat(running_best, starts),
+    )
+
+def period_starts(days, period):
+    # First day of the day, Monday-based week or month each day falls in
+    if period == 'week':
+        # Day 0 of datetime64 is a Thursday
+        return days - ((days.astype(np.int64) + 3) % 7).astype('timedelta64[D]')
+    if period == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+class DailyRollup:
+    # Materialized per-challenge daily summaries of a ScoreStore: for each day a challenge was
+    # played, the attempt count, best score, score total and running-PB total. Built in one pass
+    # when the store is first filled and then extended per challenge as attempts arrive, so the
+    # aggregate view and weekly/monthly rollups never go back to the raw attempts.
+
+    def __init__(self):
+        self.challenges = {}  # Scenario code -> (days, counts, bests, totals, pb_totals)
+
+    def update(self, store, codes, times, previous_times, previous_offsets):
+        # codes/times are the attempts just added to store; previous_* are its arrays before that
+        if not len(codes):
+            return
+        if not len(previous_times):
+            self.challenges = {}
+            self.add_groups(*self.summarize(store.times, store.scores, store.codes))
+            return
+
+        # Earliest new attempt of each challenge that got any
+        order = np.argsort(codes, kind='stable')
+        touched, group_starts = np.unique(codes[order], return_index=True)
+        earliest = np.minimum.reduceat(times[order], group_starts)
+        for code, earliest_time in zip(touched.tolist(), earliest.tolist()):
+            start, end = store.offsets[code], store.offsets[code + 1]
+            previous_count = previous_offsets[code + 1] - previous_offsets[code] if code + 1 < len(previous_offsets) else 0
+            rollup = self.challenges.get(code)
+            if rollup is not None and previous_count and earliest_time >= previous_times[previous_offsets[code + 1] - 1]:
+                # Everything new is later than what was there, so only the new attempts need summarizing
+                rows = slice(start + previous_count, end)
+                self.extend(code, self.summarize(store.times[rows], store.scores[rows], store.codes[rows], rollup[2].max()))
+            else:
+                # Brand new challenge, or attempts that land before existing ones: summarize it again
+                rows = slice(start, end)
+                self.challenges.pop(code, None)
+                self.add_groups(*self.summarize(store.times[rows], store.scores[rows], store.codes[rows]))
+
+    def copy(self):
+        rollup = copy.copy(self)
+        rollup.challenges = dict(self.challenges)
+        return rollup
+
+    def memory_usage(self):
+        # Bytes held by the per-challenge arrays, counting each array object as well as its
+        # data, and the tuples and dict they're kept in
+        return sys.getsizeof(self.challenges) + sum(
+            sys.getsizeof(rollup) + sum(NDARRAY_BYTES + array.nbytes for array in rollup)
+            for rollup in self.challenges.values())
+
+    def summarize(self, times, scores, codes, best_before=-np.inf):
+        return summarize_days(times, scores, codes, best_before)
+
+    def add_groups(self, group_codes, days, counts, bests, totals, pb_totals):
+        # Split summarize_days output, sorted by code, into per-challenge arrays
+        boundaries = np.flatnonzero(np.diff(group_codes)) + 1
+        for rows in np.split(np.arange(len(group_codes)), boundaries):
+            if len(rows):
+                rows = slice(rows[0], rows[-1] + 1)
+                self.challenges[int(group_codes[rows.start])] = (days[rows], counts[rows], bests[rows], totals[rows], pb_totals[rows])
+
+    def extend(self, code, groups):
+        _, days, counts, bests, totals, pb_totals = groups
+        old_days, old_counts, old_bests, old_totals, old_pb_totals = self.challenges[code]
+        if days[0] == old_days[-1]:
+            # The first new day continues the last summarized one
+            old_counts, old_bests, old_totals, old_pb_totals = (
+                old_counts.copy(), old_bests.copy(), old_totals.copy(), old_pb_totals.copy())
+            old_counts[-1] += counts[0]
+            old_bests[-1] = max(old_bests[-1], bests[0])
+            old_totals[-1] += totals[0]
+            old_pb_totals[-1] += pb_totals[0]
+            days, counts, bests, totals, pb_totals = days[1:], counts[1:], bests[1:], totals[1:], pb_totals[1:]
+        self.challenges[code] = (
+            np.concatenate((old_days, days)),
+            np.concatenate((old_counts, counts)),
+            np.concatenate((old_bests, bests)),
+            np.concatenate((old_totals, totals)),
+            np.concatenate((old_pb_totals, pb_totals)),
+        )
+
+    def totals(self, code, show_pb=False, normalize=False, period='day', start=None, end=None):
+        # (period starts, score totals, attempt counts) for one challenge within [start, end].
+        # With show_pb each attempt counts as the PB it had reached; normalize divides by the
+        # challenge's all-time best, as the per-attempt views do.
+        rollup = self.challenges.get(code)
+        if rollup is None:
+            return np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0, dtype=np.int64)
+        days, counts, bests, totals, pb_totals = rollup
+        totals = pb_totals if show_pb else totals
+        if normalize:
+            best = bests.max()
+            totals = totals / (best if best != 0 else 1.0)
+
+        if start is not None or end is not None:
+            keep = np.ones(len(days), dtype=bool)
+            if start is not None:
+                keep &= days >= np.datetime64(start, 'D')
+            if end is not None:
+                keep &= days <= np.datetime64(end, 'D')
+            days, counts, totals = days[keep], counts[keep], totals[keep]
+
+        if period == 'day':
+            return days, totals, counts
+        periods, period_index = np.unique(period_starts(days, period), return_inverse=True)
+        return (periods,
+                np.bincount(period_index, weights=totals, minlength=len(periods)),
+                np.bincount(period_index, weights=counts, minlength=len(periods)).astype(np.int64))
+
+def segment_sessions(sorted_times, gap):
+    # Start and end time of each play session in time-sorted attempts: a session ends wherever
+    # the next attempt is more than gap nanoseconds later
+    if not len(sorted_times):
+        return sorted_times[:0], sorted_times[:0]
+    breaks = np.flatnonzero(np.diff(sorted_times) > gap) + 1
+    return sorted_times[np.concatenate(([0], breaks))], sorted_times[np.append(breaks, len(sorted_times)) - 1]
+
+class SessionRollup(DailyRollup):
+    # Play sessions of a ScoreStore, across every challenge, and per-challenge summaries of each
+    # session played, in the same layout as the daily rollup with session numbers in place of days.
+    # Sessions are found in one pass over the sorted times; attempts that arrive after the last
+    # session only add or extend sessions at the end, while anything earlier segments the whole
+    # store again and bumps `layout`, since it can merge or split sessions and renumber the rest.
+
+    def __init__(self, gap_minutes=SESSION_GAP_MINUTES):
+        super().__init__()
+        self.gap_minutes = gap_minutes
+        self.gap = int(gap_minutes * 60 * 10**9)
+        self.starts = np.empty(0, dtype=np.int64)  # First and last attempt time of each session
+        self.ends = np.empty(0, dtype=np.int64)
+        self.layout = 0
+
+    def memory_usage(self):
+        return super().memory_usage() + self.starts.nbytes + self.ends.nbytes
+
+    def __len__(self):
+        return len(self.starts)
+
+    def update(self, store, codes, times, previous_times, previous_offsets):
+        if not len(codes):
+            return
+        if len(previous_times) and len(self.ends) and times.min() >= self.ends[-1]:
+            self.add_sessions(np.sort(times))
+        else:
+            self.starts, self.ends = self.starts[:0], self.ends[:0]
+            self.add_sessions(np.sort(store.times))
+            self.layout += 1
+            previous_times = previous_times[:0]
+        super().update(store, codes, times, previous_times, previous_offsets)
+
+    def add_sessions(self, sorted_times):
+        # Segment attempts later than every existing session, continuing the last one if the gap allows
+        starts, ends = segment_sessions(sorted_times, self.gap)
+        if len(self.ends) and len(starts) and starts[0] - self.ends[-1] <= self.gap:
+            self.ends = np.append(self.ends[:-1], ends[0])
+            starts, ends = starts[1:], ends[1:]
+        self.starts = np.concatenate((self.starts, starts))
+        self.ends = np.concatenate((self.ends, ends))
+
+    def session_numbers(self, times):
+        # Index of the session each time falls in (sessions don't overlap, so it's the last one started)
+        return np.searchsorted(self.starts, times, side='right') - 1
+
+    def summarize(self, times, scores, codes, best_before=-np.inf):
+        return summarize_groups(self.session_numbers(times), scores, codes, best_before)
+
+    def totals(self, code, show_pb=False, normalize=False, start=None, end=None):
+        # (session numbers, bests, score totals, attempt counts) for one challenge's sessions that
+        # started within [start, end]. With show_pb totals count each attempt as the PB it had
+        # reached and bests become the running PB; normalize divides by the all-time best.
+        rollup = self.challenges.get(code)
+        if rollup is None:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+        sessions, counts, bests, totals, pb_totals = rollup
+        if show_pb:
+            totals = pb_totals
+            bests = np.maximum.accumulate(bests)
+        if normalize:
+            best = bests.max()
+            divisor = best if best != 0 else 1.0
+            bests, totals = bests / divisor, totals / divisor
+
+        if start is not None or end is not None:
+            keep = self.started_within(sessions, start, end)
+            sessions, bests, totals, counts = sessions[keep], bests[keep], totals[keep], counts[keep]
+        return sessions, bests, totals, counts
+
+    def warmup(self, times, scores, show_pb=False, normalize=False, start=None, end=None, attempts=WARMUP_ATTEMPTS):
+        # Warm-up curve of one challenge's time-sorted attempts: score totals and counts of the
+        # 1st, 2nd, ... attempt of each session it was played in, up to `attempts`. show_pb uses
+        # the best so far within the session; normalize divides by the all-time best.
+        sessions = self.session_numbers(times)
+        if normalize and len(scores):
+            best = scores.max()
+            scores = scores / (best if best != 0 else 1.0)
+        if show_pb:
+            scores = pd.Series(scores).groupby(sessions, sort=False).cummax().to_numpy()
+
+        if start is not None or end is not None:
+            keep = self.started_within(sessions, start, end)
+            sessions, scores = sessions[keep], scores[keep]
+
+        # Attempts are in time order, so each session is a run of rows
+        new_session = np.ones(len(sessions), dtype=bool)
+        new_session[1:] = sessions[1:] != sessions[:-1]
+        run_starts = np.flatnonzero(new_session)
+        position = np.arange(len(sessions)) - np.repeat(run_starts, np.diff(np.append(run_starts, len(sessions))))
+        keep = position < attempts
+        totals = np.bincount(position[keep], weights=scores[keep], minlength=attempts)
+        counts = np.bincount(position[keep], minlength=attempts)
+        return totals, counts
+
+    def started_within(self, sessions, start, end):
+        # Mask of the sessions that started within [start, end] (dates, inclusive)
+        session_starts = self.starts[sessions].view('datetime64[ns]')
+        keep = np.ones(len(sessions), dtype=bool)
+        if start is not None:
+            keep &= session_starts >= np.datetime64(start, 'D')
+        if end is not None:
+            keep &= session_starts < np.datetime64(end, 'D') + 1
+        return keep
+
+class DerivedSeriesCache:
+    # LRU cache of per-challenge derived series (PB and normalized scores) with a memory
+    # budget. Keys include the challenge's fingerprint, so only challenges whose sheets changed
+    # miss after new sheets arrive or the store is reloaded. Values must own their arrays: a
+    # view would keep the whole store array it came from alive without being charged for it.
+
+    def __init__(self, max_bytes=DERIVED_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.fingerprints = {}  # Source -> fingerprint of the data its entries were derived from
+        self.source_keys = {}   # Source -> keys of the entries derived from it
+
+    def get(self, key, compute, source=None):
+        # source names what the value is derived from, such as a store's challenge, for track
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            profiler.count('derived_cache_hits')
+            return entry[0]
+
+        self.misses += 1
+        profiler.count('derived_cache_misses')
+        value = compute()
+        self.put(key, value)
+        if source is not None:
+            self.source_keys.setdefault(source, set()).add(key)
+        return value
+
+    def track(self, source, fingerprint):
+        # Record the fingerprint of source's data. Once it changes, entries derived from the old
+        # data can never be hit again, so they are dropped now instead of waiting for the LRU.
+        if self.fingerprints.get(source, fingerprint) != fingerprint:
+            for key in self.source_keys.pop(source, ()):
+                entry = self.entries.pop(key, None)
+                if entry is not None:
+                    self.nbytes -= entry[1]
+        self.fingerprints[source] = fingerprint
+
+    def peek(self, key):
+        # The cached value or None, without counting a hit or miss, for entries that are
+        # extended rather than replaced when their inputs grow
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        nbytes = sum(array.nbytes for array in value)
+        if nbytes <= self.max_bytes:
+            self.entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+            # Evict the least recently used entries until we're back under budget
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_bytes) = self.entries.popitem(last=False)
+                self.nbytes -= evicted_bytes
+
+    def clear(self):
+        self.entries.clear()
+        self.fingerprints.clear()
+        self.source_keys.clear()
+        self.nbytes = 0
+
+def challenge_series(store, cache, challenge, show_pb, normalize):
+    # Plot-ready (times, scores) for one challenge, in the order prepare_plot_data applies the options
+    def compute():
+        times, scores = store.challenge_rows(challenge)
+        max_score = scores.max() if len(scores) else 0
+        divisor = max_score if max_score != 0 else 1.0
+        if normalize:
+            scores = scores / divisor
+        if show_pb:
+            scores = np.maximum.accumulate(scores)
+        # Copies, so the cache doesn't hold on to the store's arrays
+        return times.view('datetime64[ns]').copy(), scores if normalize or show_pb else scores.copy()
+
+    fingerprint = store.challenge_fingerprint(challenge)
+    cache.track((store.name, challenge), fingerprint)
+    return cache.get((challenge, 'series', show_pb, normalize, fingerprint), compute, (store.name, challenge))
+
+def smooth_values(times, values, smoothing):
+    # Smoothing of time-sorted values (times in nanoseconds) in one streaming pass: pandas keeps
+    # a rolling quantile's window in a skiplist, O(n log w), and an EWMA is a single recurrence
+    days = smoothing.unit == 'days'
+    series = pd.Series(values, index=pd.DatetimeIndex(times.view('datetime64[ns]')) if days else None, dtype=np.float64)
+    if smoothing.mode == 'ewma':
+        if days:
+            return series.ewm(halflife=pd.Timedelta(days=smoothing.window), times=series.index, adjust=False).mean().to_numpy()
+        return series.ewm(span=smoothing.window, adjust=False).mean().to_numpy()
+    window = f'{smoothing.window}D' if days else smoothing.window
+    return series.rolling(window, min_periods=1).quantile(SMOOTHING_QUANTILES[smoothing.mode]).to_numpy()
+
+def extend_smoothed(times, scores, smoothed, done, smoothing):
+    # Smoothed values for rows done onward, given `smoothed` for the rows before. Only the rows
+    # the new windows reach back to are read again.
+    if smoothing.mode == 'ewma':
+        # Carry on the recurrence from the last smoothed value
+        return smooth_values(times[done - 1:], np.concatenate((smoothed[-1:], scores[done:])), smoothing)[1:]
+    if smoothing.unit == 'days':
+        context = np.searchsorted(times, times[done] - smoothing.window * 86400 * 10**9, side='right')
+    else:
+        context = max(done - smoothing.window + 1, 0)
+    return smooth_values(times[context:], scores[context:], smoothing)[done - context:]
+
+def smoothed_series(store, cache, challenge, smoothing, show_pb=False, normalize=False):
+    # Plot-ready (times, trend) for one challenge. The raw trend is cached per challenge and
+    # first attempt, the part of its fingerprint that later attempts leave alone, along with the
+    # rows it covers; when later attempts are added it is extended rather than recomputed, in
+    # this store or a reloaded one. normalize and show_pb are applied on the way out, since the
+    # all-time best they depend on moves whenever a new PB comes in.
+    times, scores = store.challenge_rows(challenge)
+    if not len(times):
+        return times.view('datetime64[ns]'), scores
+    key = (challenge, 'smoothed', smoothing, int(times[0]))
+    cached = cache.peek(key)
+    done = 0
+    if cached is not None:
+        smoothed, (count, first_time, last_time), (total,) = cached
+        if 0 < count <= len(times) and times[0] == first_time and times[count - 1] == last_time and scores[:count].sum() == total:
+            done = int(count)
+
+    if done and done == len(times):
+        profiler.count('derived_cache_hits')
+    else:
+        profiler.count('derived_cache_misses')
+        if done:
+            profiler.count('smoothing_rows_extended', len(times) - done)
+            smoothed = np.concatenate((smoothed, extend_smoothed(times, scores, smoothed, done, smoothing)))
+        else:
+            smoothed = smooth_values(times, scores, smoothing)
+        cache.put(key, (smoothed, np.array([len(times), times[0], times[-1]], dtype=np.int64), np.array([scores.sum()])))
+
+    if normalize:
+        max_score = scores.max()
+        smoothed = smoothed / (max_score if max_score != 0 else 1.0)
+    if show_pb:
+        smoothed = np.maximum.accumulate(smoothed)
+    return times.view('datetime64[ns]'), smoothed
+
+def smoothing_label(smoothing, points='attempts'):
+    # e.g. "median of 20 attempts" or "EWMA, 7 day half-life"; points names what a window
+    # counted in attempts actually counts, such as the aggregate line's periods
+    if smoothing.mode == 'ewma':
+        return f'EWMA, {smoothing.window} day half-life' if smoothing.unit == 'days' else f'EWMA of {smoothing.window} {points}'
+    return f'{smoothing.mode} of {smoothing.window} {points if smoothing.unit == "attempts" else "days"}'
+
+def prepare_plot_data_from_store(store, cache, selected_challenges, show_pb=False, normalize=False, aggregate=False,
+                                 benchmark_groups=None, period='day', start=None, end=None, x_axis='date', smoothing=None):
+    # Same result as prepare_plot_data, built from cached per-challenge series and the store's
+    # daily rollup. period sets the aggregate line's granularity ('day', 'week' or 'month');
+    # start and end (dates, inclusive) limit what is shown. The other X_AXIS_MODES are drawn
+    # from the session rollup by prepare_session_plot_data, unsmoothed. A Smoothing draws each line's
+    # trend instead of its raw points; for the aggregate line its window counts periods, not attempts.
+    if x_axis != 'date':
+        return prepare_session_plot_data(store, selected_challenges, show_pb, normalize, aggregate, benchmark_groups, x_axis, start, end)
+    selected_challenges = list(dict.fromkeys(selected_challenges))
+    start_time = np.datetime64(start, 'D').astype('datetime64[ns]') if start is not None else None
+    end_time = (np.datetime64(end, 'D') + 1).astype('datetime64[ns]') if end is not None else None
+    lines = []
+    starts = []
+    if aggregate:
+        # Combine the per-challenge totals into one mean per period
+        totals = [store.daily_totals(challenge, show_pb, normalize, period, start, end) for challenge in selected_challenges]
+        all_periods = np.concatenate([periods for periods, _, _ in totals]) if totals else np.empty(0, dtype='datetime64[D]')
+        periods, period_index = np.unique(all_periods, return_inverse=True)
+        sums = np.bincount(period_index, weights=np.concatenate([sums for _, sums, _ in totals]) if totals else None, minlength=len(periods))
+        counts = np.bincount(period_index, weights=np.concatenate([counts for _, _, counts in totals]) if totals else None, minlength=len(periods))
+        period_scores = sums / counts
+        if smoothing is not None:
+            period_scores = smooth_values(periods.astype('datetime64[ns]').view(np.int64), period_scores, smoothing)
+
+        # Apply cumulative max to the mean scores
+        if show_pb:
+            period_scores = np.maximum.accumulate(period_scores)
+        lines.append((f'Aggregate ({smoothing_label(smoothing, period + "s")})' if smoothing is not None else 'Aggregate', periods, period_scores))
+
+        first_times = {}
+        for challenge in selected_challenges:
+            times, _ = store.challenge_rows(challenge)
+            if len(times):
+                first_times[challenge] = times[0]
+        if benchmark_groups is None:
+            benchmark_groups = [(f'Start {challenge}', [challenge]) for challenge in selected_challenges]
+        for label, challenges in benchmark_groups:
+            group_times = [first_times[challenge] for challenge in challenges if challenge in first_times]
+            if group_times:
+                first_time = np.datetime64(int(min(group_times)), 'ns')
+                if (start_time is None or first_time >= start_time) and (end_time is None or first_time < end_time):
+                    starts.append((label, first_time))
+    else:
+        for challenge in selected_challenges:
+            label = f'{challenge} (PB)' if show_pb else challenge
+            if smoothing is not None:
+                times, scores = smoothed_series(store, cache, challenge, smoothing, show_pb, normalize)
+                label = f'{label} ({smoothing_label(smoothing)})'
+            else:
+                times, scores = challenge_series(store, cache, challenge, show_pb, normalize)
+            if start_time is not None or end_time is not None:
+                first = np.searchsorted(times, start_time) if start_time is not None else 0
+                last = np.searchsorted(times, end_time) if end_time is not None else len(times)
+                times, scores = times[first:last], scores[first:last]
+            lines.append((label, times, scores))
+
+    return {'lines': lines, 'starts': starts}
+
+def prepare_session_plot_data(store, selected_challenges, show_pb=False, normalize=False, aggregate=False,
+                              benchmark_groups=None, x_axis='session', start=None, end=None):
+    # Plot data with play sessions on the x axis. 'session' plots each challenge's best score in
+    # every session it was played (the running best with show_pb) against the session's number,
+    # counted from 1 across all challenges, and the aggregate line is the mean score per session.
+    # 'warmup' plots the mean score of the 1st, 2nd, ... attempt of a session. start and end
+    # (dates, inclusive) keep the sessions that started between them.
+    selected_challenges = list(dict.fromkeys(selected_challenges))
+    sessions = store.sessions
+    lines = []
+    starts = []
+    if x_axis == 'warmup':
+        positions = np.arange(1, WARMUP_ATTEMPTS + 1)
+        curves = []
+        for challenge in selected_challenges:
+            times, scores = store.challenge_rows(challenge)
+            curves.append((challenge, sessions.warmup(times, scores, show_pb, normalize, start, end)))
+        if aggregate:
+            curves = [('Aggregate', (sum(totals for _, (totals, _) in curves), sum(counts for _, (_, counts) in curves)))] if curves else []
+        for label, (totals, counts) in curves:
+            played = counts > 0
+            lines.append((f'{label} (PB)' if show_pb and not aggregate else label, positions[played], totals[played] / counts[played]))
+        return {'lines': lines, 'starts': starts, 'x_axis': x_axis}
+
+    if aggregate:
+        # Mean score per session over every selected challenge played in it
+        totals = [store.session_totals(challenge, show_pb, normalize, start, end) for challenge in selected_challenges]
+        all_sessions = np.concatenate([numbers for numbers, _, _, _ in totals]) if totals else np.empty(0, dtype=np.int64)
+        numbers, session_index = np.unique(all_sessions, return_inverse=True)
+        sums = np.bincount(session_index, weights=np.concatenate([sums for _, _, sums, _ in totals]) if totals else None, minlength=len(numbers))
+        counts = np.bincount(session_index, weights=np.concatenate([counts for _, _, _, counts in totals]) if totals else None, minlength=len(numbers))
+        session_scores = sums / counts
+        if show_pb:
+            session_scores = np.maximum.accumulate(session_scores)
+        lines.append(('Aggregate', numbers + 1, session_scores))
+
+        # Start markers go on the session of each group's first attempt
+        first_sessions = {}
+        for challenge in selected_challenges:
+            times, _ = store.challenge_rows(challenge)
+            if len(times):
+                first_sessions[challenge] = int(sessions.session_numbers(times[:1])[0])
+        if benchmark_groups is None:
+            benchmark_groups = [(f'Start {challenge}', [challenge]) for challenge in selected_challenges]
+        for label, challenges in benchmark_groups:
+            group_sessions = [first_sessions[challenge] for challenge in challenges if challenge in first_sessions]
+            if group_sessions:
+                first_session = min(group_sessions)
+                if sessions.started_within(np.array([first_session]), start, end)[0]:
+                    starts.append((label, first_session + 1))
+    else:
+        for challenge in selected_challenges:
+            numbers, bests, _, _ = store.session_totals(challenge, show_pb, normalize, start, end)
+            lines.append((f'{challenge} (PB)' if show_pb else challenge, numbers + 1, bests))
+
+    # Session start times, so dated markers such as points of interest can be placed between sessions
+    return {'lines': lines, 'starts': starts, 'x_axis': x_axis, 'session_starts': sessions.starts.view('datetime64[ns]')}
+
+def prepare_player_plot_data(dataset, cache, selected_challenges, show_pb=False, normalize=False, aggregate=False,
+                             benchmark_groups=None, period='day', start=None, end=None, x_axis='date', smoothing=None):
+    # prepare_plot_data_from_store for each of the dataset's players, with every line and start
+    # marker labelled with its player, so players can be compared on one plot. Each player's
+    # sessions are numbered separately, so dated markers can't be placed in session mode.
+    lines = []
+    starts = []
+    for player, store in dataset.players.items():
+        plot_data = prepare_plot_data_from_store(
+            store, cache, selected_challenges, show_pb, normalize, aggregate, benchmark_groups, period, start, end, x_axis, smoothing)
+        lines += [(f'{player}: {label}', x, y) for label, x, y in plot_data['lines']]
+        starts += [(f'{player}: {label}', x) for label, x in plot_data['starts']]
+    if x_axis != 'date':
+        return {'lines': lines, 'starts': starts, 'x_axis': x_axis}
+    return {'lines': lines, 'starts': starts}
+
+def load_score_dataset(conn, stats_folders, selected_challenges=None, session_gap_minutes=SESSION_GAP_MINUTES):
+    # Every indexed attempt in the (folder, player) pairs, or only those of selected_challenges
+    # (which leaves the other challenges' attempts out of the sessions too)
+    with profiler.stage('load_store'):
+        frames = []
+        for directory_path, player in stats_folders:
+            df = read_indexed_scores(conn, directory_path, selected_challenges)
+            df['player'] = player
+            frames.append(df)
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['datetime', 'scenario', 'score', 'player'])
+    with profiler.stage('build_store'):
+        dataset = ScoreDataset((player for _, player in stats_folders), session_gap_minutes)
+        dataset.append(df['player'], df['datetime'], df['scenario'], df['score'])
+    return dataset
+
+def load_score_store(conn, directory_path, selected_challenges=None):
+    # Every indexed attempt in the folder, or only those of selected_challenges
+    with profiler.stage('load_store'):
+        df = read_indexed_scores(conn, directory_path, selected_challenges)
+    with profiler.stage('build_store'):
+        store = ScoreStore()
+        store.append(df['datetime'], df['scenario'], df['score'])
+    return store
+
+def read_indexed_scores(conn, directory_path, selected_challenges=None):
+    directory_path = os.path.abspath(directory_path)
+    if selected_challenges is None:
+        df = pd.read_sql_query(
+            "SELECT datetime, scenario, score FROM sheets WHERE directory = ? AND scenario IS NOT NULL",
+            conn, params=(directory_path,))
+    else:
+        # Query in chunks to stay under SQLite's bound-parameter limit
+        selected_challenges = list(selected_challenges)
+        chunks = []
+        for start in range(0, len(selected_challenges), 500):
+            chunk = selected_challenges[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            chunks.append(pd.read_sql_query(
+                f"SELECT datetime, scenario, score FROM sheets WHERE directory = ? AND scenario IN ({placeholders})",
+                conn, params=(directory_path, *chunk)))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=['datetime', 'scenario', 'score'])
+    return df
+
+def scenario_from_filename(filename):
+    match = STAT_SHEET_FILENAME_PATTERN.match(filename)
+    return match.group('scenario').strip() if match else None
+
+def discover_challenges(directory_path, on_new_challenge=None, cancel_event=None, conn=None):
+    # Count scenarios from the sheet filenames alone, only opening files
+    # whose names don't follow the Kovaak's naming pattern. Given the index, an archive that
+    # hasn't changed since it was indexed is counted from there without being opened.
+    challenge_counter = Counter()
+    if is_stats_archive(directory_path):
+        with profiler.stage('discover_challenges'):
+            for challenge in archive_challenges(directory_path, cancel_event, conn):
+                if challenge:
+                    if on_new_challenge and challenge not in challenge_counter:
+                        on_new_challenge(challenge)
+                    challenge_counter[challenge] += 1
+        return challenge_counter
+
+    with profiler.stage('discover_challenges'), os.scandir(directory_path) as entries:
+        for entry in entries:
+            if cancel_event is not None and cancel_event.is_set():
+                raise IngestCancelled()
+            challenge = scenario_from_filename(entry.name)
+            if challenge is None:
+                if not entry.is_file():
+                    continue
+                summary, _ = read_sheet_summary(entry.path, fields=('Scenario',))
+                challenge = summary.get('Scenario')
+            if challenge:
+                if on_new_challenge and challenge not in challenge_counter:
+                    on_new_challenge(challenge)
+                challenge_counter[challenge] += 1
+
+    return challenge_counter
+
+def archive_challenges(archive_path, cancel_event=None, conn=None):
+    # discover_challenges' scenario for each sheet of an archive. One that hasn't changed since
+    # it was indexed is answered from the index, falling back to the indexed scenario for names
+    # that don't follow the pattern.
+    if conn is not None:
+        stat = os.stat(archive_path)
+        if archive_stamp(conn, archive_path) == (stat.st_size, stat.st_mtime_ns):
+            for filename, scenario in conn.execute(
+                    "SELECT filename, scenario FROM sheets WHERE directory = ?", (os.path.abspath(archive_path),)):
+                yield scenario_from_filename(posixpath.basename(filename)) or scenario
+            return
+
+    for member, _ in list_archive_members(archive_path):
+        if cancel_event is not None and cancel_event.is_set():
+            raise IngestCancelled()
+        challenge = scenario_from_filename(sheet_name(member))
+        if challenge is None:
+            summary, _ = read_sheet_summary(member, fields=('Scenario',))
+            challenge = summary.get('Scenario')
+        yield challenge
+
+def sort_challenges(challenge_counter):
+    # Sort challenges by the number of entries, from most to fewest
+    sorted_challenges = sorted(challenge_counter.items(), key=lambda item: item[1], reverse=True)
+    return [challenge for challenge, count in sorted_challenges]
+
+class ChallengeIndex:
+    # Searchable list of challenge names. Names are lowercased once and indexed by trigram, so a
+    # search only checks the names sharing the query's rarest trigram instead of scanning them all.
+    # Typing more of the same query narrows the previous results. Results keep insertion order.
+
+    def __init__(self, challenges=()):
+        self.names = []
+        self.rows = {}       # Name -> position in names
+        self.lowered = []
+        self.trigrams = {}   # Trigram -> positions of the names containing it, ascending
+        self.last_search = ((), None)  # (words, matching positions) of the previous search
+        for challenge in challenges:
+            self.add(challenge)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, challenge):
+        return challenge in self.rows
+
+    def add(self, challenge):
+        if challenge in self.rows:
+            return
+        row = self.rows[challenge] = len(self.names)
+        lowered = challenge.lower()
+        self.names.append(challenge)
+        self.lowered.append(lowered)
+        for trigram in {lowered[i:i + 3] for i in range(len(lowered) - 2)}:
+            self.trigrams.setdefault(trigram, []).append(row)
+        self.last_search = ((), None)
+
+    def search(self, search_text):
+        # Names containing every whitespace-separated word of search_text, ignoring case
+        words = tuple(search_text.lower().split())
+        if not words:
+            return list(self.names)
+
+        last_words, last_rows = self.last_search
+        if last_rows is not None and len(words) >= len(last_words) and all(
+                word.startswith(last_word) for word, last_word in zip(words[:len(last_words)], last_words)):
+            # Every match for the new text also matched the previous one
+            candidates = last_rows
+        else:
+            candidates = None
+            for word in words:
+                for i in range(len(word) - 2):
+                    rows = self.trigrams.get(word[i:i + 3])
+                    if rows is None:
+                        candidates = []
+                        break
+                    if candidates is None or len(rows) < len(candidates):
+                        candidates = rows
+            if candidates is None:
+                # Only words shorter than a trigram
+                candidates = range(len(self.names))
+
+        lowered = self.lowered
+        rows = candidates
+        for word in words:
+            rows = [row for row in rows if word in lowered[row]]
+        self.last_search = (words, rows)
+        return [self.names[row] for row in rows]
+
+    def matches(self, challenge, search_text):
+        lowered = challenge.lower()
+        return all(word in lowered for word in search_text.lower().split())
+
+def load_challenge_dataset(stats_folders, selected_challenges=None, progress=None, cancel_event=None, index_filename=None,
+                           session_gap_minutes=SESSION_GAP_MINUTES):
+    # Pick up any new or changed sheets in the folders, then read the selected challenges (or all)
+    # into a ScoreDataset. Returns the dataset and the unreadable sheets as (filename, reason).
+    conn = open_stats_index(index_filename)
+    try:
+        update_stats_indexes(conn, [directory_path for directory_path, _ in stats_folders], progress, cancel_event)
+        return (load_score_dataset(conn, stats_folders, selected_challenges, session_gap_minutes),
+                load_dataset_unreadable_sheets(conn, stats_folders))
+    finally:
+        conn.close()
+
+def prepare_plot_data(df, selected_challenges, show_pb=False, normalize=False, aggregate=False, benchmark_groups=None):
+    # Turn raw attempts into ready-to-plot arrays in one pass over the data.
+    # Returns {'lines': [(label, x, y), ...], 'starts': [(label, x), ...]} where 'starts' are the
+    # first-attempt markers drawn in aggregate mode. benchmark_groups is a list of
+    # (label, challenges) to mark; it defaults to one marker per selected challenge.
+    selected_challenges = list(dict.fromkeys(selected_challenges))
+    challenge_total = len(selected_challenges)
+
+    # Map each attempt to a categorical challenge code, dropping anything that isn't selected
+    df = df.sort_values(by='Datetime', kind='stable')
+    codes = pd.Index(selected_challenges).get_indexer(df['Challenge']).astype(np.int64)
+    keep = codes >= 0
+    codes = codes[keep]
+    times = df['Datetime'].to_numpy()[keep]
+    scores = df['Score'].to_numpy(dtype=np.float64)[keep]
+
+    # Per-challenge max, used to normalize; a max of 0 leaves the scores as they are
+    max_scores = np.full(challenge_total, np.nan)
+    np.fmax.at(max_scores, codes, scores)
+    divisors = np.where((max_scores == 0) | np.isnan(max_scores), 1.0, max_scores)
+
+    def cummax_by_challenge(values):
+        return pd.Series(values).groupby(codes, sort=False).cummax().to_numpy()
+
+    # First attempt per challenge: attempts are time-sorted, so it's the first row for each code
+    first_times = np.full(challenge_total, np.datetime64('NaT'), dtype=times.dtype)
+    unique_codes, first_rows = np.unique(codes, return_index=True)
+    first_times[unique_codes] = times[first_rows]
+
+    lines = []
+    starts = []
+    if aggregate:
+        if show_pb:
+            scores = cummax_by_challenge(scores)
+        if normalize:
+            scores = scores / divisors[codes]
+
+        # Mean score for each calendar day
+        days, day_index = np.unique(times.astype('datetime64[D]'), return_inverse=True)
+        daily_scores = np.bincount(day_index, weights=scores, minlength=len(days)) / np.bincount(day_index, minlength=len(days))
+
+        # Apply cumulative max to the mean scores
+        if show_pb:
+            daily_scores = np.maximum.accumulate(daily_scores)
+        lines.append(('Aggregate', days, daily_scores))
+
+        if benchmark_groups is None:
+            benchmark_groups = [(f'Start {challenge}', [challenge]) for challenge in selected_challenges]
+        code_lookup = {challenge: code for code, challenge in enumerate(selected_challenges)}
+        for label, challenges in benchmark_groups:
+            group_codes = [code_lookup[challenge] for challenge in challenges if challenge in code_lookup]
+            group_times = first_times[group_codes]
+            group_times = group_times[~np.isnat(group_times)]
+            if len(group_times):
+                starts.append((label, group_times.min()))
+    else:
+        if normalize:
+            scores = scores / divisors[codes]
+        if show_pb:
+            scores = cummax_by_challenge(scores)
+
+        # Split into one series per challenge with a single stable sort by code
+        order = np.argsort(codes, kind='stable')
+        boundaries = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=challenge_total))))
+        for code, challenge in enumerate(selected_challenges):
+            rows = order[boundaries[code]:boundaries[code + 1]]
+            lines.append((f'{challenge} (PB)' if show_pb else challenge, times[rows], scores[rows]))
+
+    return {'lines': lines, 'starts': starts}
+
+def voltaic_levels(voltaic_challenges, season, level):
+    # "All" expands to every difficulty the season has (Season 3 has no Novice tier)
+    if level == "All":
+        return list(voltaic_challenges.get(season, {}))
+    return [level]
+
+def voltaic_benchmark_groups(voltaic_challenges, selected_pairs):
+    # (label, challenges) for each selected season-level pair, used for the start markers
+    return [
+        (f'Start {season}-{level}', voltaic_challenges.get(season, {}).get(level, []))
+        for season, level in selected_pairs
+    ]
+
+def downsample_indices(x, y, x_min, x_max, buckets):
+    # Indices of the points worth drawing for the x range [x_min, x_max] at `buckets` pixels wide.
+    # x must be sorted. Each equal-width bucket keeps its lowest and highest score, so peaks
+    # (PBs) survive exactly; the first and last points, and one point past each edge of the
+    # range, are kept so lines still run off the sides of the view.
+    start = max(np.searchsorted(x, x_min, side='left') - 1, 0)
+    end = min(np.searchsorted(x, x_max, side='right') + 1, len(x))
+    if end - start <= 2 * buckets:
+        return np.arange(start, end)
+
+    # x is sorted, so every bucket is a contiguous run of rows
+    x_visible = np.asarray(x[start:end], dtype=np.float64)
+    y_visible = np.asarray(y[start:end], dtype=np.float64)
+    edges = x_visible[0] + (x_visible[-1] - x_visible[0]) * np.arange(buckets) / buckets
+    bucket_starts = np.unique(np.searchsorted(x_visible, edges, side='left'))
+    bucket = np.repeat(np.arange(len(bucket_starts)), np.diff(np.append(bucket_starts, len(x_visible))))
+
+    def first_in_each_bucket(mask):
+        rows = np.flatnonzero(mask)
+        return rows[np.concatenate(([True], bucket[rows][1:] != bucket[rows][:-1]))]
+
+    lows = first_in_each_bucket(y_visible == np.minimum.reduceat(y_visible, bucket_starts)[bucket])
+    highs = first_in_each_bucket(y_visible == np.maximum.reduceat(y_visible, bucket_starts)[bucket])
+    return np.unique(np.concatenate((lows, highs, [0, len(x_visible) - 1]))) + start
+
+def plot_data_to_frame(plot_data):
+    # Long-format table of every plotted series, for CSV export
+    x_column = {'date': 'Datetime', 'session': 'Session', 'warmup': 'Attempt'}[plot_data.get('x_axis', 'date')]
+    frames = [
+        pd.DataFrame({'Series': label, x_column: x, 'Score': y})
+        for label, x, y in plot_data['lines']
+    ]
+    frames += [pd.DataFrame({'Series': [label], x_column: [x], 'Score': [np.nan]}) for label, x in plot_data['starts']]
+    if not frames:
+        return pd.DataFrame(columns=['Series', x_column, 'Score'])
+    return pd.concat(frames, ignore_index=True)
+
+def save_directory_path(directory_path):
+    stats_folders = settings.get('stats_folders')
+    if stats_folders:
+        # The selected folder takes the place of the first registered one
+        stats_folders[0]['path'] = directory_path
+        settings.update({'directory_path': directory_path, 'stats_folders': stats_folders})
+    else:
+        settings.set('directory_path', directory_path)
+
+def load_directory_path():
+    return settings.get('directory_path', '')
+
+def load_stats_folders():
+    # Registered (folder, player) pairs. Settings from before folders could be registered
+    # only have directory_path, which becomes the default player's folder.
+    stats_folders = settings.get('stats_folders')
+    if stats_folders is None:
+        directory_path = settings.get('directory_path', '')
+        return [(directory_path, DEFAULT_PLAYER)] if directory_path else []
+    return [(folder['path'], folder.get('player') or DEFAULT_PLAYER) for folder in stats_folders]
+
+def save_stats_folders(stats_folders):
+    settings.update({
+        'stats_folders': [{'path': directory_path, 'player': player} for directory_path, player in stats_folders],
+        # Keep directory_path pointing at the first folder for anything that only knows about one
+        'directory_path': stats_folders[0][0] if stats_folders else '',
+    })
+
+def load_ingest_settings():
+    # Worker count and pool type ('process' or 'thread') used to parse stat sheets. More workers
+    # than CPUs only add start-up and switching costs, so the count is capped at the CPU count.
+    workers = ingest_workers_override or settings.get('ingest_workers', os.cpu_count() or 1)
+    return min(workers, os.cpu_count() or 1), settings.get('ingest_pool', DEFAULT_INGEST_POOL)
+
+def use_ingest_workers(workers):
+    # Parse with this many workers from now on without changing the saved setting
+    global ingest_workers_override
+    ingest_workers_override = workers
+
+def load_deep_ingest():
+    # DEEP_INGEST_MODES entry saved as deep_ingest: whether sheets are also parsed in full for
+    # the analytics tables, and whether that includes their kill tables
+    return settings.get('deep_ingest', 'off')
+
+def save_deep_ingest(mode):
+    settings.set('deep_ingest', mode)
+
+def load_session_gap():
+    # Minutes without an attempt that end a play session, saved as session_gap_minutes
+    return settings.get('session_gap_minutes', SESSION_GAP_MINUTES)
+
+def save_session_gap(minutes):
+    settings.set('session_gap_minutes', minutes)
+
+def load_derived_cache_bytes():
+    # Memory budget for derived plot series, set in megabytes as derived_cache_mb
+    return int(settings.get('derived_cache_mb', DERIVED_CACHE_BYTES / 2**20) * 2**20)
+
+def save_ingest_workers(workers):
+    settings.set('ingest_workers', workers)
@@ -0,0 +1,376 @@
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from stattrack_archive import ArchiveMember, is_stats_archive, list_archive_members, load_member_data, read_archive_member
+from stattrack_core import (
+    IngestCancelled, indexed_archive_members, REQUIRED_SUMMARY_FIELDS, parse_summary_lines, iter_stat_sheet_batches, load_ingest_settings,
+)
+from stattrack_profile import profiler, DISABLED_PROFILER
+
+# Deep ingest: every field of a sheet's summary block and weapon table, and optionally its
+# kill table, parsed once into tables next to the sheet index. The sheet index stays the
+# source of each attempt's time, scenario and score; these tables join onto it by folder and
+# file name, and remember the sheet's size and mtime so changed sheets are parsed again.
+# Kill rows refer to their attempt by integer id, which keeps the kills table and its index
+# small at millions of rows.
+
+KILL_TABLE_HEADER = 'Kill #,'
+WEAPON_TABLE_HEADER = 'Weapon,Shots,Hits,'
+
+# Summary fields kept per attempt: column name, summary key, and whether it's a number
+DETAIL_FIELDS = (
+    ('kills', 'Kills', True),
+    ('deaths', 'Deaths', True),
+    ('fight_time', 'Fight Time', True),
+    ('avg_ttk', 'Avg TTK', True),
+    ('damage_done', 'Damage Done', True),
+    ('damage_taken', 'Damage Taken', True),
+    ('sens_scale', 'Sens Scale', False),
+    ('horiz_sens', 'Horiz Sens', True),
+    ('vert_sens', 'Vert Sens', True),
+    ('fov', 'FOV', True),
+    ('avg_fps', 'Avg FPS', True),
+)
+
+# Columns summed over the weapon table
+WEAPON_FIELDS = ('shots', 'hits', 'damage_possible')
+
+DETAIL_COLUMNS = tuple(column for column, _, _ in DETAIL_FIELDS) + WEAPON_FIELDS
+
+# Plot metrics built from the detail tables: menu label, axis label and whether it needs kill rows
+DETAIL_METRICS = {
+    'accuracy': ('Accuracy', 'Accuracy', False),
+    'kills': ('Kills', 'Kills', False),
+    'avg_ttk': ('Avg TTK', 'Avg TTK (s)', False),
+    'damage_efficiency': ('Damage Efficiency', 'Damage Done / Possible', False),
+    'avg_fps': ('Avg FPS', 'Avg FPS', False),
+    'ttk_spread': ('TTK Spread', 'TTK Standard Deviation (s)', True),
+    'sensitivity_pb': ('PB per Sensitivity', 'Score', False),
+}
+
+# Settings whose changes are marked on the plot: column and how it's named in the marker
+SETUP_FIELDS = (('sens_scale', 'Sens Scale'), ('horiz_sens', 'Sens'), ('vert_sens', 'Vert Sens'), ('fov', 'FOV'))
+
+def create_detail_tables(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS attempt_details (
+            id INTEGER PRIMARY KEY,
+            directory TEXT NOT NULL,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            has_kills INTEGER NOT NULL,
+            {', '.join(f"{column} {'REAL' if numeric else 'TEXT'}" for column, _, numeric in DETAIL_FIELDS)},
+            {', '.join(f"{column} REAL" for column in WEAPON_FIELDS)},
+            UNIQUE (directory, filename)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS kills (
+            attempt INTEGER NOT NULL,
+            kill INTEGER NOT NULL,
+            ttk REAL,
+            shots INTEGER,
+            hits INTEGER,
+            damage_done REAL,
+            damage_possible REAL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS kills_attempt ON kills (attempt)")
+
+def read_sheet_bytes(file_path):
+    if isinstance(file_path, ArchiveMember):
+        return read_archive_member(file_path)
+    with open(file_path, 'rb') as file:
+        return file.read()
+
+def summary_value(summary, key, numeric):
+    value = summary.get(key)
+    if value is None or not numeric:
+        return value
+    try:
+        return float(value.rstrip('s'))
+    except ValueError:
+        return None
+
+def parse_sheet_details(file_path, include_kills=False, sheet_profiler=DISABLED_PROFILER):
+    # Returns the DETAIL_COLUMNS values and, with include_kills, the (kill, ttk, shots, hits,
+    # damage done, damage possible) rows of the kill table
+    with sheet_profiler.stage('sheet_read_full'):
+        data = read_sheet_bytes(file_path)
+    sheet_profiler.count('bytes_read', len(data))
+
+    with sheet_profiler.stage('sheet_parse_tables'):
+        lines = data.decode('utf-8', errors='replace').split('\n')
+        summary = {}
+        parse_summary_lines(lines, summary)
+        if not all(field in summary for field in REQUIRED_SUMMARY_FIELDS):
+            parse_summary_lines(lines, summary, stop_at_block_start=False)
+
+        weapon_totals = [0.0] * len(WEAPON_FIELDS)
+        has_weapons = False
+        kill_rows = []
+        section = None
+        for line in lines:
+            line = line.strip()
+            if not line:
+                section = None
+            elif line.startswith(KILL_TABLE_HEADER):
+                section = 'kills' if include_kills else None
+            elif line.startswith(WEAPON_TABLE_HEADER):
+                section = 'weapons'
+            elif section == 'kills':
+                fields = line.split(',')
+                try:
+                    kill_rows.append((int(fields[0]), float(fields[4].rstrip('s')), int(fields[5]), int(fields[6]),
+                                      float(fields[8]), float(fields[9])))
+                except (ValueError, IndexError):
+                    # A damaged row only costs that kill
+                    continue
+            elif section == 'weapons':
+                fields = line.split(',')
+                try:
+                    values = (float(fields[1]), float(fields[2]), float(fields[4]))
+                except (ValueError, IndexError):
+                    continue
+                weapon_totals = [total + value for total, value in zip(weapon_totals, values)]
+                has_weapons = True
+
+    details = tuple(summary_value(summary, key, numeric) for _, key, numeric in DETAIL_FIELDS)
+    details += tuple(weapon_totals) if has_weapons else (None,) * len(WEAPON_FIELDS)
+    return details, kill_rows
+
+def parse_sheet_details_batch(sheets, include_kills=False, sheet_profiler=DISABLED_PROFILER):
+    # (details, kill rows, error) for each (path, mtime_ns) pair, with None details for sheets that failed
+    results = []
+    for file_path, _ in sheets:
+        try:
+            results.append((*parse_sheet_details(file_path, include_kills, sheet_profiler), None))
+        except (OSError, ValueError) as error:
+            results.append((None, None, str(error)))
+    return results
+
+def sheet_sources(conn, pending):
+    # Source to read each pending (directory, filename, ...) sheet from: a path for live
+    # folders, an ArchiveMember for archives. Members of archives that haven't changed since
+    # they were indexed come from the index; others are listed once per archive.
+    members = {}
+    for directory_path in {row[0] for row in pending}:
+        if is_stats_archive(directory_path):
+            members[directory_path] = indexed_archive_members(conn, directory_path)
+            if members[directory_path] is None:
+                members[directory_path] = {member.name: member for member, _ in list_archive_members(directory_path)}
+
+    sources = []
+    for directory_path, filename, *_ in pending:
+        if directory_path in members:
+            sources.append(members[directory_path].get(filename))
+        else:
+            sources.append(os.path.join(directory_path, filename))
+
+    # Members of compressed tar files are read in one pass per archive up front
+    streamed = [source for source in sources if isinstance(source, ArchiveMember) and source.kind == 'tar-stream']
+    if streamed:
+        loaded = {(member.archive, member.name): member for member in load_member_data(streamed)}
+        sources = [loaded.get((source.archive, source.name), source) if isinstance(source, ArchiveMember) else source for source in sources]
+    return sources
+
+def update_attempt_details(conn, directory_paths, include_kills=False, progress=None, cancel_event=None):
+    # Parse the sheets of the given (already indexed) folders that have no up-to-date details
+    # yet. With include_kills, sheets parsed earlier without their kill table are parsed again.
+    # Returns the number of sheets parsed.
+    create_detail_tables(conn)
+    directory_paths = [os.path.abspath(directory_path) for directory_path in directory_paths]
+
+    with profiler.stage('details_lookup'), conn:
+        pending = []
+        for directory_path in directory_paths:
+            # Forget details of sheets that have since changed or gone
+            stale = """
+                SELECT id FROM attempt_details AS d WHERE d.directory = ? AND NOT EXISTS (
+                    SELECT 1 FROM sheets AS s
+                    WHERE s.directory = d.directory AND s.filename = d.filename AND s.size = d.size AND s.mtime_ns = d.mtime_ns)
+            """
+            conn.execute(f"DELETE FROM kills WHERE attempt IN ({stale})", (directory_path,))
+            conn.execute(f"DELETE FROM attempt_details WHERE id IN ({stale})", (directory_path,))
+
+            pending += conn.execute("""
+                SELECT s.directory, s.filename, s.size, s.mtime_ns, d.id FROM sheets AS s
+                LEFT JOIN attempt_details AS d ON d.directory = s.directory AND d.filename = s.filename
+                WHERE s.directory = ? AND s.scenario IS NOT NULL AND (d.id IS NULL OR (? AND NOT d.has_kills))
+            """, (directory_path, include_kills)).fetchall()
+    if not pending:
+        return 0
+
+    with profiler.stage('ingest_details'):
+        sources = sheet_sources(conn, pending)
+        pending = [row for row, source in zip(pending, sources) if source is not None]
+        sources = [source for source in sources if source is not None]
+
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM attempt_details").fetchone()[0]
+        workers, pool = load_ingest_settings()
+        parse_batch = partial(parse_sheet_details_batch, include_kills=include_kills)
+        done = 0
+        for batch, results in iter_stat_sheet_batches(((source, None) for source in sources), workers, pool, parse_batch=parse_batch):
+            detail_rows = []
+            kill_rows = []
+            replaced = []
+            for (directory_path, filename, size, mtime_ns, old_id), (details, kills, _) in zip(pending[done:done + len(batch)], results):
+                if old_id is not None:
+                    replaced.append((old_id,))
+                # Sheets whose tables can't be read still get a row, so they aren't retried every time
+                details = details or (None,) * len(DETAIL_COLUMNS)
+                detail_rows.append((next_id, directory_path, filename, size, mtime_ns, include_kills, *details))
+                kill_rows += [(next_id, *kill) for kill in kills or ()]
+                next_id += 1
+
+            with profiler.stage('details_write'), conn:
+                conn.executemany("DELETE FROM kills WHERE attempt = ?", replaced)
+                conn.executemany("DELETE FROM attempt_details WHERE id = ?", replaced)
+                conn.executemany(
+                    f"INSERT INTO attempt_details VALUES ({', '.join('?' * (6 + len(DETAIL_COLUMNS)))})", detail_rows)
+                conn.executemany("INSERT INTO kills VALUES (?, ?, ?, ?, ?, ?, ?)", kill_rows)
+            profiler.count('kill_rows', len(kill_rows))
+            done += len(batch)
+
+            if progress:
+                progress(done, len(pending))
+            if cancel_event is not None and cancel_event.is_set():
+                raise IngestCancelled()
+    return done
+
+def load_attempt_details(conn, stats_folders, selected_challenges, with_ttk_spread=False):
+    # One row per attempt of the selected challenges that has details, from the (folder, player)
+    # pairs: Datetime, Challenge, Score, Player and the DETAIL_COLUMNS, plus ttk_spread (from the
+    # kill table) if asked for. Like ScoreDataset, an attempt a player already has from another
+    # folder is dropped, so metric plots count the same attempts as score plots.
+    create_detail_tables(conn)
+    selected_challenges = list(dict.fromkeys(selected_challenges))
+    columns = ', '.join(f"d.{column}" for column in DETAIL_COLUMNS)
+    frames = []
+    for directory_path, player in stats_folders:
+        # Query in chunks to stay under SQLite's bound-parameter limit
+        for start in range(0, len(selected_challenges), 500):
+            chunk = selected_challenges[start:start + 500]
+            df = pd.read_sql_query(f"""
+                SELECT d.id, s.datetime AS Datetime, s.scenario AS Challenge, s.score AS Score, {columns}
+                FROM sheets AS s JOIN attempt_details AS d ON d.directory = s.directory AND d.filename = s.filename
+                WHERE s.directory = ? AND s.scenario IN ({', '.join('?' * len(chunk))})
+            """, conn, params=(os.path.abspath(directory_path), *chunk))
+            df['Player'] = player
+            frames.append(df)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['id', 'Datetime', 'Challenge', 'Score', *DETAIL_COLUMNS, 'Player'])
+    df['Datetime'] = pd.to_datetime(df['Datetime'], format='ISO8601')
+    df['Player'] = pd.Categorical(df['Player'], categories=list(dict.fromkeys(player for _, player in stats_folders)))
+    df = df.drop_duplicates(['Player', 'Challenge', 'Datetime', 'Score'], ignore_index=True)
+
+    if with_ttk_spread:
+        # Standard deviation of each attempt's kill times, aggregated inside SQLite over the kills index
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_attempts (id INTEGER PRIMARY KEY)")
+        conn.execute("DELETE FROM selected_attempts")
+        conn.executemany("INSERT INTO selected_attempts VALUES (?)", ((int(attempt),) for attempt in df['id']))
+        spread = pd.read_sql_query("""
+            SELECT k.attempt AS id, AVG(k.ttk) AS mean, AVG(k.ttk * k.ttk) AS mean_square, COUNT(*) AS kill_count
+            FROM selected_attempts AS a JOIN kills AS k ON k.attempt = a.id GROUP BY k.attempt
+        """, conn)
+        spread['ttk_spread'] = np.sqrt(np.maximum(spread['mean_square'] - spread['mean'] ** 2, 0))
+        df = df.merge(spread[['id', 'ttk_spread']], on='id', how='left')
+    return df.sort_values('Datetime', kind='stable', ignore_index=True)
+
+def attempt_metric(df, metric):
+    # The metric's value per attempt as a float array (NaN where the sheet didn't have it)
+    def column(name):
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if metric == 'accuracy':
+            return column('hits') / column('shots')
+        if metric == 'damage_efficiency':
+            return column('damage_done') / column('damage_possible')
+    if metric == 'sensitivity_pb':
+        return column('Score')
+    return column(metric)
+
+def prepare_metric_plot_data(df, selected_challenges, metric, aggregate=False, start=None, end=None, compare_players=False):
+    # Plot data in the shape prepare_plot_data returns, for a DETAIL_METRICS metric of the
+    # attempts from load_attempt_details. With aggregate, one line of the daily mean across
+    # challenges; sensitivity_pb draws each challenge's running PB separately per sensitivity.
+    # start and end (dates, inclusive) limit what is shown. With compare_players, each player
+    # gets lines of their own, labelled with their name as prepare_player_plot_data does.
+    if compare_players:
+        lines = []
+        for player, rows in df.groupby('Player', observed=True, sort=True):
+            plot_data = prepare_metric_plot_data(rows, selected_challenges, metric, aggregate, start, end)
+            lines += [(f'{player}: {label}', x, y) for label, x, y in plot_data['lines']]
+        return {'lines': lines, 'starts': [], 'ylabel': DETAIL_METRICS[metric][1]}
+
+    values = attempt_metric(df, metric)
+    keep = ~np.isnan(values)
+    days = df['Datetime'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+    if start is not None:
+        keep &= days >= np.datetime64(start, 'D')
+    if end is not None:
+        keep &= days <= np.datetime64(end, 'D')
+    df, values = df[keep], values[keep]
+    times = df['Datetime'].to_numpy(dtype='datetime64[ns]')
+    challenges = df['Challenge'].to_numpy(dtype=object)
+    lines = []
+
+    if metric == 'sensitivity_pb':
+        sensitivities = (df['horiz_sens'].map(lambda sens: 'unknown' if pd.isna(sens) else f'{sens:g}').astype(object)
+                         + ' ' + df['sens_scale'].fillna('')).str.strip().to_numpy(dtype=object)
+        # Running PB per (challenge, sensitivity) in one pass, then each group's rows in the
+        # order of the selection, sensitivities in the order they were first used
+        groups = pd.Series(values).groupby([challenges, sensitivities], sort=False)
+        bests = groups.cummax().to_numpy()
+        order = {challenge: position for position, challenge in enumerate(dict.fromkeys(selected_challenges))}
+        for (challenge, sensitivity), rows in sorted(groups.indices.items(), key=lambda group: (order.get(group[0][0], len(order)), group[1][0])):
+            if challenge in order:
+                lines.append((f'{challenge} @ {sensitivity}', times[rows], bests[rows]))
+    elif aggregate:
+        days, day_index = np.unique(times.astype('datetime64[D]'), return_inverse=True)
+        means = np.bincount(day_index, weights=values, minlength=len(days)) / np.bincount(day_index, minlength=len(days))
+        lines.append((f'Aggregate {DETAIL_METRICS[metric][0]}', days, means))
+    else:
+        for challenge in dict.fromkeys(selected_challenges):
+            rows = challenges == challenge
+            if rows.any():
+                lines.append((challenge, times[rows], values[rows]))
+
+    return {'lines': lines, 'starts': [], 'ylabel': DETAIL_METRICS[metric][1]}
+
+def load_setup_changes(conn, stats_folders):
+    # Points of interest, in the points_of_interest.json format, for each day the sensitivity
+    # or FOV changed from one attempt to the next. Each player's folders are followed on their
+    # own, so two players' settings never read as a change; with several players, markers
+    # are labelled with whose setup changed.
+    create_detail_tables(conn)
+    players = list(dict.fromkeys(player for _, player in stats_folders))
+    points = []
+    for player in players:
+        frames = [
+            pd.read_sql_query(f"""
+                SELECT s.datetime AS Datetime, {', '.join(f'd.{column}' for column, _ in SETUP_FIELDS)}
+                FROM sheets AS s JOIN attempt_details AS d ON d.directory = s.directory AND d.filename = s.filename
+                WHERE s.directory = ?
+            """, conn, params=(os.path.abspath(directory_path),))
+            for directory_path, folder_player in stats_folders if folder_player == player
+        ]
+        df = pd.concat(frames, ignore_index=True)
+        if df.empty:
+            continue
+        df = df.sort_values('Datetime', kind='stable', ignore_index=True)
+        prefix = f'{player}: ' if len(players) > 1 else ''
+
+        for column, name in SETUP_FIELDS:
+            # Carry the last known value over sheets that don't record it
+            values = df[column].ffill()
+            changed = values.ne(values.shift()) & values.shift().notna()
+            for row in np.flatnonzero(changed.to_numpy()):
+                before, after = values.iloc[row - 1], values.iloc[row]
+                text = f"{name} {before:g} -> {after:g}" if isinstance(after, float) else f"{name} {before} -> {after}"
+                points.append({'name': prefix + text, 'date': df['Datetime'].iloc[row][:10]})
+    return sorted(points, key=lambda point: point['date'])
@@ -0,0 +1,197 @@
+import tkinter as tk
+from tkinter import font as tkfont, ttk
+
+import pandas as pd
+
+# The challenge list in the main window. Only the rows that fit on screen exist as Treeview
+# items; scrolling re-fills them from the backing list of names, so showing tens of thousands
+# of scenarios costs the same as showing a screenful.
+
+# Columns after the challenge name: heading, width, and whether the largest values sort first
+STAT_COLUMNS = (
+    ('Attempts', 70, True),
+    ('PB', 80, True),
+    ('Last Played', 90, True),
+    ('Trend', 70, True),
+)
+
+class ChallengeTable(ttk.Frame):
+    # Multi-select table of challenges with per-challenge stats. Clicking a row toggles it, as
+    # the Listbox it replaces did in MULTIPLE mode. Selection is kept by name, so it survives
+    # scrolling and sorting.
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.names = []        # Challenges shown, in display order
+        self.positions = {}    # Name -> position in names
+        self.selected = set()
+        self.counts = {}       # Attempt counts from the folder scan, until stats are available
+        self.stats = {}        # Name -> (attempts, PB, last played, trend)
+        self.sort_column = None
+        self.sort_descending = False
+        self.top = 0           # Position of the first visible row
+        self.visible_rows = 1
+
+        columns = ('Challenge',) + tuple(column for column, _, _ in STAT_COLUMNS)
+        self.tree = ttk.Treeview(self, columns=columns, show='headings', selectmode='none', height=10)
+        self.tree.heading('Challenge', text='Challenge', command=lambda: self.sort_by('Challenge'))
+        self.tree.column('Challenge', width=260, stretch=True)
+        for column, width, _ in STAT_COLUMNS:
+            self.tree.heading(column, text=column, command=lambda c=column: self.sort_by(c))
+            self.tree.column(column, width=width, stretch=False, anchor=tk.E)
+        self.tree.tag_configure('selected', background='#cce4ff')
+
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind('<Button-1>', self.on_click)
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<MouseWheel>', lambda event: self.scroll(-3 if event.delta > 0 else 3, 'units'))
+        self.tree.bind('<Button-4>', lambda event: self.scroll(-3, 'units'))
+        self.tree.bind('<Button-5>', lambda event: self.scroll(3, 'units'))
+
+    def set_challenges(self, names):
+        # Show names (keeping the current sort); challenges no longer shown are deselected
+        self.names = list(names)
+        if self.sort_column is not None:
+            self.sort_names()
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self.selected &= self.positions.keys()
+        self.top = 0
+        self.refresh()
+
+    def append(self, name):
+        # Add one challenge at the end without re-sorting, so rows don't jump while a scan streams in
+        if name in self.positions:
+            return
+        self.positions[name] = len(self.names)
+        self.names.append(name)
+        if len(self.names) - self.top <= self.visible_rows:
+            self.refresh()
+        else:
+            self.update_scrollbar()
+
+    def set_counts(self, counts):
+        self.counts = counts
+        self.refresh()
+
+    def set_stats(self, stats):
+        # stats is a DataFrame indexed by challenge, as returned by ScoreStore.challenge_stats, or None to clear them
+        if stats is None:
+            self.stats = {}
+        else:
+            self.stats = dict(zip(stats.index, stats[[column for column, _, _ in STAT_COLUMNS]].itertuples(index=False, name=None)))
+        if self.sort_column not in (None, 'Challenge'):
+            self.sort_names()
+            self.positions = {name: position for position, name in enumerate(self.names)}
+        self.refresh()
+
+    def select(self, names):
+        # Select the named challenges that are currently shown
+        self.selected.update(name for name in names if name in self.positions)
+        self.refresh()
+
+    def clear_selection(self):
+        self.selected.clear()
+        self.refresh()
+
+    def selection(self):
+        # Selected challenges in display order
+        return [name for name in self.names if name in self.selected]
+
+    def sort_by(self, column):
+        # Clicking the same heading again reverses the order
+        if self.sort_column == column:
+            self.sort_descending = not self.sort_descending
+        else:
+            self.sort_column = column
+            self.sort_descending = any(column == name and descending for name, _, descending in STAT_COLUMNS)
+        self.sort_names()
+        self.positions = {name: position for position, name in enumerate(self.names)}
+        self.top = 0
+        self.refresh()
+
+    def sort_names(self):
+        if self.sort_column == 'Challenge':
+            self.names.sort(key=str.lower, reverse=self.sort_descending)
+            return
+        index = [column for column, _, _ in STAT_COLUMNS].index(self.sort_column)
+
+        # Challenges without a value go last whichever way the column is sorted
+        def value(name):
+            row = self.stats.get(name)
+            if index == 0 and row is None:
+                return self.counts.get(name)
+            return None if row is None or pd.isna(row[index]) else row[index]
+
+        keyed = [(value(name), name) for name in self.names]
+        present = sorted((item for item in keyed if item[0] is not None), key=lambda item: item[0], reverse=self.sort_descending)
+        self.names = [name for _, name in present] + [name for key, name in keyed if key is None]
+
+    def row_values(self, name):
+        row = self.stats.get(name)
+        if row is None:
+            count = self.counts.get(name)
+            return (name, '' if count is None else count, '', '', '')
+        attempts, best, last_played, trend = row
+        return (
+            name,
+            attempts,
+            f'{best:g}',
+            pd.Timestamp(last_played).strftime('%Y-%m-%d'),
+            '' if pd.isna(trend) else f'{trend:+.1%}',
+        )
+
+    def refresh(self):
+        # Re-fill the on-screen items from names[top:top + visible_rows]
+        self.top = max(0, min(self.top, len(self.names) - self.visible_rows))
+        shown = self.names[self.top:self.top + self.visible_rows]
+        items = self.tree.get_children()
+        for item, name in zip(items, shown):
+            self.tree.item(item, values=self.row_values(name), tags=('selected',) if name in self.selected else ())
+        for name in shown[len(items):]:
+            self.tree.insert('', tk.END, values=self.row_values(name), tags=('selected',) if name in self.selected else ())
+        if len(items) > len(shown):
+            self.tree.delete(*items[len(shown):])
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        if not self.names:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(self.top / len(self.names), min(1, (self.top + self.visible_rows) / len(self.names)))
+
+    def scroll(self, amount, what):
+        step = self.visible_rows if what == 'pages' else 1
+        self.top += int(amount) * step
+        self.refresh()
+
+    def on_scrollbar(self, action, amount, what=None):
+        if action == 'moveto':
+            self.top = int(float(amount) * len(self.names))
+            self.refresh()
+        else:
+            self.scroll(amount, what)
+
+    def on_resize(self, event):
+        # Fit as many items as the Treeview has room for, below the heading
+        row_height = ttk.Style().lookup('Treeview', 'rowheight') or tkfont.nametofont('TkDefaultFont').metrics('linespace') + 4
+        visible_rows = max(1, event.height // int(row_height) - 1)
+        if visible_rows != self.visible_rows:
+            self.visible_rows = visible_rows
+            self.refresh()
+
+    def on_click(self, event):
+        if self.tree.identify_region(event.x, event.y) != 'cell':
+            return
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return 'break'
+        name = self.names[self.top + self.tree.index(item)]
+        if name in self.selected:
+            self.selected.remove(name)
+        else:
+            self.selected.add(name)
+        self.tree.item(item, tags=('selected',) if name in self.selected else ())
+        return 'break'
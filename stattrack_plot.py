@@ -0,0 +1,182 @@
+from datetime import datetime
+
+import numpy as np
+from matplotlib import colormaps
+from matplotlib import dates as mdates
+from matplotlib.figure import Figure
+from matplotlib.ticker import AutoLocator, FixedFormatter, FixedLocator, MaxNLocator, ScalarFormatter
+
+from stattrack_core import downsample_indices
+
+# Drawing for prepared plot data. Shared by the Tk app, which embeds the figure in its
+# window, and the CLI, which renders straight to a file without a display.
+
+# Markers are only drawn once a line has at most this many points in view
+MARKER_THRESHOLD = 300
+
+# Title and x axis label for each of the core's X_AXIS_MODES
+X_AXIS_LABELS = {
+    'date': ('Scores Over Time', 'Date and Time'),
+    'session': ('Scores by Session', 'Session'),
+    'warmup': ('Warm-up', 'Attempt in Session'),
+}
+
+class DownsampledLines:
+    # Keeps the full series behind each line and redraws only what fits the current view:
+    # min/max per pixel column when zoomed out, every point with markers when zoomed in.
+
+    def __init__(self, ax, marker_threshold=MARKER_THRESHOLD):
+        self.ax = ax
+        self.marker_threshold = marker_threshold
+        self.series = []  # (line, x as matplotlib date numbers, y)
+
+        # Recompute when the view is zoomed, panned or resized. Lambdas rather than bound
+        # methods, since matplotlib only keeps weak references to bound methods.
+        ax.callbacks.connect('xlim_changed', lambda ax: self.update())
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self.update())
+
+    def set_series(self, series, dates=True, drawstyle='default'):
+        # Show (label, x, y) series, reusing the existing line artists in order and
+        # only creating or removing lines when the number of series changes
+        for position, (label, x, y) in enumerate(series):
+            x = np.asarray(mdates.date2num(x) if dates else x, dtype=np.float64)
+            y = np.asarray(y, dtype=np.float64)
+            if position < len(self.series):
+                line = self.series[position][0]
+                line.set_label(label)
+                line.set_drawstyle(drawstyle)
+                self.series[position] = (line, x, y)
+            else:
+                line, = self.ax.plot([], [], marker='o', label=label, drawstyle=drawstyle)
+                self.series.append((line, x, y))
+        for line, _, _ in self.series[len(series):]:
+            line.remove()
+        del self.series[len(series):]
+        self.show_all()
+
+    def show_all(self):
+        # Downsample for the full x range of the data, ready for the axes to autoscale to it
+        x_min, x_max = self.data_limits()
+        for line, x, y in self.series:
+            self.update_line(line, x, y, x_min, x_max)
+
+    def data_limits(self):
+        # The full x range of every line, used before the axes have settled on a view
+        starts = [x[0] for _, x, _ in self.series if len(x)]
+        ends = [x[-1] for _, x, _ in self.series if len(x)]
+        return (min(starts), max(ends)) if starts else (0.0, 1.0)
+
+    def update_line(self, line, x, y, x_min, x_max):
+        buckets = max(int(self.ax.bbox.width), 1)
+        rows = downsample_indices(x, y, x_min, x_max, buckets)
+        line.set_data(x[rows], y[rows])
+        in_view = np.searchsorted(x, x_max, side='right') - np.searchsorted(x, x_min, side='left')
+        line.set_marker('o' if in_view <= self.marker_threshold else '')
+
+    def update(self):
+        x_min, x_max = self.ax.get_xlim()
+        for line, x, y in self.series:
+            self.update_line(line, x, y, x_min, x_max)
+        self.ax.figure.canvas.draw_idle()
+
+class ScoresPlot:
+    # The score plot on one reusable figure. Showing new plot data updates the existing
+    # artists in place rather than clearing and rebuilding the axes.
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.ax.xaxis_date()
+        self.ax.tick_params(axis='x', labelrotation=45)
+        self.x_axis = None
+        self.set_x_axis('date')
+        self.yticks = None
+        self.lines = DownsampledLines(self.ax)
+        self.markers = []  # Vertical lines for benchmark starts and points of interest
+        self.legend_labels = None
+
+    def set_x_axis(self, x_axis):
+        # Dates get date ticks; session numbers and attempt numbers get whole-number ticks
+        if x_axis == self.x_axis:
+            return
+        if x_axis == 'date':
+            locator = mdates.AutoDateLocator()
+            self.ax.xaxis.set_major_locator(locator)
+            self.ax.xaxis.set_major_formatter(mdates.AutoDateFormatter(locator))
+        else:
+            self.ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+            self.ax.xaxis.set_major_formatter(ScalarFormatter())
+        self.ax.set_xlabel(X_AXIS_LABELS[x_axis][1])
+        self.x_axis = x_axis
+
+    def set_y_ticks(self, yticks):
+        # Named ticks such as rank names at fixed values, or plain numbers when yticks is None
+        if yticks == self.yticks:
+            return
+        if yticks:
+            values, names = zip(*yticks)
+            self.ax.yaxis.set_major_locator(FixedLocator(values))
+            self.ax.yaxis.set_major_formatter(FixedFormatter(names))
+        else:
+            self.ax.yaxis.set_major_locator(AutoLocator())
+            self.ax.yaxis.set_major_formatter(ScalarFormatter())
+        self.yticks = yticks
+
+    def show(self, plot_data, normalize=False, points_of_interest=()):
+        x_axis = plot_data.get('x_axis', 'date')
+        self.set_x_axis(x_axis)
+        self.ax.set_title(plot_data.get('title', X_AXIS_LABELS[x_axis][0]))
+        self.set_y_ticks(plot_data.get('yticks'))
+        self.lines.set_series(plot_data['lines'], dates=x_axis == 'date', drawstyle=plot_data.get('drawstyle', 'default'))
+
+        colors = colormaps['tab10'].colors  # Use a colormap with distinct colors
+        markers = [
+            (label, x, colors[color_index % len(colors)])
+            for color_index, (label, x) in enumerate(plot_data['starts'])
+        ]
+        # Draw vertical lines for points of interest
+        if x_axis == 'date':
+            markers += [(poi['name'], datetime.strptime(poi['date'], '%Y-%m-%d'), 'red') for poi in points_of_interest]
+        elif 'session_starts' in plot_data:
+            # Between the last session that started before the date and the first one after it
+            session_starts = plot_data['session_starts']
+            markers += [
+                (poi['name'], np.searchsorted(session_starts, np.datetime64(poi['date'], 'ns')) + 0.5, 'red')
+                for poi in points_of_interest
+            ]
+
+        for position, (label, x, color) in enumerate(markers):
+            if x_axis == 'date':
+                x = mdates.date2num(x)
+            if position < len(self.markers):
+                artist = self.markers[position]
+                artist.set_xdata([x, x])
+                artist.set_label(label)
+                artist.set_color(color)
+            else:
+                self.markers.append(self.ax.axvline(x=x, color=color, linestyle='--', label=label))
+        for artist in self.markers[len(markers):]:
+            artist.remove()
+        del self.markers[len(markers):]
+
+        self.ax.set_ylabel(plot_data.get('ylabel', 'Score') + (' (Normalized)' if normalize else ''))
+        # Adding a marker outside the current view autoscales the axes, which re-downsamples the
+        # lines for that view; go back to the whole series before autoscaling to them
+        self.lines.show_all()
+        self.ax.relim()
+        self.ax.autoscale(enable=True)
+        self.ax.autoscale_view()
+        # A fixed legend location: 'best' searches every plotted point on each draw.
+        # The legend is only rebuilt when the labels actually change.
+        labels = [artist.get_label() for artist in self.ax.get_lines()]
+        if labels != self.legend_labels:
+            self.ax.legend(loc='upper left', bbox_to_anchor=(1.01, 1), fontsize='small')
+            self.legend_labels = labels
+        self.figure.canvas.draw_idle()
+
+def save_scores_plot(filename, plot_data, normalize=False, points_of_interest=()):
+    # Render to an image file (format from the extension) without going through pyplot
+    figure = Figure(figsize=(10, 6))
+    ScoresPlot(figure).show(plot_data, normalize, points_of_interest)
+    figure.tight_layout()
+    figure.savefig(filename)
@@ -0,0 +1,111 @@
+import json
+import time
+from collections import Counter
+
+# Timing instrumentation for ingestion and plotting. The shared `profiler` is off by default;
+# the GUI's Debug menu and the CLI's --profile flag turn it on.
+#
+# Stages prefixed with sheet_ are timed inside the parsing workers and summed across them, so
+# with several workers they can add up to more than the ingest_sheets wall time.
+
+class StageTimer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+class NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = NullStage()
+
+class Profiler:
+    # Wall time and call count per named stage, plus named counters. While disabled, stage()
+    # hands back a shared no-op context manager and count() returns straight away, so
+    # instrumented code only pays for an attribute check.
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.stages = {}        # Stage name -> [calls, seconds]
+        self.counters = Counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return StageTimer(self, name)
+
+    def add(self, name, seconds, calls=1):
+        entry = self.stages.setdefault(name, [0, 0.0])
+        entry[0] += calls
+        entry[1] += seconds
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        # Picklable copy of the raw numbers, so worker processes can send theirs back
+        return {'stages': {name: list(entry) for name, entry in self.stages.items()}, 'counters': dict(self.counters)}
+
+    def merge(self, snapshot):
+        for name, (calls, seconds) in snapshot['stages'].items():
+            self.add(name, seconds, calls)
+        self.counters.update(snapshot['counters'])
+
+    def report(self):
+        counters = dict(self.counters)
+        rates = {}
+        ingest = self.stages.get('ingest_sheets')
+        if ingest and ingest[1] > 0:
+            rates['sheets_per_second'] = counters.get('sheets_read', 0) / ingest[1]
+            rates['megabytes_per_second'] = counters.get('bytes_read', 0) / 2**20 / ingest[1]
+        lookups = counters.get('derived_cache_hits', 0) + counters.get('derived_cache_misses', 0)
+        if lookups:
+            rates['derived_cache_hit_rate'] = counters.get('derived_cache_hits', 0) / lookups
+        return {
+            'stages': {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in self.stages.items()},
+            'counters': counters,
+            'rates': rates,
+        }
+
+    def save_report(self, filename):
+        with open(filename, 'w') as file:
+            json.dump(self.report(), file, indent=4)
+
+    def format_report(self):
+        # Plain-text version of report() for the GUI
+        report = self.report()
+        lines = [f"{'Stage':<28}{'Calls':>8}{'Seconds':>11}"]
+        for name, stage in sorted(report['stages'].items(), key=lambda item: -item[1]['seconds']):
+            lines.append(f"{name:<28}{stage['calls']:>8}{stage['seconds']:>11.3f}")
+        if report['counters']:
+            lines.append('')
+            lines.extend(f"{name:<28}{value:>19,}" for name, value in sorted(report['counters'].items()))
+        if report['rates']:
+            lines.append('')
+            lines.extend(f"{name:<28}{value:>19,.2f}" for name, value in report['rates'].items())
+        return '\n'.join(lines)
+
+# Shared by the app and the CLI
+profiler = Profiler()
+
+# Stand-in for code that takes a profiler argument but isn't being profiled
+DISABLED_PROFILER = Profiler()
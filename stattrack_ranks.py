@@ -0,0 +1,207 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from stattrack_settings import settings
+
+# Voltaic benchmark ranks. voltaic_ranks.json gives, for each season and level, the level's
+# ranks (lowest first) and each scenario's score thresholds for them, one per rank; a level
+# whose ranks are null, and a scenario whose thresholds are null, is left out until they are
+# filled in. The copy in the repo is an empty template: the one used lives next to
+# settings.json, copied from the template the first time, for the user to fill in.
+#
+# Ranks follow the benchmark's energy system: a score is worth one point per threshold it
+# reaches plus the fraction of the way to the next one, capped at the level's top rank. A
+# level's energy is the mean over its scenarios (unplayed ones count 0), and the whole part of
+# it is the rank reached. A season's rank is the highest reached in any of its levels, with
+# the levels' ranks one ladder: the ranks of a level sit above those of the level before it.
+#
+# Every (level, scenario) pair of a season is a slot with a row in one threshold table, so the
+# rank over time of a whole season is a single sweep over its attempts: running PB per slot,
+# energy per PB, then a running sum of the energy changes per level.
+
+RANKS_FILE = 'voltaic_ranks.json'
+
+class SeasonRanks:
+    # A season's thresholds as arrays, built once when the ranks file is loaded
+
+    def __init__(self, season, levels):
+        self.season = season
+        self.levels = []          # Levels with thresholds, easiest first
+        self.rank_names = []      # The season's whole ladder, lowest rank first
+        offsets = []              # Ladder position just below each level's first rank
+        self.scenarios = []       # Scenario of each slot
+        slot_levels = []
+        rows = []
+        for level, ranks in levels.items():
+            thresholds = {scenario: values for scenario, values in ranks['thresholds'].items() if values is not None}
+            if not thresholds or ranks['ranks'] is None:
+                continue
+            for scenario, values in thresholds.items():
+                if len(values) != len(ranks['ranks']) or any(high <= low for low, high in zip(values, values[1:])):
+                    raise ValueError(f"{season} {level} {scenario}: expected {len(ranks['ranks'])} rising thresholds, got {values}")
+                self.scenarios.append(scenario)
+                slot_levels.append(len(self.levels))
+                rows.append(values)
+            offsets.append(len(self.rank_names))
+            self.levels.append(level)
+            self.rank_names += ranks['ranks']
+
+        # Thresholds per slot after a leading 0, padded with inf where a level has fewer ranks
+        width = max((len(values) for values in rows), default=0)
+        self.thresholds = np.full((len(rows), width + 1), np.inf)
+        self.thresholds[:, 0] = 0
+        for slot, values in enumerate(rows):
+            self.thresholds[slot, 1:len(values) + 1] = values
+        self.rank_counts = np.array([len(values) for values in rows], dtype=np.int64)
+        self.slot_levels = np.array(slot_levels, dtype=np.int64)
+        self.level_offsets = np.array(offsets, dtype=np.float64)
+        self.level_sizes = np.bincount(self.slot_levels, minlength=len(self.levels))
+        # Tells cached timelines apart once the ranks file is edited
+        self.version = hash((tuple(self.scenarios), tuple(self.rank_names), self.thresholds.tobytes()))
+
+    def energy(self, slots, scores):
+        # Energy of each score on its slot's scenario
+        rows = np.arange(len(slots))
+        table = self.thresholds[slots]
+        reached = (table[:, 1:] <= scores[:, None]).sum(axis=1)
+        lower = table[rows, reached]
+        upper = table[rows, np.minimum(reached + 1, table.shape[1] - 1)]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.clip((scores - lower) / (upper - lower), 0, 1)
+        counts = self.rank_counts[slots]
+        return np.where(reached >= counts, counts, reached + np.nan_to_num(fraction))
+
+    def season_value(self, level_energies):
+        # Season progress for rows of per-level energies: ladder position of the highest level
+        # with a rank reached, plus that level's progress; the first level counts from 0
+        level_energies = np.round(level_energies, 9)
+        values = level_energies + self.level_offsets
+        values[:, 1:] = np.where(level_energies[:, 1:] >= 1, values[:, 1:], 0)
+        return values.max(axis=1) if len(self.levels) else np.zeros(len(level_energies))
+
+    def rank_name(self, value):
+        rank = int(np.floor(value))
+        return self.rank_names[rank - 1] if rank > 0 else 'Unranked'
+
+def ranks_file_path():
+    # The user's ranks file next to settings.json, copied from the template if there is none yet
+    path = os.path.join(os.path.dirname(settings.path()), RANKS_FILE)
+    template = os.path.join(os.path.dirname(os.path.abspath(__file__)), RANKS_FILE)
+    if not os.path.exists(path) and os.path.exists(template):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        shutil.copyfile(template, path)
+    return path
+
+def load_voltaic_ranks(filename=None):
+    # {season: SeasonRanks} for the seasons with at least one scenario's thresholds filled in;
+    # filename defaults to ranks_file_path()
+    filename = filename or ranks_file_path()
+    if not os.path.exists(filename):
+        return {}
+    with open(filename, 'r') as file:
+        seasons = json.load(file)
+    season_ranks = {season: SeasonRanks(season, levels) for season, levels in seasons.items()}
+    return {season: ranks for season, ranks in season_ranks.items() if ranks.levels}
+
+def slot_rows(store, season_ranks):
+    # Store rows of every slot's attempts, each slot's time-ordered, with the slot of each row.
+    # A scenario in two levels has its rows listed once per slot.
+    codes = np.array([store.scenario_codes.get(scenario, -1) for scenario in season_ranks.scenarios], dtype=np.int64)
+    played = codes >= 0
+    starts = np.zeros(len(codes), dtype=np.int64)
+    lengths = np.zeros(len(codes), dtype=np.int64)
+    starts[played] = store.offsets[codes[played]]
+    lengths[played] = store.offsets[codes[played] + 1] - starts[played]
+    slots = np.repeat(np.arange(len(codes)), lengths)
+    first_rows = np.cumsum(lengths) - lengths
+    rows = np.repeat(starts - first_rows, lengths) + np.arange(lengths.sum())
+    return rows, slots, first_rows[lengths > 0]
+
+def rank_timeline(store, season_ranks):
+    # (times, season progress) at every attempt that changed it, plus the season's last attempt.
+    # The whole part of the progress is the rank's place on the ladder (0 is unranked).
+    rows, slots, first_rows = slot_rows(store, season_ranks)
+    if not len(rows):
+        return np.empty(0, dtype='datetime64[ns]'), np.empty(0)
+    best = pd.Series(store.scores[rows]).groupby(slots, sort=False).cummax().to_numpy()
+    energy = season_ranks.energy(slots, best)
+
+    # Each attempt's change to its slot's energy, as a share of its level's mean
+    previous = np.concatenate(([0.0], energy[:-1]))
+    previous[first_rows] = 0
+    change = (energy - previous) / season_ranks.level_sizes[season_ranks.slot_levels[slots]]
+
+    order = np.argsort(store.times[rows], kind='stable')
+    level_changes = np.zeros((len(order), len(season_ranks.levels)))
+    level_changes[np.arange(len(order)), season_ranks.slot_levels[slots[order]]] = change[order]
+    values = season_ranks.season_value(np.cumsum(level_changes, axis=0))
+
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:-1] = values[1:-1] != values[:-2]
+    times = store.times[rows][order]
+    return times[keep].view('datetime64[ns]'), values[keep]
+
+def rank_tables(store, season_ranks):
+    # Current standing: a row per slot (level, scenario, PB, rank, next rank and the score it
+    # needs, energy), a row per level (energy and rank), and the season's rank
+    stats = store.challenge_stats()
+    pbs = stats['PB'].reindex(season_ranks.scenarios).to_numpy(dtype=np.float64)
+    slots = np.arange(len(season_ranks.scenarios))
+    energy = season_ranks.energy(slots, np.nan_to_num(pbs, nan=-np.inf))
+    reached = np.floor(np.round(energy, 9)).astype(np.int64)
+    offsets = season_ranks.level_offsets[season_ranks.slot_levels].astype(np.int64)
+    next_scores = season_ranks.thresholds[slots, np.minimum(reached + 1, season_ranks.thresholds.shape[1] - 1)]
+    has_next = reached < season_ranks.rank_counts
+
+    scenarios = pd.DataFrame({
+        'Level': [season_ranks.levels[level] for level in season_ranks.slot_levels],
+        'Scenario': season_ranks.scenarios,
+        'PB': pbs,
+        'Rank': [season_ranks.rank_names[offset + rank - 1] if rank else '' for offset, rank in zip(offsets, reached)],
+        'Next Rank': [season_ranks.rank_names[offset + rank] if more else '' for offset, rank, more in zip(offsets, reached, has_next)],
+        'Needs': np.where(has_next, next_scores, np.nan),
+        'Energy': energy,
+    })
+
+    level_energies = np.bincount(season_ranks.slot_levels, weights=energy, minlength=len(season_ranks.levels)) / season_ranks.level_sizes
+    levels = pd.DataFrame({
+        'Level': season_ranks.levels,
+        'Energy': level_energies,
+        'Rank': [
+            season_ranks.rank_name(offset + level_energy) if level_energy >= 1 else ''
+            for offset, level_energy in zip(season_ranks.level_offsets, np.round(level_energies, 9))
+        ],
+    })
+    return scenarios, levels, season_ranks.rank_name(season_ranks.season_value(level_energies[None, :])[0])
+
+def prepare_rank_plot_data(store, cache, season_ranks_list, start=None, end=None):
+    # Rank timeline of each season as plot data, with the first season's ladder on the y axis.
+    # Timelines are cached per season until one of its scenarios gets new attempts or its
+    # thresholds change.
+    lines = []
+    for season_ranks in season_ranks_list:
+        fingerprint = (season_ranks.version,) + tuple(
+            store.challenge_fingerprint(scenario) for scenario in dict.fromkeys(season_ranks.scenarios))
+        source = (store.name, season_ranks.season, 'ranks')
+        cache.track(source, fingerprint)
+        times, values = cache.get(
+            (season_ranks.season, 'ranks', fingerprint), lambda: rank_timeline(store, season_ranks), source)
+        if start is not None or end is not None:
+            first = np.searchsorted(times, np.datetime64(start, 'D')) if start is not None else 0
+            last = np.searchsorted(times, np.datetime64(end, 'D') + 1) if end is not None else len(times)
+            times, values = times[first:last], values[first:last]
+        lines.append((f'{season_ranks.season} Rank', times, values))
+
+    ladder = season_ranks_list[0].rank_names if season_ranks_list else []
+    return {
+        'lines': lines,
+        'starts': [],
+        'title': 'Benchmark Rank Over Time',
+        'ylabel': 'Rank',
+        'yticks': [(0, 'Unranked')] + [(rank + 1, name) for rank, name in enumerate(ladder)],
+        'drawstyle': 'steps-post',
+    }
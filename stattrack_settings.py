@@ -0,0 +1,172 @@
+import atexit
+import copy
+import json
+import os
+import sys
+import tempfile
+import threading
+
+# The app's settings, custom sets and points of interest, kept in one settings.json in a
+# per-user config directory (STATTRACK_CONFIG_DIR overrides it). The file is read once, the
+# first time a setting is needed; changes are made in memory and written back by a timer
+# thread a moment later, so a burst of changes is one write and the UI thread never waits on
+# the disk. Writes go to a temporary file that then replaces settings.json, so a crash leaves
+# either the old file or the new one, never half of one.
+#
+# The first time, settings are imported from the files the app used to keep in the working
+# directory (config.json, custom_sets.json and points_of_interest.json), which are left alone.
+
+SETTINGS_FILE = 'settings.json'
+
+# Bumped whenever the layout of settings.json changes, with a migration from the old version
+SETTINGS_VERSION = 1
+
+# Version -> function upgrading settings of that version to the next one
+SETTINGS_MIGRATIONS = {}
+
+# How long a change waits for others to be written with it, in seconds
+SAVE_DELAY_SECONDS = 0.5
+
+# Files settings were kept in before the settings store, and the keys they fill in. Each
+# config.json entry is a setting of the same name.
+LEGACY_FILES = {'config.json': None, 'custom_sets.json': 'custom_sets', 'points_of_interest.json': 'points_of_interest'}
+
+def settings_directory():
+    # %APPDATA%\StatTrack on Windows, ~/Library/Application Support/StatTrack on macOS,
+    # $XDG_CONFIG_HOME/stattrack (~/.config/stattrack) elsewhere
+    if os.environ.get('STATTRACK_CONFIG_DIR'):
+        return os.environ['STATTRACK_CONFIG_DIR']
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('APPDATA') or os.path.expanduser('~'), 'StatTrack')
+    if sys.platform == 'darwin':
+        return os.path.join(os.path.expanduser('~'), 'Library', 'Application Support', 'StatTrack')
+    return os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config'), 'stattrack')
+
+def write_atomically(filename, text):
+    # Write next to the file, then swap it in; os.replace is atomic on the same file system
+    directory = os.path.dirname(filename) or '.'
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(prefix='.' + os.path.basename(filename), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(descriptor, 'w') as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, filename)
+    except BaseException:
+        os.remove(temporary)
+        raise
+
+def import_legacy_files(directory):
+    # Settings from the files used before the settings store, if any are in the directory
+    values = {}
+    for filename, key in LEGACY_FILES.items():
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as file:
+                contents = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if key is None:
+            values.update(contents)
+        else:
+            values[key] = contents
+    return values
+
+def migrate_settings(values):
+    # Upgrade settings written by an older version. Newer ones are used as they are; keys this
+    # version doesn't know about are kept and written back untouched.
+    version = values.get('version', 0)
+    while version < SETTINGS_VERSION:
+        values = SETTINGS_MIGRATIONS.get(version, lambda values: values)(values)
+        version += 1
+        values['version'] = version
+    return values
+
+class SettingsStore:
+    # Settings by name, loaded on first use and saved in the background after changes. Values
+    # go in and come out as copies, so callers can keep mutating theirs while a save runs.
+
+    def __init__(self, filename=None, legacy_directory='.', delay=SAVE_DELAY_SECONDS):
+        self.filename = filename
+        self.legacy_directory = legacy_directory
+        self.delay = delay
+        self.values = None
+        self.lock = threading.Lock()        # Guards values, dirty and timer
+        self.write_lock = threading.Lock()  # One write to the file at a time
+        self.dirty = False
+        self.timer = None
+        self.writes = 0
+        atexit.register(self.flush)
+
+    def path(self):
+        return self.filename or os.path.join(settings_directory(), SETTINGS_FILE)
+
+    def load(self):
+        # Called with the lock held
+        if self.values is not None:
+            return self.values
+        path = self.path()
+        values = None
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    values = json.load(file)
+            except ValueError:
+                # Edited by hand into something unreadable: keep it aside rather than lose it
+                os.replace(path, path + '.bad')
+        if values is None:
+            values = {'version': 0, **import_legacy_files(self.legacy_directory)}
+        version = values.get('version', 0)
+        self.values = migrate_settings(values)
+        if self.values['version'] != version:
+            self.schedule_save()
+        return self.values
+
+    def get(self, key, default=None):
+        with self.lock:
+            return copy.deepcopy(self.load().get(key, default))
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, changes):
+        with self.lock:
+            values = self.load()
+            for key, value in changes.items():
+                values[key] = copy.deepcopy(value)
+            self.schedule_save()
+
+    def schedule_save(self):
+        # Called with the lock held. Later changes join the pending save rather than adding one.
+        self.dirty = True
+        if self.timer is None:
+            self.timer = threading.Timer(self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        # Write any unsaved changes now. Runs on the timer thread, and at exit for changes
+        # whose timer hasn't fired yet.
+        with self.write_lock:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                if not self.dirty:
+                    return
+                text = json.dumps(self.values, indent=4)
+                self.dirty = False
+            try:
+                write_atomically(self.path(), text)
+            except OSError:
+                # Leave the changes unsaved, for the next change or exit to try again
+                with self.lock:
+                    self.dirty = True
+                raise
+            self.writes += 1
+
+# Shared by the app and the CLI
+settings = SettingsStore()
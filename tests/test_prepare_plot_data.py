@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stattrack_core import DerivedSeriesCache, ScoreStore, prepare_plot_data, prepare_plot_data_from_store
+
+# A handful of attempts over two days, out of order, so nothing depends on generated benchmark data.
+# "Zero" never scored, which normalize has to leave alone rather than divide by.
+ATTEMPTS = [
+    ('2024-03-02 09:00', 'A', 20.0),
+    ('2024-03-01 10:00', 'A', 10.0),
+    ('2024-03-01 11:00', 'B', 4.0),
+    ('2024-03-01 12:00', 'A', 5.0),
+    ('2024-03-02 10:00', 'B', 8.0),
+    ('2024-03-01 13:00', 'Zero', 0.0),
+    ('2024-03-02 13:00', 'Zero', 0.0),
+    ('2024-03-01 14:00', 'Unselected', 99.0),
+]
+
+def attempts_frame():
+    times, challenges, scores = zip(*ATTEMPTS)
+    return pd.DataFrame({'Datetime': pd.to_datetime(list(times)), 'Challenge': list(challenges), 'Score': list(scores)})
+
+def lines_by_label(plot_data):
+    return {label: (x, y) for label, x, y in plot_data['lines']}
+
+def test_one_line_per_selected_challenge_in_time_order():
+    plot_data = prepare_plot_data(attempts_frame(), ['B', 'A'])
+    assert [label for label, _, _ in plot_data['lines']] == ['B', 'A']
+    x, y = lines_by_label(plot_data)['A']
+    assert list(x) == list(pd.to_datetime(['2024-03-01 10:00', '2024-03-01 12:00', '2024-03-02 09:00']))
+    assert list(y) == [10.0, 5.0, 20.0]
+    assert plot_data['starts'] == []
+
+def test_pb_is_the_running_best():
+    lines = lines_by_label(prepare_plot_data(attempts_frame(), ['A', 'B'], show_pb=True))
+    assert list(lines['A (PB)'][1]) == [10.0, 10.0, 20.0]
+    assert list(lines['B (PB)'][1]) == [4.0, 8.0]
+
+def test_normalize_divides_by_each_challenges_best():
+    lines = lines_by_label(prepare_plot_data(attempts_frame(), ['A', 'B'], normalize=True))
+    assert list(lines['A'][1]) == [0.5, 0.25, 1.0]
+    assert list(lines['B'][1]) == [0.5, 1.0]
+
+def test_zero_max_score_is_left_as_is():
+    lines = lines_by_label(prepare_plot_data(attempts_frame(), ['Zero'], show_pb=True, normalize=True))
+    assert list(lines['Zero (PB)'][1]) == [0.0, 0.0]
+
+def test_aggregate_is_the_daily_mean_across_challenges():
+    plot_data = prepare_plot_data(attempts_frame(), ['A', 'B'], aggregate=True)
+    [(label, days, means)] = plot_data['lines']
+    assert label == 'Aggregate'
+    assert list(days) == list(np.array(['2024-03-01', '2024-03-02'], dtype='datetime64[D]'))
+    assert means == pytest.approx([19 / 3, 14.0])
+
+def test_aggregate_pb_and_normalize():
+    # PB first per challenge, then the daily mean, then the running best of those means
+    [(_, _, means)] = prepare_plot_data(attempts_frame(), ['A', 'B'], show_pb=True, aggregate=True)['lines']
+    assert means == pytest.approx([8.0, 14.0])
+    [(_, _, means)] = prepare_plot_data(attempts_frame(), ['A', 'B'], normalize=True, aggregate=True)['lines']
+    assert means == pytest.approx([1.25 / 3, 1.0])
+
+def test_start_markers_default_to_each_challenges_first_attempt():
+    starts = prepare_plot_data(attempts_frame(), ['A', 'B', 'Unplayed'], aggregate=True)['starts']
+    assert starts == [('Start A', np.datetime64('2024-03-01T10:00')), ('Start B', np.datetime64('2024-03-01T11:00'))]
+
+def test_start_markers_use_each_groups_earliest_attempt():
+    groups = [('Easy', ['B', 'A']), ('Hard', ['Unplayed'])]
+    starts = prepare_plot_data(attempts_frame(), ['A', 'B'], aggregate=True, benchmark_groups=groups)['starts']
+    assert starts == [('Easy', np.datetime64('2024-03-01T10:00'))]
+
+def test_empty_selection():
+    assert prepare_plot_data(attempts_frame(), []) == {'lines': [], 'starts': []}
+    [(label, days, means)] = prepare_plot_data(attempts_frame(), [], aggregate=True)['lines']
+    assert len(days) == 0 and len(means) == 0
+
+def test_challenge_without_attempts_gets_an_empty_line():
+    [(label, x, y)] = prepare_plot_data(attempts_frame(), ['Unplayed'])['lines']
+    assert label == 'Unplayed' and len(x) == 0 and len(y) == 0
+
+@pytest.mark.parametrize('show_pb', [False, True])
+@pytest.mark.parametrize('normalize', [False, True])
+@pytest.mark.parametrize('aggregate', [False, True])
+def test_store_matches_dataframe(show_pb, normalize, aggregate):
+    # prepare_plot_data_from_store is what the app and the CLI draw; it has to agree with prepare_plot_data
+    df = attempts_frame()
+    store = ScoreStore()
+    store.append(df['Datetime'], df['Challenge'], df['Score'])
+    selected = ['A', 'B', 'Zero']
+    expected = prepare_plot_data(df, selected, show_pb, normalize, aggregate)
+    actual = prepare_plot_data_from_store(store, DerivedSeriesCache(), selected, show_pb, normalize, aggregate)
+
+    assert [label for label, _, _ in actual['lines']] == [label for label, _, _ in expected['lines']]
+    for (_, actual_x, actual_y), (_, expected_x, expected_y) in zip(actual['lines'], expected['lines']):
+        assert list(np.asarray(actual_x, dtype='datetime64[ns]')) == list(np.asarray(expected_x, dtype='datetime64[ns]'))
+        assert np.asarray(actual_y, dtype=np.float64) == pytest.approx(np.asarray(expected_y, dtype=np.float64))
+    assert actual['starts'] == expected['starts']
@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pytest
+
+from stattrack_core import ScoreStore, DerivedSeriesCache
+from stattrack_ranks import SeasonRanks, load_voltaic_ranks, rank_tables, rank_timeline, prepare_rank_plot_data
+
+# Made-up thresholds: two levels of two ranks each, with Tracking in both levels
+LEVELS = {
+    'Novice': {
+        'ranks': ['Iron', 'Bronze'],
+        'thresholds': {'Tracking': [100, 200], 'Clicking': [10, 20], 'Switching': None},
+    },
+    'Intermediate': {
+        'ranks': ['Silver', 'Gold'],
+        'thresholds': {'Tracking': [300, 400], 'Reading': [50, 60]},
+    },
+}
+
+ATTEMPTS = [
+    ('2024-03-01 10:00:00', 'Tracking', 150.0),
+    ('2024-03-01 10:05:00', 'Clicking', 20.0),
+    ('2024-03-02 09:00:00', 'Tracking', 100.0),
+    ('2024-03-03 09:00:00', 'Reading', 60.0),
+]
+
+def season_store():
+    store = ScoreStore()
+    times, scenarios, scores = zip(*ATTEMPTS)
+    store.append(list(times), list(scenarios), list(scores))
+    return store
+
+def test_energy_counts_reached_thresholds_and_progress_to_the_next():
+    season_ranks = SeasonRanks('Season', LEVELS)
+    assert season_ranks.scenarios == ['Tracking', 'Clicking', 'Tracking', 'Reading']
+    energy = season_ranks.energy(np.array([0, 0, 0, 2]), np.array([50.0, 150.0, 250.0, 150.0]))
+    np.testing.assert_allclose(energy, [0.5, 1.5, 2.0, 0.5])
+
+def test_timeline_keeps_the_attempts_that_changed_the_rank():
+    times, values = rank_timeline(season_store(), SeasonRanks('Season', LEVELS))
+    assert times.tolist() == np.array(['2024-03-01T10:00', '2024-03-01T10:05', '2024-03-03T09:00'], dtype='datetime64[ns]').tolist()
+    # Novice counts from 0; Intermediate only once its first rank is reached, above Novice's two
+    np.testing.assert_allclose(values, [0.75, 1.75, 3.25])
+
+def test_tables_give_the_current_ranks():
+    scenarios, levels, season_rank = rank_tables(season_store(), SeasonRanks('Season', LEVELS))
+    assert season_rank == 'Silver'
+    assert levels['Rank'].tolist() == ['Iron', 'Silver']
+    assert scenarios['Rank'].tolist() == ['Iron', 'Bronze', '', 'Gold']
+    assert scenarios['Next Rank'].tolist() == ['Bronze', '', 'Silver', '']
+    assert scenarios['Needs'].tolist()[:1] == [200.0]
+
+def test_plot_data_is_cached_until_thresholds_change():
+    store = season_store()
+    cache = DerivedSeriesCache()
+    prepare_rank_plot_data(store, cache, [SeasonRanks('Season', LEVELS)])
+    prepare_rank_plot_data(store, cache, [SeasonRanks('Season', LEVELS)])
+    assert cache.hits == 1
+    changed = json.loads(json.dumps(LEVELS))
+    changed['Novice']['thresholds']['Clicking'] = [10, 30]
+    plot_data = prepare_rank_plot_data(store, cache, [SeasonRanks('Season', changed)])
+    assert cache.hits == 1
+    np.testing.assert_allclose(plot_data['lines'][0][2], [0.75, 1.5, 3.25])
+
+def test_thresholds_must_rise():
+    levels = {'Novice': {'ranks': ['Iron', 'Bronze'], 'thresholds': {'Tracking': [200, 100]}}}
+    with pytest.raises(ValueError):
+        SeasonRanks('Season', levels)
+
+def test_unfilled_file_has_no_seasons(tmp_path):
+    # The shipped template: every rank name and threshold still null
+    path = tmp_path / 'voltaic_ranks.json'
+    path.write_text(json.dumps({'Season': {'Novice': {'ranks': None, 'thresholds': {'Tracking': None}}}}))
+    assert load_voltaic_ranks(str(path)) == {}
+    path.write_text(json.dumps({'Season': LEVELS}))
+    assert list(load_voltaic_ranks(str(path))) == ['Season']
+
+def test_unplayed_season_is_unranked():
+    store = ScoreStore()
+    times, values = rank_timeline(store, SeasonRanks('Season', LEVELS))
+    assert len(times) == 0 and len(values) == 0
+    scenarios, levels, season_rank = rank_tables(store, SeasonRanks('Season', LEVELS))
+    assert season_rank == 'Unranked'
@@ -0,0 +1,48 @@
+from stattrack_core import open_stats_index
+from stattrack_details import DETAIL_COLUMNS, create_detail_tables, load_setup_changes
+
+# Attempts of two players whose sheets interleave in time: (folder, time, horizontal sensitivity, FOV)
+ATTEMPTS = [
+    ('alice', '2024-03-01 10:00:00', 0.3, 103.0),
+    ('bob', '2024-03-01 10:05:00', 0.5, 90.0),
+    ('alice', '2024-03-01 10:10:00', 0.3, 103.0),
+    ('bob', '2024-03-02 09:00:00', 0.5, 90.0),
+    ('alice', '2024-03-03 09:00:00', 0.35, 103.0),
+    ('bob', '2024-03-03 09:05:00', 0.5, 95.0),
+]
+
+def index_with_details(tmp_path):
+    # Sheets and their deep-ingest rows written straight into an index, without any sheets on disk
+    conn = open_stats_index(str(tmp_path / 'stats_index.db'))
+    create_detail_tables(conn)
+    with conn:
+        for attempt, (folder, datetime_value, horiz_sens, fov) in enumerate(ATTEMPTS):
+            directory_path = str(tmp_path / folder)
+            filename = f'{attempt}.csv'
+            conn.execute("INSERT INTO sheets VALUES (?, ?, 1, 1, ?, 'Scenario', 1.0, NULL, NULL, NULL, NULL)",
+                         (directory_path, filename, datetime_value))
+            details = dict.fromkeys(DETAIL_COLUMNS, None)
+            details.update(sens_scale='Valorant', horiz_sens=horiz_sens, vert_sens=horiz_sens, fov=fov)
+            conn.execute(f"INSERT INTO attempt_details VALUES (?, ?, ?, 1, 1, 0, {', '.join('?' * len(DETAIL_COLUMNS))})",
+                         (attempt, directory_path, filename, *details.values()))
+    return conn
+
+def test_each_players_changes_are_found_on_their_own(tmp_path):
+    conn = index_with_details(tmp_path)
+    points = load_setup_changes(conn, [(str(tmp_path / 'alice'), 'Alice'), (str(tmp_path / 'bob'), 'Bob')])
+    assert points == [
+        {'name': 'Alice: Sens 0.3 -> 0.35', 'date': '2024-03-03'},
+        {'name': 'Alice: Vert Sens 0.3 -> 0.35', 'date': '2024-03-03'},
+        {'name': 'Bob: FOV 90 -> 95', 'date': '2024-03-03'},
+    ]
+
+def test_one_player_is_not_labelled(tmp_path):
+    conn = index_with_details(tmp_path)
+    points = load_setup_changes(conn, [(str(tmp_path / 'bob'), 'Bob')])
+    assert points == [{'name': 'FOV 90 -> 95', 'date': '2024-03-03'}]
+
+def test_folders_of_one_player_are_followed_together(tmp_path):
+    # Registered under one name, the two folders are one history again
+    conn = index_with_details(tmp_path)
+    points = load_setup_changes(conn, [(str(tmp_path / 'alice'), 'Me'), (str(tmp_path / 'bob'), 'Me')])
+    assert {'name': 'Sens 0.3 -> 0.5', 'date': '2024-03-01'} in points